@@ -0,0 +1,170 @@
+import json
+import platform
+import sys
+import tempfile
+import time
+
+import click
+
+from benchmarks.cases import SUITES, BenchmarkContext
+from benchmarks.compare import DEFAULT_THRESHOLD, compare_results, load_results
+from benchmarks.rss import measure_file_rss
+from benchmarks.runner import BenchmarkResult, run_case
+from benchmarks.secrets_memory import measure_secrets_memory
+from didcomm_demo.jsonl import error_to_str
+from didcomm_demo.secrets_store import SecretsStore
+
+_HEADER = f"{'case':<80} {'iters':>7} {'ops/sec':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak mem':>10} " \
+          f"{'output':>10}"
+
+
+def _format_bytes(n: int) -> str:
+    for unit in ["B", "KB", "MB"]:
+        if n < 1024:
+            return f"{n:.0f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+
+def _format_result(r: BenchmarkResult) -> str:
+    output = _format_bytes(r.output_bytes) if r.output_bytes is not None else "-"
+    return f"{r.key:<80} {r.iterations:>7} {r.ops_per_sec:>10.1f} {r.p50_ms:>9.3f} {r.p95_ms:>9.3f} " \
+           f"{r.p99_ms:>9.3f} {_format_bytes(r.peak_memory_bytes):>10} {output:>10}"
+
+
+@click.group()
+def benchmarks():
+    """
+    DIDComm Demo benchmarks.
+    """
+
+
+@benchmarks.command()
+@click.option('--suite', 'suites', multiple=True, type=click.Choice(SUITES),
+              help='Suite to run (can be repeated). All suites by default.')
+@click.option('-k', 'filter', default=None, help='Run only cases whose key contains the given substring')
+@click.option('--quick', is_flag=True, default=False, help='Use small payloads and a shorter measurement time')
+@click.option('--min-time', default=None, type=float, help='Min measurement time per case in seconds')
+@click.option('--min-iterations', default=5, help='Min number of measured calls per case')
+@click.option('--secrets-store', type=click.Choice([s.value for s in SecretsStore] + ['memory']),
+              default='memory', help='Secrets store to use. Secrets are kept in memory by default.')
+@click.option('--output', type=click.File('w'), default=None,
+              help='Write results as JSON to the file ("-" for stdout; the table is printed to stderr then)')
+def run(suites, filter, quick, min_time, min_iterations, secrets_store, output):
+    """
+    Runs benchmarks and prints a table of results.
+    """
+    table_to_stderr = output is not None and output.name == '<stdout>'
+    min_time = min_time if min_time is not None else (0.2 if quick else 1.0)
+    results = []
+    failures = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        context = BenchmarkContext(
+            work_dir,
+            secrets_store=None if secrets_store == 'memory' else SecretsStore(secrets_store),
+            quick=quick
+        )
+        click.echo(_HEADER, err=table_to_stderr)
+        for case in context.cases(list(suites)):
+            if filter and filter not in case.key:
+                continue
+            try:
+                result = run_case(case, min_time=min_time, min_iterations=min_iterations)
+            except Exception as e:
+                # for example, payloads too large for the JOSE library
+                failures.append({"suite": case.suite, "name": case.name, "params": case.params,
+                                 "error": error_to_str(e)})
+                click.echo(f"{case.key:<80} FAILED: {error_to_str(e)}", err=table_to_stderr)
+                continue
+            results.append(result)
+            click.echo(_format_result(result), err=table_to_stderr)
+
+    if output is not None:
+        json.dump({
+            "meta": {
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "secrets_store": secrets_store,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            },
+            "results": [r.to_dict() for r in results],
+            "failures": failures
+        }, output, indent=2)
+        output.write("\n")
+
+
+@benchmarks.command(name="list")
+@click.option('--quick', is_flag=True, default=False, help='List cases run with --quick')
+def list_cases(quick):
+    """
+    Lists benchmark cases.
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        for case in BenchmarkContext(work_dir, quick=quick).cases():
+            click.echo(case.key)
+
+
+@benchmarks.command()
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False))
+@click.argument('current', type=click.Path(exists=True, dir_okay=False))
+@click.option('--threshold', default=DEFAULT_THRESHOLD,
+              help='Relative change of ops/sec, p95 latency or peak memory considered a regression')
+def compare(baseline, current, threshold):
+    """
+    Compares two JSON result files and exits with code 1 if there are regressions.
+    """
+    comparisons = compare_results(load_results(baseline), load_results(current))
+    regressed = 0
+    click.echo(f"{'case':<80} {'ops/sec':>9} {'p95':>9} {'peak mem':>9}")
+    for c in comparisons:
+        regressions = c.regressions(threshold)
+        regressed += bool(regressions)
+        click.echo(f"{c.key:<80} {c.ops_per_sec_change:>+9.1%} {c.p95_change:>+9.1%} {c.peak_memory_change:>+9.1%}"
+                   + (f"  REGRESSION: {', '.join(regressions)}" if regressions else ""))
+    click.echo(f"\n{len(comparisons)} cases compared, {regressed} regressed (threshold {threshold:.0%})")
+    if regressed:
+        sys.exit(1)
+
+
+@benchmarks.command()
+@click.option('--size', 'sizes', multiple=True, type=int,
+              help='File size in bytes (can be repeated). 16 KB, 32 KB and 64 KB by default.')
+@click.option('--output', type=click.File('w'), default=None, help='Write results as JSON to the file')
+def rss(sizes, output):
+    """
+    Measures peak RSS of pack-file and unpack-file by file size, each operation in a fresh process.
+    """
+    sizes = sizes or [16 * 1024, 32 * 1024, 64 * 1024]
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = measure_file_rss(list(sizes), work_dir)
+    click.echo(f"{'operation':<12} {'file size':>10} {'peak RSS':>10} {'baseline':>10} {'growth/size':>12}")
+    for r in results:
+        click.echo(f"{r.operation:<12} {_format_bytes(r.file_size):>10} {_format_bytes(r.peak_rss_bytes):>10} "
+                   f"{_format_bytes(r.baseline_rss_bytes):>10} {r.ratio:>12.2f}")
+    if output is not None:
+        json.dump({"results": [r.to_dict() for r in results]}, output, indent=2)
+        output.write("\n")
+
+
+@benchmarks.command()
+@click.option('--keys', 'key_counts', multiple=True, type=int,
+              help='Number of keys (can be repeated). 10 thousand, 100 thousand and 1 million by default.')
+@click.option('--output', type=click.File('w'), default=None, help='Write results as JSON to the file')
+def secrets_memory(key_counts, output):
+    """
+    Measures memory held by the secrets stores per key, in memory of this process.
+    """
+    key_counts = key_counts or [10_000, 100_000, 1_000_000]
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = measure_secrets_memory(list(key_counts), work_dir)
+    click.echo(f"{'store':<10} {'keys':>10} {'memory':>10} {'bytes/key':>10} {'add us':>8} {'get_key us':>10}")
+    for r in results:
+        click.echo(f"{r.store:<10} {r.keys:>10} {_format_bytes(r.memory_bytes):>10} {r.bytes_per_key:>10.1f} "
+                   f"{r.add_us:>8.1f} {r.get_key_us:>10.1f}")
+    if output is not None:
+        json.dump({"results": [r.to_dict() for r in results]}, output, indent=2)
+        output.write("\n")
+
+
+if __name__ == '__main__':
+    benchmarks(prog_name="python -m benchmarks")
@@ -0,0 +1,355 @@
+import asyncio
+import base64
+import itertools
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from didcomm.common.types import DID_URL
+from didcomm.pack_encrypted import PackEncryptedConfig
+from didcomm.secrets.secrets_resolver import Secret
+from didcomm.secrets.secrets_resolver_editable import SecretsResolverEditable
+from peerdid.types import VerificationMaterialFormatPeerDID
+
+from benchmarks.runner import Case
+from didcomm_demo.did_resolver_peer_did import DIDResolverPeerDID, resolve_peer_did_doc, \
+    _resolve_peer_did_doc_from_json
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.loop_thread import EventLoopThread
+from didcomm_demo.replay import ReplayDetector, DEFAULT_REPLAY_FP_RATE
+from didcomm_demo.secrets_store import SecretsStore, DEFAULT_SECRETS_FILES, create_secrets_resolver
+from didcomm_demo.transport import HTTPTransport
+
+SUITES = ["create", "resolve", "pack", "unpack", "compression", "fanout", "replay", "threads", "send"]
+
+PAYLOAD_SIZES = [100, 10 * 1024, 1024 * 1024, 10 * 1024 * 1024]
+QUICK_PAYLOAD_SIZES = [100, 10 * 1024]
+
+# (auth_keys_count, agreement_keys_count) of numalgo 2 peer DIDs
+KEY_COUNTS = [(1, 1), (2, 2), (5, 5), (10, 10)]
+
+# mode -> (authcrypt, signed)
+PACK_MODES = {
+    "anoncrypt": (False, False),
+    "anoncrypt+signed": (False, True),
+    "authcrypt": (True, False),
+    "authcrypt+signed": (True, True),
+}
+
+# min size of a message to compress in the compression suite
+COMPRESS_THRESHOLD = 1024
+
+# numbers of receivers of a message in the fanout suite
+RECIPIENT_COUNTS = [1, 10, 50]
+QUICK_RECIPIENT_COUNTS = [1, 10]
+FANOUT_PAYLOAD_SIZE = 10 * 1024
+
+# numbers of message IDs tracked by the replay detector in the replay suite (its capacity)
+TRACKED_IDS = [1000, 1_000_000, 10_000_000]
+QUICK_TRACKED_IDS = [1000, 100_000]
+
+# numbers of threads packing messages at once in the threads suite
+THREAD_COUNTS = [1, 4, 16]
+QUICK_THREAD_COUNTS = [1, 4]
+MESSAGES_PER_THREAD = 8
+
+# numbers of messages sent at once in the send suite
+SEND_CONCURRENCY = [1, 8]
+
+
+class SecretsResolverMemory(SecretsResolverEditable):
+    """
+    Keeps secrets in a dict, so that benchmarks measure DIDComm rather than secrets storage.
+    """
+
+    def __init__(self) -> None:
+        self._secrets: Dict[DID_URL, Secret] = {}
+
+    async def add_key(self, secret: Secret):
+        self._secrets[secret.kid] = secret
+
+    async def get_kids(self) -> List[str]:
+        return list(self._secrets)
+
+    async def get_key(self, kid: DID_URL) -> Optional[Secret]:
+        return self._secrets.get(kid)
+
+    async def get_keys(self, kids: List[DID_URL]) -> List[DID_URL]:
+        return [kid for kid in kids if kid in self._secrets]
+
+
+def payload(size: int) -> str:
+    # random rather than repeated characters, so that the payload is not unrealistically compressible
+    return base64.b64encode(os.urandom(size)).decode()[:size]
+
+
+def json_payload(size: int) -> str:
+    """
+    Verbose JSON of records with repeated keys and random values, the kind of payload compression is meant for.
+    """
+    records = []
+    length = 2
+    while length < size:
+        record = {
+            "id": base64.b32encode(os.urandom(10)).decode(),
+            "type": "https://example.com/protocols/inventory/1.0/item",
+            "description": "An item of the inventory",
+            "quantity": int.from_bytes(os.urandom(2), "big"),
+            "tags": ["demo", "inventory", "example"],
+        }
+        records.append(record)
+        length += len(json.dumps(record)) + 2
+    return json.dumps(records)[:size]
+
+
+def packed_msg_size(res) -> int:
+    return len(res.packed_msg)
+
+
+class _EndpointHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(202)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def local_endpoint() -> str:
+    """
+    Starts a local HTTP server accepting any message and returns its URL.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _EndpointHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/didcomm"
+
+
+class BenchmarkContext:
+    """
+    Creates benchmark cases sharing a DIDCommDemo instance and peer DIDs.
+
+    :param work_dir: directory for secrets store files
+    :param secrets_store: secrets store type; secrets are kept in memory if not set
+    :param quick: whether to use small payloads only
+    """
+
+    def __init__(self, work_dir: str, secrets_store: Optional[SecretsStore] = None, quick: bool = False) -> None:
+        if secrets_store is None:
+            secrets_resolver = SecretsResolverMemory()
+        else:
+            file_path = os.path.join(work_dir, DEFAULT_SECRETS_FILES[secrets_store])
+            secrets_resolver = create_secrets_resolver(secrets_store, file_path)
+        self.demo = DIDCommDemo(secrets_resolver)
+        self.payload_sizes = QUICK_PAYLOAD_SIZES if quick else PAYLOAD_SIZES
+        self.recipient_counts = QUICK_RECIPIENT_COUNTS if quick else RECIPIENT_COUNTS
+        self.tracked_ids = QUICK_TRACKED_IDS if quick else TRACKED_IDS
+        self.thread_counts = QUICK_THREAD_COUNTS if quick else THREAD_COUNTS
+        self._dids = None
+
+    def dids(self) -> Tuple[str, str]:
+        """
+        Sender and recipient DIDs created on first use.
+        """
+        if self._dids is None:
+            self._dids = self.demo.create_peer_did(), self.demo.create_peer_did()
+        return self._dids
+
+    def cases(self, suites: Optional[List[str]] = None) -> Iterator[Case]:
+        for suite in suites or SUITES:
+            yield from getattr(self, f"_{suite}_cases")()
+
+    def _create_cases(self) -> Iterator[Case]:
+        yield Case("create", "numalgo0", {"auth_keys_count": 1},
+                   lambda: lambda: self.demo.create_peer_did(auth_keys_count=1, agreement_keys_count=0))
+        for auth_keys_count, agreement_keys_count in KEY_COUNTS:
+            yield Case(
+                "create", "numalgo2",
+                {"auth_keys_count": auth_keys_count, "agreement_keys_count": agreement_keys_count},
+                lambda a=auth_keys_count, b=agreement_keys_count:
+                lambda: self.demo.create_peer_did(auth_keys_count=a, agreement_keys_count=b)
+            )
+
+    def _resolve_cases(self) -> Iterator[Case]:
+        dids = [("numalgo0", {"auth_keys_count": 1}, dict(auth_keys_count=1, agreement_keys_count=0))] + [
+            ("numalgo2", {"auth_keys_count": a, "agreement_keys_count": b}, dict(auth_keys_count=a,
+                                                                                  agreement_keys_count=b))
+            for a, b in KEY_COUNTS
+        ]
+        for name, params, create_kwargs in dids:
+            for format in VerificationMaterialFormatPeerDID.JWK, VerificationMaterialFormatPeerDID.MULTIBASE:
+                def setup(create_kwargs=create_kwargs, format=format):
+                    did = self.demo.create_peer_did(**create_kwargs)
+                    return lambda: DIDCommDemo.resolve_peer_did(did, format)
+
+                yield Case("resolve", name, {**params, "format": format.name.lower()}, setup)
+
+            # resolution to a DIDDoc used by pack and unpack when the DID Doc is not cached
+            def setup(create_kwargs=create_kwargs):
+                did = self.demo.create_peer_did(**create_kwargs)
+                resolver = DIDResolverPeerDID()
+                loop = asyncio.get_event_loop()
+                return lambda: loop.run_until_complete(resolver.resolve(did))
+
+            yield Case("resolve", name, {**params, "format": "didcomm"}, setup)
+
+            # the same resolution decoding the DID directly and through the DID Doc JSON
+            for format, resolve in ("didcomm-direct", resolve_peer_did_doc), \
+                                   ("didcomm-json", _resolve_peer_did_doc_from_json):
+                def setup(create_kwargs=create_kwargs, resolve=resolve):
+                    did = self.demo.create_peer_did(**create_kwargs)
+                    return lambda: resolve(did)
+
+                yield Case("resolve", name, {**params, "format": format}, setup)
+
+    def _pack_params(self) -> Iterator[Tuple[str, dict]]:
+        for mode, (authcrypt, _) in PACK_MODES.items():
+            for protect_sender_id in ([False, True] if authcrypt else [False]):
+                for payload_size in self.payload_sizes:
+                    yield mode, {"payload_size": payload_size, "protect_sender_id": protect_sender_id}
+
+    def _pack_fn(self, mode: str, params: dict, msg: Optional[str] = None, compress_threshold: Optional[int] = None):
+        authcrypt, signed = PACK_MODES[mode]
+        frm, to = self.dids()
+        msg = msg if msg is not None else payload(params["payload_size"])
+        config = PackEncryptedConfig(protect_sender_id=params["protect_sender_id"])
+        return lambda: self.demo.pack(
+            msg=msg,
+            to=to,
+            frm=frm if authcrypt else None,
+            sign_frm=frm if signed else None,
+            config=config,
+            compress_threshold=compress_threshold
+        )
+
+    def _pack_cases(self) -> Iterator[Case]:
+        for mode, params in self._pack_params():
+            yield Case("pack", mode, params, lambda mode=mode, params=params: self._pack_fn(mode, params),
+                       output_size=packed_msg_size)
+
+    def _unpack_cases(self) -> Iterator[Case]:
+        for mode, params in self._pack_params():
+            def setup(mode=mode, params=params):
+                packed_msg = self._pack_fn(mode, params)().packed_msg
+                return lambda: self.demo.unpack(packed_msg)
+
+            yield Case("unpack", mode, params, setup)
+
+    def _compression_cases(self) -> Iterator[Case]:
+        # authcrypt with protected sender ID (the default) of compressible and incompressible payloads,
+        # with and without compression: the output size is the envelope size
+        for payload_type, make_payload in ("json", json_payload), ("random", payload):
+            for payload_size in self.payload_sizes:
+                for compress in False, True:
+                    params = {"payload": payload_type, "payload_size": payload_size, "compress": compress}
+
+                    def pack_fn(make_payload=make_payload, payload_size=payload_size, compress=compress):
+                        return self._pack_fn("authcrypt", {"protect_sender_id": True}, msg=make_payload(payload_size),
+                                             compress_threshold=COMPRESS_THRESHOLD if compress else None)
+
+                    def unpack_setup(pack_fn=pack_fn):
+                        packed_msg = pack_fn()().packed_msg
+                        return lambda: self.demo.unpack(packed_msg)
+
+                    yield Case("compression", "pack", params, pack_fn, output_size=packed_msg_size)
+                    yield Case("compression", "unpack", params, unpack_setup)
+
+    def _fanout_cases(self) -> Iterator[Case]:
+        # a message to a group packed once for all receivers or once per receiver (authcrypt, sender ID protected);
+        # the output size is the total size of packed messages
+        frm, _ = self.dids()
+        msg = payload(FANOUT_PAYLOAD_SIZE)
+        for count in self.recipient_counts:
+            params = {"recipients": count, "payload_size": FANOUT_PAYLOAD_SIZE}
+
+            def multi_setup(count=count):
+                to = [self.demo.create_peer_did() for _ in range(count)]
+                return lambda: self.demo.pack(msg, to=to, frm=frm)
+
+            def per_recipient_setup(count=count):
+                to = [self.demo.create_peer_did() for _ in range(count)]
+                return lambda: [self.demo.pack(msg, to=recipient, frm=frm) for recipient in to]
+
+            yield Case("fanout", "multi-recipient", params, multi_setup, output_size=packed_msg_size)
+            yield Case("fanout", "per-recipient", params, per_recipient_setup,
+                       output_size=lambda results: sum(packed_msg_size(res) for res in results))
+
+    def _replay_cases(self) -> Iterator[Case]:
+        # lookups of fresh and replayed message IDs in a replay detector filled up to its capacity
+        sender, _ = self.dids()
+        detectors = {}
+
+        def filled_detector(count: int) -> ReplayDetector:
+            if count not in detectors:
+                detectors.clear()
+                detector = ReplayDetector(capacity=count)
+                detector.add_many((str(i), sender) for i in range(count))
+                detectors[count] = detector
+            return detectors[count]
+
+        for count in self.tracked_ids:
+            params = {"tracked_ids": count, "fp_rate": DEFAULT_REPLAY_FP_RATE}
+
+            def fresh_setup(count=count):
+                detector = filled_detector(count)
+                ids = itertools.count(count)
+                return lambda: detector.check_and_add(str(next(ids)), sender)
+
+            def replayed_setup(count=count):
+                detector = filled_detector(count)
+                ids = itertools.cycle(range(count))
+                return lambda: detector.check_and_add(str(next(ids)), sender)
+
+            yield Case("replay", "fresh", params, fresh_setup)
+            yield Case("replay", "replayed", params, replayed_setup)
+
+    def _threads_cases(self) -> Iterator[Case]:
+        # messages packed (authcrypt, sender ID protected) by a pool of threads: on an event loop thread
+        # shared by all of them or on an event loop of each thread running every call to completion
+        frm, to = self.dids()
+        msg = payload(100)
+        for count in self.thread_counts:
+            params = {"threads": count, "messages": count * MESSAGES_PER_THREAD}
+
+            def setup(count=count, loop_thread=None, initializer=None):
+                demo = DIDCommDemo(self.demo.secrets_resolver, loop_thread=loop_thread)
+                executor = ThreadPoolExecutor(max_workers=count, initializer=initializer)
+                return lambda: list(executor.map(lambda _: demo.pack(msg, to=to, frm=frm),
+                                                 range(count * MESSAGES_PER_THREAD)))
+
+            yield Case("threads", "loop-thread", params,
+                       lambda count=count: setup(count, loop_thread=EventLoopThread()))
+            yield Case("threads", "thread-loops", params, lambda count=count: setup(
+                count, initializer=lambda: asyncio.set_event_loop(asyncio.new_event_loop())
+            ))
+
+    def _send_cases(self) -> Iterator[Case]:
+        # messages (authcrypt, sender ID protected) packed and posted to a local endpoint
+        # on pooled keep-alive connections or on a new connection per message
+        frm, _ = self.dids()
+        msg = payload(100)
+        endpoint = None
+        for concurrency in SEND_CONCURRENCY:
+            params = {"concurrency": concurrency, "payload_size": 100}
+
+            def setup(concurrency=concurrency, keep_alive=True):
+                nonlocal endpoint
+                endpoint = endpoint or local_endpoint()
+                demo = DIDCommDemo(self.demo.secrets_resolver,
+                                   transport=HTTPTransport(max_concurrency=concurrency, keep_alive=keep_alive))
+                to = demo.create_peer_did(service_endpoint=endpoint)
+
+                async def send_all():
+                    return await asyncio.gather(*[demo.send_async(msg, to=to, frm=frm) for _ in range(concurrency)])
+
+                return lambda: demo._run_sync(send_all())
+
+            yield Case("send", "keep-alive", params, setup)
+            yield Case("send", "new-connection", params, lambda concurrency=concurrency: setup(concurrency, False))
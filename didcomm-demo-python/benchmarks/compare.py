@@ -0,0 +1,60 @@
+import json
+from dataclasses import dataclass
+from typing import List
+
+from benchmarks.runner import BenchmarkResult
+
+DEFAULT_THRESHOLD = 0.1
+
+
+@dataclass(frozen=True)
+class Comparison:
+    baseline: BenchmarkResult
+    current: BenchmarkResult
+
+    @property
+    def key(self) -> str:
+        return self.current.key
+
+    @property
+    def ops_per_sec_change(self) -> float:
+        return self.current.ops_per_sec / self.baseline.ops_per_sec - 1
+
+    @property
+    def p95_change(self) -> float:
+        return self.current.p95_ms / self.baseline.p95_ms - 1
+
+    @property
+    def peak_memory_change(self) -> float:
+        return self.current.peak_memory_bytes / max(self.baseline.peak_memory_bytes, 1) - 1
+
+    def regressions(self, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+        """
+        :param threshold: relative change considered a regression, for example 0.1 for 10%
+        :return: descriptions of regressed metrics; empty if there are no regressions
+        """
+        regressions = []
+        if self.ops_per_sec_change < -threshold:
+            regressions.append(f"ops/sec {self.ops_per_sec_change:+.1%}")
+        if self.p95_change > threshold:
+            regressions.append(f"p95 {self.p95_change:+.1%}")
+        if self.peak_memory_change > threshold:
+            regressions.append(f"peak memory {self.peak_memory_change:+.1%}")
+        return regressions
+
+
+def load_results(path: str) -> List[BenchmarkResult]:
+    with open(path) as f:
+        return [BenchmarkResult.from_dict(r) for r in json.load(f)["results"]]
+
+
+def compare_results(baseline: List[BenchmarkResult], current: List[BenchmarkResult]) -> List[Comparison]:
+    """
+    Pairs results of the same cases. Cases present in one of the lists only are skipped.
+    """
+    baseline_by_key = {r.key: r for r in baseline}
+    return [
+        Comparison(baseline=baseline_by_key[r.key], current=r)
+        for r in current
+        if r.key in baseline_by_key
+    ]
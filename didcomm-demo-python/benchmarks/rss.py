@@ -0,0 +1,106 @@
+"""
+Peak resident memory of `pack_file` and `unpack_file` by file size.
+
+Every operation runs in a fresh process (`python -m benchmarks.rss <operation> ...`),
+so that its peak RSS isn't hidden by allocations made before.
+"""
+import os
+import resource
+import subprocess
+import sys
+from dataclasses import dataclass, asdict
+from typing import List
+
+_OPERATIONS = ["baseline", "pack_file", "unpack_file"]
+
+
+@dataclass(frozen=True)
+class RssResult:
+    """
+    Attributes:
+        operation (str): `pack_file` or `unpack_file`
+        file_size (int): size of the packed file in bytes
+        peak_rss_bytes (int): peak RSS of the process
+        baseline_rss_bytes (int): peak RSS of a process importing the libraries and loading secrets only
+    """
+
+    operation: str
+    file_size: int
+    peak_rss_bytes: int
+    baseline_rss_bytes: int
+
+    @property
+    def ratio(self) -> float:
+        """
+        Peak RSS growth over the baseline relative to the file size.
+        """
+        return (self.peak_rss_bytes - self.baseline_rss_bytes) / max(self.file_size, 1)
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "ratio": self.ratio}
+
+
+def _peak_rss_bytes() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _demo(work_dir: str):
+    from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+    from didcomm_demo.didcomm_demo import DIDCommDemo
+
+    return DIDCommDemo(SecretsResolverDemo(os.path.join(work_dir, "secrets.json")))
+
+
+def _run_operation(operation: str, work_dir: str, did: str, path: str):
+    demo = _demo(work_dir)
+    packed_path = path + ".json"
+    if operation == "pack_file":
+        with open(packed_path, "w") as output:
+            demo.pack_file(path, to=did, frm=did, output=output)
+    elif operation == "unpack_file":
+        out_dir = os.path.join(work_dir, "unpacked")
+        os.makedirs(out_dir, exist_ok=True)
+        demo.unpack_file(packed_path, out_dir)
+    print(_peak_rss_bytes())
+
+
+def _measure(operation: str, work_dir: str, did: str, path: str) -> int:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.rss", operation, work_dir, did, path],
+        check=True, stdout=subprocess.PIPE, universal_newlines=True
+    ).stdout
+    return int(out.split()[-1])
+
+
+def measure_file_rss(file_sizes: List[int], work_dir: str) -> List[RssResult]:
+    """
+    Packs and unpacks files of the given sizes (authcrypted, sender ID protected) in subprocesses
+    and reports their peak RSS.
+    """
+    did = _demo(work_dir).create_peer_did()
+    baseline = None
+    results = []
+    for file_size in file_sizes:
+        path = os.path.join(work_dir, f"payload-{file_size}.bin")
+        with open(path, "wb") as f:
+            f.write(os.urandom(file_size))
+        if baseline is None:
+            baseline = _measure("baseline", work_dir, did, path)
+        for operation in ["pack_file", "unpack_file"]:
+            results.append(RssResult(
+                operation=operation,
+                file_size=file_size,
+                peak_rss_bytes=_measure(operation, work_dir, did, path),
+                baseline_rss_bytes=baseline
+            ))
+        os.remove(path)
+        os.remove(path + ".json")
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 5 or sys.argv[1] not in _OPERATIONS:
+        sys.exit(f"usage: python -m benchmarks.rss {{{','.join(_OPERATIONS)}}} <work_dir> <did> <path>")
+    _run_operation(*sys.argv[1:])
@@ -0,0 +1,121 @@
+import gc
+import math
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass(frozen=True)
+class Case:
+    """
+    A benchmark case.
+
+    Attributes:
+        suite (str): suite the case belongs to, for example `pack`
+        name (str): case name, for example `authcrypt`
+        params (dict): case parameters, for example `{"payload_size": 100}`
+        setup (Callable): prepares the case and returns a function to be measured
+        output_size (Callable): optional function returning the size in bytes of a value returned
+                                by the measured function, for example the size of a packed message
+    """
+
+    suite: str
+    name: str
+    params: Dict[str, Any]
+    setup: Callable[[], Callable[[], Any]]
+    output_size: Optional[Callable[[Any], int]] = None
+
+    @property
+    def key(self) -> str:
+        return case_key(self.suite, self.name, self.params)
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    suite: str
+    name: str
+    params: Dict[str, Any]
+    iterations: int
+    ops_per_sec: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    peak_memory_bytes: int
+    output_bytes: Optional[int] = None
+
+    @property
+    def key(self) -> str:
+        return case_key(self.suite, self.name, self.params)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "BenchmarkResult":
+        return cls(**d)
+
+
+def case_key(suite: str, name: str, params: Dict[str, Any]) -> str:
+    params_str = ",".join(f"{k}={v}" for k, v in sorted(params.items()))
+    return f"{suite}/{name}[{params_str}]"
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """
+    Nearest-rank percentile of sorted values.
+    """
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def measure(fn: Callable[[], Any], min_time: float, min_iterations: int, max_iterations: int) -> List[float]:
+    """
+    Calls `fn` (after a warm-up call) until both `min_time` seconds and `min_iterations` calls are reached,
+    but at most `max_iterations` times.
+
+    :return: durations of the calls in seconds
+    """
+    fn()
+    durations = []
+    started = time.perf_counter()
+    while len(durations) < max_iterations and \
+            (len(durations) < min_iterations or time.perf_counter() - started < min_time):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def measure_peak_memory(fn: Callable[[], Any]) -> int:
+    """
+    Measures peak memory allocated by Python during a single `fn` call.
+    Memory allocated by native libraries (OpenSSL) is not traced.
+    This is done separately from timing, since tracing slows allocations down.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(case: Case, min_time: float = 1.0, min_iterations: int = 5, max_iterations: int = 100_000
+             ) -> BenchmarkResult:
+    fn = case.setup()
+    durations = sorted(measure(fn, min_time, min_iterations, max_iterations))
+    outputs = []
+    peak_memory_bytes = measure_peak_memory(lambda: outputs.append(fn()))
+    return BenchmarkResult(
+        suite=case.suite,
+        name=case.name,
+        params=case.params,
+        iterations=len(durations),
+        ops_per_sec=len(durations) / sum(durations),
+        p50_ms=percentile(durations, 50) * 1000,
+        p95_ms=percentile(durations, 95) * 1000,
+        p99_ms=percentile(durations, 99) * 1000,
+        peak_memory_bytes=peak_memory_bytes,
+        output_bytes=case.output_size(outputs[0]) if case.output_size is not None else None
+    )
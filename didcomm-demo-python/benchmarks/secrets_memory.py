@@ -0,0 +1,130 @@
+"""
+Memory held by secrets resolvers per key.
+"""
+import asyncio
+import base64
+import gc
+import itertools
+import os
+import random
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Iterator, List
+
+from didcomm.secrets.secrets_resolver import Secret
+from didcomm.secrets.secrets_resolver_editable import SecretsResolverEditable
+from didcomm.secrets.secrets_util import jwk_to_secret
+
+from didcomm_demo.secrets_resolver_compact import SecretsResolverCompact
+from didcomm_demo.secrets_resolver_json import SecretsResolverJson
+
+# secrets are added in chunks, as `create_peer_dids` adds them
+_CHUNK_SIZE = 10000
+_LOOKUPS = 1000
+# adds are timed separately, since tracing allocations slows them down
+_TIMED_ADDS = 100000
+
+
+@dataclass(frozen=True)
+class SecretsMemoryResult:
+    """
+    Attributes:
+        store (str): `json` (`SecretsResolverJson`, the default store, in memory) or `compact`
+        keys (int): number of keys in the store
+        memory_bytes (int): memory allocated by Python for the store
+        add_us (float): mean time to add a key in microseconds (of the first 100 thousand keys)
+        get_key_us (float): mean time to look up a key in microseconds
+    """
+
+    store: str
+    keys: int
+    memory_bytes: int
+    add_us: float
+    get_key_us: float
+
+    @property
+    def bytes_per_key(self) -> float:
+        return self.memory_bytes / max(self.keys, 1)
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "bytes_per_key": self.bytes_per_key}
+
+
+def _random_b64(rnd: random.Random, size: int) -> str:
+    return base64.urlsafe_b64encode(rnd.getrandbits(8 * size).to_bytes(size, "little")).rstrip(b"=").decode()
+
+
+def _secrets(count: int) -> Iterator[Secret]:
+    """
+    Secrets like those of peer DIDs with an agreement and an authentication key,
+    with random bytes as key material. The same secrets are generated on every call.
+    """
+    rnd = random.Random(count)
+    for i in range(count):
+        if i % 2 == 0:
+            # fragments have the length of multibase encoded public keys
+            agreement, authentication = "6LS" + _random_b64(rnd, 33), "6Mk" + _random_b64(rnd, 33)
+            did = f"did:peer:2.Ez{agreement}.Vz{authentication}"
+        crv, fragment = ("X25519", agreement) if i % 2 == 0 else ("Ed25519", authentication)
+        yield jwk_to_secret({
+            "crv": crv,
+            "x": _random_b64(rnd, 32),
+            "d": _random_b64(rnd, 32),
+            "kty": "OKP",
+            "kid": f"{did}#{fragment}",
+        })
+
+
+def _json_store(work_dir: str) -> SecretsResolverEditable:
+    resolver = SecretsResolverJson(os.path.join(work_dir, "secrets.json"))
+    # keys are added as by `add_keys`, but without writing the file
+    resolver._save = lambda: None
+    return resolver
+
+
+STORES: Dict[str, Callable[[str], SecretsResolverEditable]] = {
+    "json": _json_store,
+    "compact": lambda work_dir: SecretsResolverCompact(),
+}
+
+
+def _measure(store: str, count: int, work_dir: str) -> SecretsMemoryResult:
+    run = asyncio.get_event_loop().run_until_complete
+    secrets = _secrets(count)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        resolver = STORES[store](work_dir)
+        added = 0
+        while added < count:
+            chunk = [next(secrets) for _ in range(min(_CHUNK_SIZE, count - added))]
+            run(resolver.add_keys(chunk))
+            added += len(chunk)
+            del chunk
+        gc.collect()
+        memory = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    timed = list(itertools.islice(_secrets(count), _TIMED_ADDS))
+    start = time.perf_counter()
+    run(STORES[store](work_dir).add_keys(timed))
+    add_time = time.perf_counter() - start
+
+    step = max(1, count // _LOOKUPS)
+    kids = [secret.kid for i, secret in enumerate(_secrets(count)) if i % step == 0]
+    start = time.perf_counter()
+    for kid in kids:
+        assert run(resolver.get_key(kid)) is not None
+    get_key_time = time.perf_counter() - start
+    return SecretsMemoryResult(store=store, keys=count, memory_bytes=memory, add_us=add_time / len(timed) * 1e6,
+                               get_key_us=get_key_time / len(kids) * 1e6)
+
+
+def measure_secrets_memory(key_counts: List[int], work_dir: str) -> List[SecretsMemoryResult]:
+    """
+    Adds the given numbers of keys to every store and reports the memory held by the store.
+    """
+    return [_measure(store, count, work_dir) for count in key_counts for store in STORES]
@@ -0,0 +1,4 @@
+import time
+
+# `time.perf_counter()` value when the package started importing, the start of `didcomm-cli --startup-profile`
+IMPORT_STARTED = time.perf_counter()
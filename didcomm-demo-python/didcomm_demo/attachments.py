@@ -0,0 +1,93 @@
+import base64
+import binascii
+import mimetypes
+import os
+from typing import Optional, TextIO, Union
+
+from didcomm.core.utils import id_generator_default
+from didcomm.errors import DIDCommValueError
+from didcomm.message import Attachment, AttachmentDataBase64
+
+DEFAULT_MEDIA_TYPE = "application/octet-stream"
+
+# Authlib rejects JWE and JWS segments longer than this (a guard against oversized tokens) and has no way
+# to raise the limit per call. Every layer of a packed message base64-encodes the file once more,
+# so packed files are bounded by it.
+MAX_SEGMENT_LENGTH = 256000
+# files larger than this can't be packed into a message that can be unpacked
+MAX_FILE_SIZE = MAX_SEGMENT_LENGTH * 3 // 4
+# message files larger than this aren't read by `unpack_file`: besides a segment of at most `MAX_SEGMENT_LENGTH`
+# they contain only headers and recipients
+MAX_PACKED_FILE_SIZE = 4 * MAX_SEGMENT_LENGTH
+
+# packed messages are written by slices, so that the whole message is never encoded at once
+_WRITE_CHUNK_SIZE = 1024 * 1024
+
+
+def check_file_size(path: Union[str, os.PathLike], max_size: int):
+    """
+    :raises DIDCommValueError: if the file is larger than `max_size` bytes
+    """
+    size = os.path.getsize(path)
+    if size > max_size:
+        raise DIDCommValueError(f"File {path} is too large: {size} bytes, at most {max_size} are supported")
+
+
+def file_attachment(path: Union[str, os.PathLike], media_type: Optional[str] = None) -> Attachment:
+    """
+    Builds a base64 attachment with the content of a file.
+
+    :param media_type: media type of the file. Guessed by the file name if not set.
+    """
+    path = str(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    return Attachment(
+        id=id_generator_default(),
+        data=AttachmentDataBase64(base64=base64.b64encode(data).decode("ascii")),
+        filename=os.path.basename(path),
+        media_type=media_type or mimetypes.guess_type(path)[0] or DEFAULT_MEDIA_TYPE,
+        byte_count=len(data),
+        lastmod_time=int(os.path.getmtime(path))
+    )
+
+
+def save_attachment(attachment: Attachment, directory: Union[str, os.PathLike]) -> Optional[str]:
+    """
+    Writes the content of a base64 attachment to a new file in the directory.
+    The file is named after the attachment's file name or ID (without any directories); existing files are kept.
+
+    :return: path of the written file or None if the attachment has no base64 data
+    :raises DIDCommValueError: if the attachment has no valid name or base64 data, or the file exists
+    """
+    if not isinstance(attachment.data, AttachmentDataBase64):
+        return None
+    filename = _safe_filename(attachment.filename) or _safe_filename(attachment.id)
+    if filename is None:
+        raise DIDCommValueError(f"Attachment {attachment.id!r} has no valid file name")
+    path = os.path.join(str(directory), filename)
+
+    # the data is decoded before the file is created, so that invalid data leaves no file behind
+    try:
+        data = base64.b64decode(attachment.data.base64, validate=True)
+    except binascii.Error as e:
+        raise DIDCommValueError(f"Invalid base64 data of attachment {attachment.id!r}") from e
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    except FileExistsError:
+        raise DIDCommValueError(f"File {path} already exists")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    if attachment.lastmod_time:
+        os.utime(path, (attachment.lastmod_time, attachment.lastmod_time))
+    return path
+
+
+def _safe_filename(name: Optional[str]) -> Optional[str]:
+    name = os.path.basename(name or "")
+    return name if name not in ("", ".", "..") else None
+
+
+def write_chunked(text: str, output: TextIO):
+    for i in range(0, len(text), _WRITE_CHUNK_SIZE):
+        output.write(text[i:i + _WRITE_CHUNK_SIZE])
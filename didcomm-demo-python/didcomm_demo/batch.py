@@ -0,0 +1,71 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from didcomm.common.types import DID, DID_URL
+from didcomm.did_doc.did_doc import DIDDoc
+from didcomm.did_doc.did_resolver import DIDResolver
+from didcomm.secrets.secrets_resolver import SecretsResolver, Secret
+
+DEFAULT_BATCH_CONCURRENCY = 64
+
+
+@dataclass(frozen=True)
+class BatchItemResult:
+    """
+    Result of a single item in a batch operation.
+
+    Attributes:
+        index (int): position of the item in the batch input
+        result (Any): the operation result; None if the operation failed
+        error (Exception): the error the operation failed with; None on success
+    """
+
+    index: int
+    result: Any = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class DIDResolverMemo(DIDResolver):
+    """
+    Resolves every DID at most once by memoizing results of another resolver.
+    Intended to be scoped to a single batch.
+    """
+
+    def __init__(self, did_resolver: DIDResolver) -> None:
+        self._did_resolver = did_resolver
+        self._did_docs: Dict[DID, "asyncio.Future[Optional[DIDDoc]]"] = {}
+
+    async def resolve(self, did: DID) -> Optional[DIDDoc]:
+        fut = self._did_docs.get(did)
+        if fut is None:
+            fut = asyncio.ensure_future(self._did_resolver.resolve(did))
+            self._did_docs[did] = fut
+        return await asyncio.shield(fut)
+
+
+class SecretsResolverMemo(SecretsResolver):
+    """
+    Looks up every secret at most once by memoizing results of another resolver.
+    Intended to be scoped to a single batch.
+    """
+
+    def __init__(self, secrets_resolver: SecretsResolver) -> None:
+        self._secrets_resolver = secrets_resolver
+        self._secrets: Dict[DID_URL, Optional[Secret]] = {}
+        self._kids: Dict[Tuple[DID_URL, ...], List[DID_URL]] = {}
+
+    async def get_key(self, kid: DID_URL) -> Optional[Secret]:
+        if kid not in self._secrets:
+            self._secrets[kid] = await self._secrets_resolver.get_key(kid)
+        return self._secrets[kid]
+
+    async def get_keys(self, kids: List[DID_URL]) -> List[DID_URL]:
+        key = tuple(kids)
+        if key not in self._kids:
+            self._kids[key] = await self._secrets_resolver.get_keys(kids)
+        return self._kids[key]
@@ -0,0 +1,69 @@
+import base64
+import binascii
+import zlib
+from typing import Optional
+
+from didcomm.common.types import JSON_OBJ
+from didcomm.errors import DIDCommValueError
+
+DEFAULT_MAX_DECOMPRESSED_SIZE = 64 * 1024 * 1024
+
+# the compressed message is sent in the body as base64 of zlib data under this key instead of `msg`,
+# so that compression is signalled inside the encrypted plaintext
+COMPRESSED_MSG_KEY = "msg_zlib"
+
+_COMPRESSION_LEVEL = 6
+
+# larger messages are compressed only if their beginning of this size compresses well enough,
+# so that time is not wasted compressing incompressible messages (random or already compressed data)
+_SAMPLE_SIZE = 64 * 1024
+
+
+def message_body(msg: str, compress_threshold: Optional[int] = None) -> JSON_OBJ:
+    """
+    Builds the message body, compressing `msg` if it's at least `compress_threshold` bytes (UTF-8)
+    and the compressed body is smaller.
+
+    :param compress_threshold: min size of `msg` to compress. Not compressed if None.
+    """
+    if compress_threshold is None:
+        return {"msg": msg}
+    data = msg.encode("utf-8")
+    if len(data) < compress_threshold:
+        return {"msg": msg}
+    if len(data) > _SAMPLE_SIZE and not _pays_off(data[:_SAMPLE_SIZE]):
+        return {"msg": msg}
+    compressed = base64.b64encode(zlib.compress(data, _COMPRESSION_LEVEL)).decode("ascii")
+    # JSON escaping is ignored: it can only make the uncompressed body larger
+    if len(compressed) >= len(data):
+        return {"msg": msg}
+    return {COMPRESSED_MSG_KEY: compressed}
+
+
+def _pays_off(data: bytes) -> bool:
+    # base64 makes compressed data 4/3 larger
+    return len(zlib.compress(data, 1)) * 4 // 3 < len(data)
+
+
+def body_msg(body: JSON_OBJ, max_decompressed_size: int = DEFAULT_MAX_DECOMPRESSED_SIZE) -> str:
+    """
+    Returns `msg` of the message body, decompressing it if it's compressed.
+
+    :param max_decompressed_size: max size of a decompressed `msg` in bytes
+    :raises DIDCommValueError: if the compressed `msg` is invalid or larger than `max_decompressed_size`
+    """
+    if COMPRESSED_MSG_KEY not in body:
+        return body["msg"]
+    try:
+        data = base64.b64decode(body[COMPRESSED_MSG_KEY], validate=True)
+        # decompress one byte more than allowed to tell if the message is too large
+        # without inflating the rest of it
+        decompressor = zlib.decompressobj()
+        msg = decompressor.decompress(data, max_decompressed_size + 1)
+        if len(msg) > max_decompressed_size:
+            raise DIDCommValueError(f"Decompressed message is larger than {max_decompressed_size} bytes")
+        if not decompressor.eof:
+            raise DIDCommValueError("Compressed message is truncated")
+        return msg.decode("utf-8")
+    except (TypeError, binascii.Error, zlib.error, UnicodeDecodeError) as e:
+        raise DIDCommValueError(f"Compressed message is invalid: {e}") from e
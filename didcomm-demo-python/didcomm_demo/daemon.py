@@ -0,0 +1,207 @@
+import asyncio
+import io
+import ipaddress
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, redirect_stdout, redirect_stderr
+from typing import List, Optional, Union, Tuple
+
+import click
+
+Address = Union[str, Tuple[str, int]]
+
+# commands are run in-process and write to the redirected sys.stdout,
+# so all of them are run one by one on a single thread having its own event loop
+_command_executor = ThreadPoolExecutor(
+    max_workers=1,
+    initializer=lambda: asyncio.set_event_loop(asyncio.new_event_loop())
+)
+
+
+def parse_address(address: str) -> Address:
+    """
+    Parses a daemon address: either `host:port` or a Unix socket path.
+    """
+    host, sep, port = address.rpartition(":")
+    if sep and host and port.isdigit():
+        return host, int(port)
+    return address
+
+
+def run_command(args: List[str], input: str = "") -> dict:
+    """
+    Runs a CLI command in the current process.
+
+    :param args: command line arguments, for example `["pack", "hello", "--to", "did:peer:..."]`
+    :param input: stdin of the command, for example JSON lines of `--jsonl` mode. Empty by default.
+    :return: a response with the command's `exit_code`, `output` (stdout) and `error` (stderr)
+    """
+    if args and args[0] == "serve":
+        return {"exit_code": 2, "output": "", "error": "'serve' can not be run by the daemon"}
+    return _command_executor.submit(_run_command, args, input).result()
+
+
+@contextmanager
+def _redirect_stdin(stdin: io.StringIO):
+    stdin, sys.stdin = sys.stdin, stdin
+    try:
+        yield
+    finally:
+        sys.stdin = stdin
+
+
+def _run_command(args: List[str], input: str) -> dict:
+    from didcomm_demo.didcomm_cli import cli
+
+    out, err = io.StringIO(), io.StringIO()
+    # commands never read the daemon's own stdin, which would block the command thread
+    with _redirect_stdin(io.StringIO(input)), redirect_stdout(out), redirect_stderr(err):
+        try:
+            cli.main(args=args, prog_name="didcomm-cli", standalone_mode=False)
+            exit_code = 0
+        except click.exceptions.Exit as e:
+            exit_code = e.exit_code
+        except click.ClickException as e:
+            e.show()
+            exit_code = e.exit_code
+        except click.Abort:
+            exit_code = 1
+        except Exception as e:
+            err.write(f"{type(e).__name__}: {e}\n")
+            exit_code = 1
+    return {"exit_code": exit_code, "output": out.getvalue(), "error": err.getvalue()}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                args = [request["command"]] + [str(a) for a in request.get("args", [])]
+                input = request.get("input") or ""
+                if not isinstance(input, str):
+                    raise TypeError("input must be a string")
+            except (ValueError, KeyError, TypeError) as e:
+                response = {"exit_code": 2, "output": "", "error": f"Invalid request: {e}"}
+            else:
+                response = run_command(args, input)
+            self.wfile.write((json.dumps(response) + "\n").encode())
+            self.wfile.flush()
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+    class _ThreadingUnixStreamServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+def create_server(address: Address) -> socketserver.BaseServer:
+    """
+    Creates a server running CLI commands sent as JSON lines:
+    `{"command": "pack", "args": ["hello", "--to", "did:peer:..."]}`.
+    Every request gets a JSON line response: `{"exit_code": 0, "output": "...", "error": ""}`.
+
+    Clients are not authenticated and can use all the secrets, so a Unix socket is accessible by its owner only
+    and a TCP port is bound to a loopback address only.
+
+    :param address: a Unix socket path or a `(host, port)` tuple with a loopback host
+    :raises ValueError: if the host is not a loopback address or the path exists and is not a socket
+    """
+    if isinstance(address, tuple):
+        host, port = address
+        if not ipaddress.ip_address(socket.gethostbyname(host)).is_loopback:
+            raise ValueError(f"The daemon has no authentication, so it listens on a loopback address only, not {host}")
+        return _ThreadingTCPServer(address, _RequestHandler)
+    try:
+        mode = os.lstat(address).st_mode
+    except FileNotFoundError:
+        pass
+    else:
+        # a socket left by a previous run is replaced, anything else is kept
+        if not stat.S_ISSOCK(mode):
+            raise ValueError(f"{address} exists and is not a socket")
+        os.remove(address)
+    # the socket is created accessible by its owner only
+    umask = os.umask(0o077)
+    try:
+        server = _ThreadingUnixStreamServer(address, _RequestHandler)
+    finally:
+        os.umask(umask)
+    os.chmod(address, 0o600)
+    return server
+
+
+class DaemonCommandError(Exception):
+    def __init__(self, exit_code: int, output: str, error: str):
+        super().__init__(f"Command failed with exit code {exit_code}: {error or output}")
+        self.exit_code = exit_code
+        self.output = output
+        self.error = error
+
+
+class DaemonClient:
+    """
+    A client of `didcomm-cli serve` reusing one connection for all commands.
+    """
+
+    def __init__(self, address: Union[str, Address]) -> None:
+        self.address = parse_address(address) if isinstance(address, str) else address
+        self._sock = None
+        self._file = None
+
+    def _connect(self):
+        if isinstance(self.address, tuple):
+            self._sock = socket.create_connection(self.address)
+        else:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.connect(self.address)
+        self._file = self._sock.makefile("rwb")
+
+    def call(self, command: str, *args: str, input: Optional[str] = None) -> str:
+        """
+        Runs a command on the daemon.
+
+        :param input: stdin of the command. Empty if not set.
+        :return: the command's output
+        :raises DaemonCommandError: if the command exits with a non-zero code
+        """
+        if self._sock is None:
+            self._connect()
+        request = {"command": command, "args": list(args)}
+        if input is not None:
+            request["input"] = input
+        self._file.write((json.dumps(request) + "\n").encode())
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            self.close()
+            raise ConnectionError("The daemon closed the connection")
+        response = json.loads(line)
+        if response["exit_code"] != 0:
+            raise DaemonCommandError(response["exit_code"], response["output"], response["error"])
+        return response["output"]
+
+    def close(self):
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+            self._sock = None
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
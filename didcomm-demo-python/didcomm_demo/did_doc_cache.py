@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from didcomm.common.types import DID
+from didcomm.did_doc.did_doc import DIDDoc
+
+DEFAULT_DID_DOC_CACHE_SIZE = 4096
+
+
+@dataclass(frozen=True)
+class DIDDocCacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    max_size: int
+
+
+class DIDDocCache:
+    """
+    A size-bounded LRU cache of resolved DID Docs keyed by DID.
+
+    Peer DIDs (numalgo 0 and 2) are self-certifying and immutable,
+    so a resolved DID Doc never needs to be invalidated - only evicted.
+    The cache can be shared between threads and coroutines.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_DID_DOC_CACHE_SIZE) -> None:
+        if max_size <= 0:
+            raise ValueError(f"max_size must be positive: {max_size}")
+        self.max_size = max_size
+        self._did_docs = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, did: DID) -> Optional[DIDDoc]:
+        with self._lock:
+            did_doc = self._did_docs.get(did)
+            if did_doc is None:
+                self._misses += 1
+                return None
+            self._did_docs.move_to_end(did)
+            self._hits += 1
+            return did_doc
+
+    def put(self, did: DID, did_doc: DIDDoc):
+        with self._lock:
+            self._did_docs[did] = did_doc
+            self._did_docs.move_to_end(did)
+            while len(self._did_docs) > self.max_size:
+                self._did_docs.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._did_docs.clear()
+
+    def stats(self) -> DIDDocCacheStats:
+        with self._lock:
+            return DIDDocCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size=len(self._did_docs),
+                max_size=self.max_size
+            )
+
+    def __len__(self):
+        return len(self._did_docs)
@@ -0,0 +1,264 @@
+import hashlib
+import json
+import os
+import sqlite3
+import stat
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from didcomm.did_doc.did_doc import DIDDoc
+
+DEFAULT_DID_DOC_DISK_CACHE_SIZE = 64 * 1024 * 1024
+DID_DOC_DISK_CACHE_FILE = "did_docs.db"
+
+# kind of the cached value for DIDDoc objects; DID Doc JSON is cached by the peer DID format name
+_DIDDOC = "didcomm"
+
+# last use time of a cached value is updated at most once per interval, so that reads rarely write
+_TOUCH_INTERVAL = 60
+
+# when the cache is over the max size, least recently used values are evicted down to this fraction of it
+_EVICT_TO = 0.9
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS did_docs "
+    "(key BLOB PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS did_docs_last_used ON did_docs (last_used)",
+    # the total size is kept up to date by triggers, so that it's not summed up on every insert
+    "CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO totals (id, size) VALUES (0, 0)",
+    "CREATE TRIGGER IF NOT EXISTS did_docs_insert AFTER INSERT ON did_docs "
+    "BEGIN UPDATE totals SET size = size + new.size; END",
+    "CREATE TRIGGER IF NOT EXISTS did_docs_delete AFTER DELETE ON did_docs "
+    "BEGIN UPDATE totals SET size = size - old.size; END",
+]
+
+
+@dataclass(frozen=True)
+class DIDDocDiskCacheStats:
+    """
+    Attributes:
+        hits (int): number of values found by this instance
+        misses (int): number of values not found by this instance
+        evictions (int): number of values evicted by this instance
+        size (int): total size of the cached values in bytes (shared by all processes)
+        max_size (int): max total size of the cached values in bytes
+    """
+
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    max_size: int
+
+
+class DIDDocDiskCache:
+    """
+    A persistent size-bounded cache of resolved DID Docs shared by processes.
+
+    Values are kept in an SQLite database (`did_docs.db`) in the given directory,
+    keyed by the SHA-256 hash of the DID and the kind of the value: a `DIDDoc` object
+    (used by `DIDResolverPeerDID`) or a DID Doc JSON in a peer DID format (used by `resolve-peer-did`).
+    Peer DID Docs are a pure function of the DID, so values are never updated, only evicted -
+    least recently used first - when the total size is over `max_size` bytes.
+
+    The database is in WAL mode, so any number of processes can read it while another one writes.
+    Cached DID Docs are used without being resolved again, so the database is accessible by its owner only,
+    in a directory created owner-only or an existing one writable by its owner only.
+
+    :raises ValueError: if the directory or the database is owned by another user,
+                        or the directory is writable by other users
+    """
+
+    def __init__(self, directory: str, max_size: int = DEFAULT_DID_DOC_DISK_CACHE_SIZE) -> None:
+        if max_size <= 0:
+            raise ValueError(f"max_size must be positive: {max_size}")
+        self.directory = str(directory)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # 1. restrict access to the owner; SQLite creates the WAL and shared memory files with the database's mode.
+        # A directory created by the cache is owner-only, an existing one is checked but never changed.
+        try:
+            os.makedirs(self.directory, mode=0o700)
+        except FileExistsError:
+            _check_directory(self.directory)
+        path = os.path.join(self.directory, DID_DOC_DISK_CACHE_FILE)
+        os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+        for file_path in path, path + "-wal", path + "-shm":
+            if os.path.exists(file_path):
+                _restrict_to_owner(file_path, 0o600)
+
+        # 2. open the database
+        conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+        return conn
+
+    def __getstate__(self):
+        return {"directory": self.directory, "max_size": self.max_size}
+
+    def __setstate__(self, state):
+        self.__init__(state["directory"], state["max_size"])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get(self, did: str) -> Optional["DIDDoc"]:
+        value = self._get(_key(_DIDDOC, did))
+        return _did_doc_from_json(value) if value is not None else None
+
+    def put(self, did: str, did_doc: "DIDDoc"):
+        self._put(_key(_DIDDOC, did), _did_doc_to_json(did_doc))
+
+    def get_json(self, did: str, format: str) -> Optional[str]:
+        """
+        :param format: peer DID format name (`jwk` or `multibase`)
+        :return: cached DID Doc JSON or None
+        """
+        return self._get(_key(format, did))
+
+    def put_json(self, did: str, format: str, did_doc_json: str):
+        self._put(_key(format, did), did_doc_json)
+
+    def _get(self, key: bytes) -> Optional[str]:
+        now = int(time.time())
+        with self._lock:
+            row = self._conn.execute("SELECT value, last_used FROM did_docs WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            if now - row[1] >= _TOUCH_INTERVAL:
+                self._conn.execute("UPDATE did_docs SET last_used = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def _put(self, key: bytes, value: str):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN IMMEDIATE")
+                # a value never changes, so a value cached by another process meanwhile is kept
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO did_docs (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, value, len(key) + len(value.encode()), int(time.time()))
+                )
+                size = self._conn.execute("SELECT size FROM totals").fetchone()[0]
+                if size > self.max_size:
+                    self._evict(size)
+
+    def _evict(self, size: int):
+        target = self.max_size * _EVICT_TO
+        rows = self._conn.execute("SELECT key, size FROM did_docs ORDER BY last_used")
+        keys = []
+        for key, value_size in rows:
+            if size <= target:
+                break
+            keys.append((key,))
+            size -= value_size
+        self._conn.executemany("DELETE FROM did_docs WHERE key = ?", keys)
+        self._evictions += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM did_docs")
+
+    def stats(self) -> DIDDocDiskCacheStats:
+        with self._lock:
+            size = self._conn.execute("SELECT size FROM totals").fetchone()[0]
+            return DIDDocDiskCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size=size,
+                max_size=self.max_size
+            )
+
+
+def resolve_peer_did_json(did: str, format: str, disk_cache: Optional[DIDDocDiskCache] = None) -> str:
+    """
+    Resolves a peer DID to a DID Doc JSON by the peer DID lib, looking it up in the disk cache first if set.
+
+    :param format: peer DID format name (`jwk` or `multibase`)
+    :raises MalformedPeerDIDError: if the peer DID is not valid
+    """
+    from peerdid import peer_did
+    from peerdid.types import VerificationMaterialFormatPeerDID
+
+    format = format.lower()
+    did_doc_json = disk_cache.get_json(did, format) if disk_cache is not None else None
+    if did_doc_json is None:
+        did_doc_json = peer_did.resolve_peer_did(did, format=VerificationMaterialFormatPeerDID[format.upper()])
+        if disk_cache is not None:
+            disk_cache.put_json(did, format, did_doc_json)
+    return did_doc_json
+
+
+def _check_directory(path: str):
+    st = os.stat(path)
+    if not stat.S_ISDIR(st.st_mode):
+        raise ValueError(f"DID Doc cache {path} is not a directory")
+    if st.st_uid != os.getuid():
+        raise ValueError(f"DID Doc cache {path} is owned by another user")
+    if st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise ValueError(f"DID Doc cache {path} is writable by other users")
+
+
+def _restrict_to_owner(path: str, mode: int):
+    if os.stat(path).st_uid != os.getuid():
+        raise ValueError(f"DID Doc cache {path} is owned by another user")
+    os.chmod(path, mode)
+
+
+def _key(kind: str, did: str) -> bytes:
+    return hashlib.sha256(f"{kind}\n{did}".encode()).digest()
+
+
+def _did_doc_to_json(did_doc: "DIDDoc") -> str:
+    return json.dumps([
+        did_doc.did,
+        did_doc.key_agreement_kids,
+        did_doc.authentication_kids,
+        [
+            [m.id, m.type.value, m.controller, m.verification_material.format.value, m.verification_material.value]
+            for m in did_doc.verification_methods
+        ],
+        [[s.id, s.service_endpoint, s.routing_keys, s.accept] for s in did_doc.didcomm_services]
+    ], separators=(",", ":"))
+
+
+def _did_doc_from_json(value: str) -> "DIDDoc":
+    from didcomm.common.types import VerificationMethodType, VerificationMaterial, VerificationMaterialFormat
+    from didcomm.did_doc.did_doc import DIDDoc, VerificationMethod, DIDCommService
+
+    did, key_agreement_kids, authentication_kids, verification_methods, services = json.loads(value)
+    return DIDDoc(
+        did=did,
+        key_agreement_kids=key_agreement_kids,
+        authentication_kids=authentication_kids,
+        verification_methods=[
+            VerificationMethod(
+                id=id,
+                type=VerificationMethodType(type),
+                controller=controller,
+                verification_material=VerificationMaterial(format=VerificationMaterialFormat(format), value=value)
+            )
+            for id, type, controller, format, value in verification_methods
+        ],
+        didcomm_services=[
+            DIDCommService(id=id, service_endpoint=service_endpoint, routing_keys=routing_keys, accept=accept)
+            for id, service_endpoint, routing_keys, accept in services
+        ]
+    )
@@ -5,42 +5,165 @@ from didcomm.common.types import DID, VerificationMethodType, VerificationMateri
 from didcomm.did_doc.did_doc import DIDDoc, VerificationMethod, DIDCommService
 from didcomm.did_doc.did_resolver import DIDResolver
 from peerdid import peer_did
-from peerdid.core.did_doc_types import DIDCommServicePeerDID
+from peerdid.core.did_doc_types import DIDCommServicePeerDID, SERVICE_ID, SERVICE_TYPE, SERVICE_ENDPOINT, \
+    SERVICE_ROUTING_KEYS, SERVICE_ACCEPT, SERVICE_DIDCOMM_MESSAGING
+from peerdid.core.multibase import from_base58_multibase
+from peerdid.core.multicodec import from_multicodec, Codec
+from peerdid.core.peer_did_helper import Numalgo2Prefix, decode_service
+from peerdid.core.utils import urlsafe_b64encode
+from peerdid.core.validation import validate_raw_key_length
 from peerdid.did_doc import DIDDocPeerDID
+from peerdid.errors import MalformedPeerDIDError
 from peerdid.types import VerificationMaterialFormatPeerDID
 
+from didcomm_demo.did_doc_cache import DIDDocCache
+from didcomm_demo.did_doc_disk_cache import DIDDocDiskCache
+
+_JWK_CRV = {Codec.X25519: "X25519", Codec.ED25519: "Ed25519"}
+
 
 class DIDResolverPeerDID(DIDResolver):
 
+    def __init__(self, cache: Optional[DIDDocCache] = None, disk_cache: Optional[DIDDocDiskCache] = None) -> None:
+        """
+        :param cache: optional in-memory cache, looked up first
+        :param disk_cache: optional on-disk cache shared by processes, looked up on in-memory cache misses
+        """
+        self.cache = cache
+        self.disk_cache = disk_cache
+
     async def resolve(self, did: DID) -> Optional[DIDDoc]:
-        # request DID Doc in JWK format
-        did_doc_json = peer_did.resolve_peer_did(did, format=VerificationMaterialFormatPeerDID.JWK)
-        did_doc = DIDDocPeerDID.from_json(did_doc_json)
-
-        return DIDDoc(
-            did=did_doc.did,
-            key_agreement_kids=did_doc.agreement_kids,
-            authentication_kids=did_doc.auth_kids,
-            verification_methods=[
-                VerificationMethod(
-                    id=m.id,
-                    type=VerificationMethodType.JSON_WEB_KEY_2020,
-                    controller=m.controller,
-                    verification_material=VerificationMaterial(
-                        format=VerificationMaterialFormat.JWK,
-                        value=json.dumps(m.ver_material.value)
-                    )
-                )
-                for m in did_doc.authentication + did_doc.key_agreement
-            ],
-            didcomm_services=[
-                DIDCommService(
-                    id=s.id,
-                    service_endpoint=s.service_endpoint,
-                    routing_keys=s.routing_keys,
-                    accept=s.accept
+        if self.cache is None:
+            return self._resolve_from_disk_cache(did)
+
+        did_doc = self.cache.get(did)
+        if did_doc is None:
+            did_doc = self._resolve_from_disk_cache(did)
+            self.cache.put(did, did_doc)
+        return did_doc
+
+    def _resolve_from_disk_cache(self, did: DID) -> DIDDoc:
+        if self.disk_cache is None:
+            return self._resolve(did)
+
+        did_doc = self.disk_cache.get(did)
+        if did_doc is None:
+            did_doc = self._resolve(did)
+            self.disk_cache.put(did, did_doc)
+        return did_doc
+
+    @staticmethod
+    def _resolve(did: DID) -> DIDDoc:
+        return resolve_peer_did_doc(did)
+
+
+def resolve_peer_did_doc(did: DID) -> DIDDoc:
+    """
+    Resolves a numalgo 0 or 2 peer DID to a DID Doc with keys in JWK format.
+
+    The peer DID is decoded straight into the DID Doc without building and parsing the DID Doc JSON
+    as `peer_did.resolve_peer_did` does. The result is equal to the result of `_resolve_peer_did_doc_from_json`.
+
+    :raises MalformedPeerDIDError: if the peer DID is not valid
+    """
+    if not peer_did.is_peer_did(did):
+        raise MalformedPeerDIDError("Does not match peer DID regexp")
+
+    # 1. decode keys and the encoded service
+    authentication, key_agreement, service = [], [], ""
+    if did[9] == "0":
+        authentication.append(_verification_method(did, did[10:], Codec.ED25519))
+    else:
+        for key in did[11:].split("."):
+            prefix = key[0]
+            if prefix == Numalgo2Prefix.SERVICE.value:
+                service = key[1:]
+            elif prefix == Numalgo2Prefix.AUTHENTICATION.value:
+                authentication.append(_verification_method(did, key[1:], Codec.ED25519))
+            elif prefix == Numalgo2Prefix.KEY_AGREEMENT.value:
+                key_agreement.append(_verification_method(did, key[1:], Codec.X25519))
+            else:
+                raise MalformedPeerDIDError("Unknown prefix: {}.".format(prefix))
+
+    # 2. decode the service
+    try:
+        services = decode_service(service, did)
+    except (ValueError, TypeError) as e:
+        raise MalformedPeerDIDError("Invalid service") from e
+
+    return DIDDoc(
+        did=did,
+        key_agreement_kids=[m.id for m in key_agreement],
+        authentication_kids=[m.id for m in authentication],
+        verification_methods=authentication + key_agreement,
+        didcomm_services=[
+            DIDCommService(
+                id=s[SERVICE_ID],
+                service_endpoint=s.get(SERVICE_ENDPOINT),
+                # omitted from services without routing keys
+                routing_keys=s.get(SERVICE_ROUTING_KEYS) or [],
+                accept=s.get(SERVICE_ACCEPT) or []
+            )
+            for s in services or []
+            if s and s.get(SERVICE_TYPE) == SERVICE_DIDCOMM_MESSAGING
+        ]
+    )
+
+
+def _verification_method(did: DID, multibase: str, codec: Codec) -> VerificationMethod:
+    try:
+        encnumbasis, value = from_base58_multibase(multibase)
+        public_key, key_codec = from_multicodec(value)
+        validate_raw_key_length(public_key)
+    except (ValueError, TypeError) as e:
+        raise MalformedPeerDIDError("Invalid key {}".format(multibase)) from e
+    if key_codec != codec:
+        raise MalformedPeerDIDError("Invalid key {}".format(multibase))
+
+    # the same text as json.dumps of the JWK dict (the base64url value needs no escaping)
+    jwk = '{{"kty": "OKP", "crv": "{}", "x": "{}"}}'.format(
+        _JWK_CRV[codec], urlsafe_b64encode(public_key).decode("utf-8")
+    )
+    return VerificationMethod(
+        id=did + "#" + encnumbasis,
+        type=VerificationMethodType.JSON_WEB_KEY_2020,
+        controller=did,
+        verification_material=VerificationMaterial(format=VerificationMaterialFormat.JWK, value=jwk)
+    )
+
+
+def _resolve_peer_did_doc_from_json(did: DID) -> DIDDoc:
+    # resolution through the DID Doc JSON built by the peer DID lib;
+    # kept as the reference for `resolve_peer_did_doc` in tests and benchmarks
+
+    # request DID Doc in JWK format
+    did_doc_json = peer_did.resolve_peer_did(did, format=VerificationMaterialFormatPeerDID.JWK)
+    did_doc = DIDDocPeerDID.from_json(did_doc_json)
+
+    return DIDDoc(
+        did=did_doc.did,
+        key_agreement_kids=did_doc.agreement_kids,
+        authentication_kids=did_doc.auth_kids,
+        verification_methods=[
+            VerificationMethod(
+                id=m.id,
+                type=VerificationMethodType.JSON_WEB_KEY_2020,
+                controller=m.controller,
+                verification_material=VerificationMaterial(
+                    format=VerificationMaterialFormat.JWK,
+                    value=json.dumps(m.ver_material.value)
                 )
-                for s in did_doc.service
-                if isinstance(s, DIDCommServicePeerDID)
-            ] if did_doc.service else []
-        )
+            )
+            for m in did_doc.authentication + did_doc.key_agreement
+        ],
+        didcomm_services=[
+            DIDCommService(
+                id=s.id,
+                service_endpoint=s.service_endpoint,
+                routing_keys=s.routing_keys or [],
+                accept=s.accept or []
+            )
+            for s in did_doc.service
+            if isinstance(s, DIDCommServicePeerDID)
+        ] if did_doc.service else []
+    )
@@ -1,23 +1,224 @@
+import json
+import sys
+import time
+from typing import Iterator, Optional, TYPE_CHECKING
+
 import click
-from didcomm.errors import DIDCommError
-from didcomm.pack_encrypted import PackEncryptedConfig
-from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
-from peerdid.errors import MalformedPeerDIDError
-from peerdid.types import VerificationMaterialFormatPeerDID
 
-from didcomm_demo.didcomm_demo import DIDCommDemo
+# Only lightweight modules are imported on startup. Each command imports what it needs,
+# so that for example `--help` and `resolve-peer-did` don't load crypto libraries or secrets.
+from didcomm_demo import IMPORT_STARTED
+from didcomm_demo.import_profiler import ImportProfiler
+from didcomm_demo.jsonl import DEFAULT_MAX_IN_FLIGHT
+from didcomm_demo.secrets_store import SecretsStore
 
-secrets_resolver = SecretsResolverDemo()
+if TYPE_CHECKING:
+    from didcomm.secrets.secrets_resolver_editable import SecretsResolverEditable
+    from didcomm_demo.did_doc_disk_cache import DIDDocDiskCache
+    from didcomm_demo.didcomm_demo import DIDCommDemo
+    from didcomm_demo.instrumentation import Instrumentation
+    from didcomm_demo.replay import ReplayDetector
+    from didcomm_demo.transport import HTTPTransport
 
+# secrets are loaded on first use
+secrets_resolver = None
+_secrets_store = SecretsStore.JSON
+_instrumentation = None
+_did_doc_cache_dir = None
+_did_doc_disk_cache = None
+_max_decompressed_size = None
+_replay_detector = None
+_transport = None
+_demo = None
 
-def set_secrets_resolver(resolver: SecretsResolverDemo):
-    global secrets_resolver
+
+def set_secrets_resolver(resolver: "SecretsResolverEditable"):
+    global secrets_resolver, _demo
     secrets_resolver = resolver
+    _demo = None
+
+
+def set_secrets_store(store: SecretsStore):
+    """
+    Sets the store type to load secrets from on first use.
+    """
+    global _secrets_store
+    _secrets_store = store
+    set_secrets_resolver(None)
+
+
+def set_instrumentation(instrumentation: Optional["Instrumentation"]):
+    global _instrumentation, _demo
+    _instrumentation = instrumentation
+    _demo = None
+
+
+def set_did_doc_cache_dir(directory: Optional[str]):
+    """
+    Sets the directory of the on-disk DID Doc cache. The cache is not used if None.
+    """
+    global _did_doc_cache_dir, _did_doc_disk_cache, _demo
+    _did_doc_cache_dir = directory
+    _did_doc_disk_cache = None
+    _demo = None
+
+
+def set_max_decompressed_size(size: Optional[int]):
+    """
+    Sets the max size of a decompressed message accepted by unpack. The library's default is used if None.
+    """
+    global _max_decompressed_size, _demo
+    _max_decompressed_size = size
+    _demo = None
+
+
+def set_replay_detector(detector: Optional["ReplayDetector"]):
+    """
+    Sets the detector of replayed messages used by unpack. Replays are not detected if None.
+    """
+    global _replay_detector, _demo
+    _replay_detector = detector
+    _demo = None
+
+
+def set_transport(transport: Optional["HTTPTransport"]):
+    """
+    Sets the transport of sent messages. A transport with default settings is created on first send if None.
+    """
+    global _transport
+    _transport = transport
+    # unlike other settings, doesn't need a new demo instance, so that cached DID Docs are kept
+    if _demo is not None:
+        _demo.transport = transport
+
+
+def get_did_doc_disk_cache() -> Optional["DIDDocDiskCache"]:
+    global _did_doc_disk_cache
+    if _did_doc_disk_cache is None and _did_doc_cache_dir is not None:
+        from didcomm_demo.did_doc_disk_cache import DIDDocDiskCache
+        _did_doc_disk_cache = DIDDocDiskCache(_did_doc_cache_dir)
+    return _did_doc_disk_cache
+
+
+def get_secrets_resolver() -> "SecretsResolverEditable":
+    global secrets_resolver
+    if secrets_resolver is None:
+        from didcomm_demo.secrets_store import create_secrets_resolver
+        secrets_resolver = create_secrets_resolver(_secrets_store)
+    return secrets_resolver
+
+
+def get_demo() -> "DIDCommDemo":
+    # the instance is reused by all commands run in the same process (see `serve`),
+    # so that resolved DID Docs stay cached between commands
+    global _demo
+    if _demo is None:
+        from didcomm_demo.compression import DEFAULT_MAX_DECOMPRESSED_SIZE
+        from didcomm_demo.didcomm_demo import DIDCommDemo
+        _demo = DIDCommDemo(get_secrets_resolver(), instrumentation=_instrumentation,
+                            did_doc_disk_cache=get_did_doc_disk_cache(),
+                            max_decompressed_size=_max_decompressed_size or DEFAULT_MAX_DECOMPRESSED_SIZE,
+                            replay_detector=_replay_detector, transport=_transport)
+    return _demo
+
+
+def _jsonl_options(f):
+    f = click.option('--max-in-flight', default=DEFAULT_MAX_IN_FLIGHT,
+                     help='Max number of JSON lines requests processed at a time')(f)
+    f = click.option('--jsonl', '--stdin', 'jsonl', is_flag=True, default=False,
+                     help='Read newline-delimited JSON requests from stdin '
+                          'and print a JSON result per line instead of processing a single argument')(f)
+    return f
+
+
+def _packed_msg(request) -> str:
+    packed_msg = request["packed_msg"]
+    return packed_msg if isinstance(packed_msg, str) else json.dumps(packed_msg)
+
+
+def _precheck_option(f):
+    return click.option('--precheck', is_flag=True, default=False,
+                        help='Inspect messages first and reject invalid ones or ones encrypted for keys '
+                             'without secrets before decryption')(f)
+
+
+def _recipients(to):
+    if not to:
+        return None
+    # a single receiver is passed as a string, so that the message is packed by the DIDComm library
+    return to[0] if len(to) == 1 else list(to)
+
+
+def _run_jsonl(handler, max_in_flight):
+    from didcomm_demo.jsonl import run_jsonl
+
+    run_jsonl(sys.stdin, handler, click.echo, max_in_flight=max_in_flight)
 
 
 @click.group()
-def cli():
-    pass
+@click.option('--secrets-store', type=click.Choice([s.value for s in SecretsStore], case_sensitive=False),
+              default=None,
+              help='Secrets store type. A JSON file (secrets.json) by default.')
+@click.option('--did-doc-cache', 'did_doc_cache_dir', envvar='DIDCOMM_DID_DOC_CACHE', default=None,
+              type=click.Path(file_okay=False),
+              help='Directory of a persistent DID Doc cache shared by CLI processes. '
+                   'Can be set by DIDCOMM_DID_DOC_CACHE environment variable. Not used by default.')
+@click.option('--max-decompressed-size', default=None, type=click.IntRange(min=1),
+              help='Max size in bytes of a compressed message after decompression. 64 MB by default.')
+@click.option('--replay-window', default=None, type=click.FloatRange(min=0, min_open=True),
+              help='Reject messages unpacked again within this number of seconds (by message ID and sender). '
+                   'Replays are not detected by default.')
+@click.option('--replay-state', envvar='DIDCOMM_REPLAY_STATE', default=None, type=click.Path(dir_okay=False),
+              help='File keeping unpacked message IDs between CLI runs for replay detection '
+                   '(with a one hour window unless --replay-window is set). Can be used by one process at a time. '
+                   'Can be set by DIDCOMM_REPLAY_STATE environment variable.')
+@click.option('--startup-profile', is_flag=True, default=False,
+              help='Print an import time breakdown to stderr when the command finishes')
+@click.option('--timings', is_flag=True, default=False,
+              help='Print per-stage timings of pack and unpack operations to stderr when the command finishes')
+@click.pass_context
+def cli(ctx, secrets_store, did_doc_cache_dir, max_decompressed_size, replay_window, replay_state, startup_profile,
+        timings):
+    if secrets_store:
+        set_secrets_store(SecretsStore(secrets_store.lower()))
+    if did_doc_cache_dir:
+        set_did_doc_cache_dir(did_doc_cache_dir)
+    if max_decompressed_size:
+        set_max_decompressed_size(max_decompressed_size)
+    if replay_window or replay_state:
+        from didcomm_demo.replay import ReplayDetector, DEFAULT_REPLAY_WINDOW
+
+        try:
+            detector = ReplayDetector(window=replay_window or DEFAULT_REPLAY_WINDOW, path=replay_state)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="'--replay-state'")
+        set_replay_detector(detector)
+
+        def close_replay_detector():
+            set_replay_detector(None)
+            detector.close()
+
+        ctx.call_on_close(close_replay_detector)
+    if timings:
+        from didcomm_demo.instrumentation import Instrumentation, MetricsRegistry
+
+        registry = MetricsRegistry()
+        set_instrumentation(Instrumentation([registry]))
+
+        def report_timings():
+            set_instrumentation(None)
+            click.echo(registry.summary() or "No pack or unpack operations", err=True)
+
+        ctx.call_on_close(report_timings)
+    if startup_profile:
+        profiler = ImportProfiler()
+        profiler.install()
+
+        def report():
+            profiler.uninstall()
+            click.echo(profiler.report(IMPORT_STARTED, _startup_imports), err=True)
+
+        ctx.call_on_close(report)
 
 
 @cli.command()
@@ -25,9 +226,30 @@ def cli():
 @click.option('--agreement-keys-count', default=1, help='Number of agreement keys')
 @click.option('--service-endpoint', default=None, help='Optional service endpoint')
 @click.option('--service-routing-key', default=[], multiple=True, help='Optional service routing keys')
-def create_peer_did(auth_keys_count, agreement_keys_count, service_endpoint, service_routing_key):
+@_jsonl_options
+def create_peer_did(auth_keys_count, agreement_keys_count, service_endpoint, service_routing_key, jsonl,
+                    max_in_flight):
+    """
+    Creates a new peer DID.
+
+    In JSON lines mode, a request may have `auth_keys_count`, `agreement_keys_count`, `service_endpoint`
+    and `service_routing_keys` fields (the options' values are used as defaults); a result has a `did` field.
+    """
+    demo = get_demo()
+    if jsonl:
+        async def handle(request):
+            did = await demo.create_peer_did_async(
+                auth_keys_count=request.get("auth_keys_count", auth_keys_count),
+                agreement_keys_count=request.get("agreement_keys_count", agreement_keys_count),
+                service_endpoint=request.get("service_endpoint", service_endpoint),
+                service_routing_keys=request.get("service_routing_keys", list(service_routing_key))
+            )
+            return {"did": did}
+
+        _run_jsonl(handle, max_in_flight)
+        return
+
     click.echo()
-    demo = DIDCommDemo(secrets_resolver)
     try:
         did = demo.create_peer_did(
             auth_keys_count=auth_keys_count,
@@ -42,39 +264,182 @@ def create_peer_did(auth_keys_count, agreement_keys_count, service_endpoint, ser
 
 
 @cli.command()
-@click.argument('did')
+@click.option('--count', required=True, type=click.IntRange(min=1), help='Number of peer DIDs to create')
+@click.option('--output', type=click.File('w'), default='-', help='Output JSONL file. stdout by default.')
+@click.option('--workers', default=None, type=int, help='Number of worker processes. The number of CPUs by default.')
+@click.option('--auth-keys-count', default=1, help='Number of authentication keys')
+@click.option('--agreement-keys-count', default=1, help='Number of agreement keys')
+@click.option('--service-endpoint', default=None, help='Optional service endpoint')
+@click.option('--service-routing-key', default=[], multiple=True, help='Optional service routing keys')
+def create_peer_dids(count, output, workers, auth_keys_count, agreement_keys_count, service_endpoint,
+                     service_routing_key):
+    """
+    Creates many peer DIDs and prints a JSON object with a `did` field per line.
+    """
+    demo = get_demo()
+    start = time.perf_counter()
+    try:
+        dids = demo.create_peer_dids(
+            count,
+            auth_keys_count=auth_keys_count,
+            agreement_keys_count=agreement_keys_count,
+            service_endpoint=service_endpoint,
+            service_routing_keys=list(service_routing_key),
+            workers=workers
+        )
+    except (ValueError, TypeError) as e:
+        click.echo(f"{e}", err=True)
+        return
+    elapsed = time.perf_counter() - start
+    for did in dids:
+        output.write(json.dumps({"did": did}) + "\n")
+    click.echo(f"Created {len(dids)} peer DIDs in {elapsed:.2f}s ({len(dids) / elapsed:.1f} DIDs/sec)", err=True)
+
+
+@cli.command()
+@click.argument('did', required=False)
 @click.option('--format', type=click.Choice(['jwk', 'multibase'], case_sensitive=False),
               default="jwk",
               help='DID Doc format (JWK or Multibase)')
-def resolve_peer_did(did, format):
+@_jsonl_options
+def resolve_peer_did(did, format, jsonl, max_in_flight):
+    """
+    Resolves a peer DID to a DID Doc.
+
+    In JSON lines mode, a request has a `did` and an optional `format` field;
+    a result has a `did_doc` field.
+    """
+    # peer DIDs are resolved by peerdid only, without loading didcomm and secrets
+    from peerdid.errors import MalformedPeerDIDError
+    from didcomm_demo.did_doc_disk_cache import resolve_peer_did_json
+
+    if jsonl:
+        async def handle(request):
+            did_doc_json = resolve_peer_did_json(request["did"], request.get("format", format),
+                                                 get_did_doc_disk_cache())
+            return {"did_doc": json.loads(did_doc_json)}
+
+        _run_jsonl(handle, max_in_flight)
+        return
+    if did is None:
+        raise click.UsageError("Missing argument 'DID'.")
+
     click.echo()
-    format = VerificationMaterialFormatPeerDID.JWK if format == "jwk" else VerificationMaterialFormatPeerDID.MULTIBASE
     try:
-        did_doc_json = DIDCommDemo.resolve_peer_did(did, format)
+        did_doc_json = resolve_peer_did_json(did, format, get_did_doc_disk_cache())
         click.echo(f"{did_doc_json}")
     except MalformedPeerDIDError as e:
         click.echo(f"{e}")
     click.echo()
 
 
+def _read_dids(input) -> Iterator[str]:
+    # plain DIDs or JSON objects with a `did` field (as printed by `create-peer-dids`);
+    # anything else is passed on as is and fails to resolve
+    for line in input:
+        line = line.strip()
+        if line.startswith("{"):
+            try:
+                line = json.loads(line)["did"]
+            except (ValueError, KeyError, TypeError):
+                pass
+        if line:
+            yield line
+
+
 @cli.command()
-@click.argument('msg')
-@click.option('--to', required=True, help="Receiver's DID")
+@click.argument('input', type=click.File('r'), default='-')
+@click.option('--output', type=click.File('w'), default='-', help='Output file. stdout by default.')
+@click.option('--format', type=click.Choice(['jwk', 'multibase'], case_sensitive=False),
+              default="jwk",
+              help='DID Doc format (JWK or Multibase)')
+@click.option('--workers', default=None, type=int, help='Number of worker processes. The number of CPUs by default.')
+def resolve_peer_dids(input, output, format, workers):
+    """
+    Resolves peer DIDs from a file (stdin by default); one DID
+    (or a JSON object with a `did` field) per line.
+    Prints a JSON object per DID with the `index` of the input line (starting from 0),
+    the `did` and either `did_doc` or `error` fields.
+    """
+    from didcomm_demo.jsonl import error_to_str
+    from didcomm_demo.parallel import resolve_peer_dids as resolve
+
+    # the DIDs being resolved by index, to print them with results coming in completion order
+    pending = {}
+
+    def read():
+        for index, did in enumerate(_read_dids(input)):
+            pending[index] = did
+            yield did
+
+    start = time.perf_counter()
+    count = errors = 0
+    for res in resolve(read(), format=format, workers=workers, disk_cache=get_did_doc_disk_cache()):
+        out = {"index": res.index, "did": pending.pop(res.index)}
+        if res.ok:
+            out["did_doc"] = json.loads(res.result)
+        else:
+            out["error"] = error_to_str(res.error)
+            errors += 1
+        output.write(json.dumps(out) + "\n")
+        count += 1
+    elapsed = time.perf_counter() - start
+    click.echo(f"Resolved {count - errors} of {count} peer DIDs in {elapsed:.2f}s "
+               f"({count / elapsed:.1f} DIDs/sec)", err=True)
+
+
+@cli.command()
+@click.argument('msg', required=False)
+@click.option('--to', multiple=True, help="Receiver's DID. Can be repeated to pack a message for many receivers.")
 @click.option('--from', 'frm', default=None, help="Sender's DID. Anonymous encryption is used if not set.")
 @click.option('--sign-from', default=None,
               help="Sender's DID for optional signing. The message is not signed if not set.")
 @click.option('--protect-sender-id', default=True,
               help="Whether the sender's ID (DID) must be hidden. True by default.")
-def pack(msg, to, frm, sign_from, protect_sender_id):
+@click.option('--compress-threshold', default=None, type=click.IntRange(min=0),
+              help='Min size in bytes of a message to compress it with zlib before encryption. '
+                   'Messages are not compressed by default.')
+@_jsonl_options
+def pack(msg, to, frm, sign_from, protect_sender_id, compress_threshold, jsonl, max_in_flight):
+    """
+    Packs a message.
+
+    In JSON lines mode, a request has `msg`, `to` (a DID or a list of DIDs) and optional `from`, `sign_from`,
+    `protect_sender_id` and `compress_threshold` fields (the options' values are used as defaults);
+    a result has a `packed_msg` field.
+    """
+    from didcomm.errors import DIDCommError
+    from didcomm.pack_encrypted import PackEncryptedConfig
+
+    demo = get_demo()
+    if jsonl:
+        async def handle(request):
+            res = await demo.pack_async(
+                msg=request["msg"],
+                to=request.get("to", _recipients(to)),
+                frm=request.get("from", frm),
+                sign_frm=request.get("sign_from", sign_from),
+                config=PackEncryptedConfig(protect_sender_id=request.get("protect_sender_id", protect_sender_id)),
+                compress_threshold=request.get("compress_threshold", compress_threshold)
+            )
+            return {"packed_msg": res.packed_msg}
+
+        _run_jsonl(handle, max_in_flight)
+        return
+    if msg is None:
+        raise click.UsageError("Missing argument 'MSG'.")
+    if not to:
+        raise click.UsageError("Missing option '--to'.")
+
     click.echo()
-    demo = DIDCommDemo(secrets_resolver)
     try:
         res = demo.pack(
             msg=msg,
-            to=to,
+            to=_recipients(to),
             frm=frm,
             sign_frm=sign_from,
-            config=PackEncryptedConfig(protect_sender_id=protect_sender_id)
+            config=PackEncryptedConfig(protect_sender_id=protect_sender_id),
+            compress_threshold=compress_threshold
         )
         click.echo(f"{res.packed_msg}")
     except DIDCommError as e:
@@ -83,12 +448,235 @@ def pack(msg, to, frm, sign_from, protect_sender_id):
 
 
 @cli.command()
-@click.argument('msg')
-def unpack(msg):
+@click.argument('msg', required=False)
+@click.option('--to', multiple=True, help="Receiver's DID. Can be repeated to send a message to many receivers.")
+@click.option('--from', 'frm', default=None, help="Sender's DID. Anonymous encryption is used if not set.")
+@click.option('--sign-from', default=None,
+              help="Sender's DID for optional signing. The message is not signed if not set.")
+@click.option('--protect-sender-id', default=True,
+              help="Whether the sender's ID (DID) must be hidden. True by default.")
+@click.option('--compress-threshold', default=None, type=click.IntRange(min=0),
+              help='Min size in bytes of a message to compress it with zlib before encryption. '
+                   'Messages are not compressed by default.')
+@click.option('--retries', default=3, type=click.IntRange(min=0),
+              help='Max number of retries of a message on connection errors and 429, 502, 503 and 504 responses')
+@click.option('--timeout', default=10.0, type=click.FloatRange(min=0, min_open=True),
+              help='Connect and read timeout of a request in seconds')
+@click.option('--max-connections', default=8, type=click.IntRange(min=1),
+              help='Max number of keep-alive connections to a service endpoint at a time')
+@click.option('--stats', is_flag=True, default=False,
+              help='Print request counts and latencies per service endpoint to stderr when the command finishes')
+@_jsonl_options
+def send(msg, to, frm, sign_from, protect_sender_id, compress_threshold, retries, timeout, max_connections, stats,
+         jsonl, max_in_flight):
+    """
+    Packs a message and posts it to the receivers' DIDComm service endpoints over HTTP(S).
+
+    In JSON lines mode, a request has the fields of a `pack` request;
+    a result has a `deliveries` field with the `endpoint`, `status`, `attempts` and `duration` of every delivery.
+    """
+    from didcomm.errors import DIDCommError
+    from didcomm.pack_encrypted import PackEncryptedConfig
+    from didcomm_demo.transport import HTTPTransport
+
+    if not jsonl:
+        if msg is None:
+            raise click.UsageError("Missing argument 'MSG'.")
+        if not to:
+            raise click.UsageError("Missing option '--to'.")
+
+    transport = HTTPTransport(max_connections_per_endpoint=max_connections, max_concurrency=max(max_in_flight, 1),
+                              retries=retries, timeout=timeout)
+    set_transport(transport)
+    demo = get_demo()
+    try:
+        if jsonl:
+            async def handle(request):
+                res = await demo.send_async(
+                    msg=request["msg"],
+                    to=request.get("to", _recipients(to)),
+                    frm=request.get("from", frm),
+                    sign_frm=request.get("sign_from", sign_from),
+                    config=PackEncryptedConfig(protect_sender_id=request.get("protect_sender_id",
+                                                                             protect_sender_id)),
+                    compress_threshold=request.get("compress_threshold", compress_threshold)
+                )
+                return {"deliveries": [delivery.to_dict() for delivery in res.deliveries]}
+
+            _run_jsonl(handle, max_in_flight)
+            return
+
+        click.echo()
+        try:
+            res = demo.send(
+                msg=msg,
+                to=_recipients(to),
+                frm=frm,
+                sign_frm=sign_from,
+                config=PackEncryptedConfig(protect_sender_id=protect_sender_id),
+                compress_threshold=compress_threshold
+            )
+            for delivery in res.deliveries:
+                click.echo(f"Delivered to {delivery.endpoint}: HTTP {delivery.status} "
+                           f"({delivery.attempts} attempt(s), {delivery.duration * 1000:.1f} ms)")
+        except (DIDCommError, ValueError) as e:
+            click.echo(f"{e}")
+        click.echo()
+    finally:
+        set_transport(None)
+        transport.close()
+        if stats:
+            for endpoint_stats in transport.stats().values():
+                click.echo(endpoint_stats.summary(), err=True)
+
+
+@cli.command()
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--to', required=True, multiple=True,
+              help="Receiver's DID. Can be repeated to pack a message for many receivers.")
+@click.option('--from', 'frm', default=None, help="Sender's DID. Anonymous encryption is used if not set.")
+@click.option('--sign-from', default=None,
+              help="Sender's DID for optional signing. The message is not signed if not set.")
+@click.option('--protect-sender-id', default=True,
+              help="Whether the sender's identity needs to be protected during authenticated encryption.")
+@click.option('--media-type', default=None, help="Media type of the file. Guessed by the file name if not set.")
+@click.option('--output', type=click.File('w'), default='-', help='Output file. stdout by default.')
+def pack_file(path, to, frm, sign_from, protect_sender_id, media_type, output):
+    """
+    Packs a message with a file as an attachment and writes the packed message to a file (stdout by default).
+
+    The file is read into memory, not memory-mapped or streamed, and only small files can be packed:
+    every envelope layer base64-encodes the file again and the JOSE library rejects encoded parts over 256000
+    characters, so files over about 60 KB (authcrypt with a protected sender) to 140 KB (anoncrypt) are rejected.
+    """
+    from didcomm.errors import DIDCommError
+    from didcomm.pack_encrypted import PackEncryptedConfig
+
+    try:
+        get_demo().pack_file(
+            path,
+            to=_recipients(to),
+            frm=frm,
+            sign_frm=sign_from,
+            output=output,
+            media_type=media_type,
+            config=PackEncryptedConfig(protect_sender_id=protect_sender_id)
+        )
+        output.write("\n")
+    except DIDCommError as e:
+        click.echo(f"{e}", err=True)
+        sys.exit(1)
+
+
+@cli.command()
+@click.argument('input', type=click.File('r'), default='-')
+@click.option('--output', type=click.File('w'), default='-', help='Output file. stdout by default.')
+@click.option('--concurrency', default=64, help='Max number of messages packed at the same time')
+@click.option('--protect-sender-id', default=True,
+              help="Whether the sender's ID (DID) must be hidden. True by default.")
+@click.option('--compress-threshold', default=None, type=click.IntRange(min=0),
+              help='Min size in bytes of a message to compress it with zlib before encryption. '
+                   'Messages are not compressed by default.')
+def pack_batch(input, output, concurrency, protect_sender_id, compress_threshold):
+    """
+    Packs messages from a JSONL file (stdin by default).
+    Each line is a JSON object with `msg`, `to` (a DID or a list of DIDs) and optional `from` and `sign_from` fields.
+    Prints a JSON object with either `packed_msg` or `error` per line in input order.
+    """
+    from didcomm.pack_encrypted import PackEncryptedConfig
+    from didcomm_demo.jsonl import error_to_str
+
+    items = []
+    # an index in `items` or the error of a line that isn't a valid request, in input order
+    lines = []
+    for line in input:
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            if not isinstance(item, dict):
+                raise ValueError("A request must be a JSON object")
+        except ValueError as e:
+            lines.append(e)
+            continue
+        lines.append(len(items))
+        items.append((item.get("msg"), item.get("to"), item.get("from"), item.get("sign_from")))
+
+    demo = get_demo()
+    results = demo.pack_many(
+        items,
+        concurrency=concurrency,
+        config=PackEncryptedConfig(protect_sender_id=protect_sender_id),
+        compress_threshold=compress_threshold
+    )
+    for line in lines:
+        if isinstance(line, Exception):
+            out = {"error": error_to_str(line)}
+        else:
+            res = results[line]
+            out = {"packed_msg": res.result.packed_msg} if res.ok else {"error": error_to_str(res.error)}
+        output.write(json.dumps(out) + "\n")
+
+
+@cli.command()
+@click.argument('msg', required=False)
+@_jsonl_options
+def inspect(msg, jsonl, max_in_flight):
+    """
+    Inspects a packed message without decrypting it: prints the envelope type, algorithms, recipients' key IDs
+    and those of them having secrets (`held_kids`) as JSON.
+
+    In JSON lines mode, a request has a `packed_msg` field (either a JSON string or an object).
+    """
+    from didcomm.errors import DIDCommError
+
+    demo = get_demo()
+    if jsonl:
+        async def handle(request):
+            info = await demo.inspect_async(_packed_msg(request))
+            return info.to_dict()
+
+        _run_jsonl(handle, max_in_flight)
+        return
+    if msg is None:
+        raise click.UsageError("Missing argument 'MSG'.")
+
+    try:
+        click.echo(json.dumps(demo.inspect(msg).to_dict(), indent=2))
+    except DIDCommError as e:
+        click.echo(f"{e}", err=True)
+        sys.exit(1)
+
+
+@cli.command()
+@click.argument('msg', required=False)
+@_precheck_option
+@_jsonl_options
+def unpack(msg, precheck, jsonl, max_in_flight):
+    """
+    Unpacks a message.
+
+    In JSON lines mode, a request has a `packed_msg` field (either a JSON string or an object);
+    a result has `msg`, `from` and `to` fields.
+    """
+    from didcomm.errors import DIDCommError
+
+    if jsonl:
+        demo = get_demo()
+
+        async def handle(request):
+            initial_msg, frm, to, _ = await demo.unpack_async(_packed_msg(request), precheck=precheck)
+            return {"msg": initial_msg, "from": frm, "to": to}
+
+        _run_jsonl(handle, max_in_flight)
+        return
+    if msg is None:
+        raise click.UsageError("Missing argument 'MSG'.")
+
     click.echo()
     try:
-        demo = DIDCommDemo(secrets_resolver)
-        initial_msg, frm, to, _ = demo.unpack(msg)
+        demo = get_demo()
+        initial_msg, frm, to, _ = demo.unpack(msg, precheck=precheck)
         click.echo()
         if frm:
             click.echo(f"authcrypted '{initial_msg}' from {frm} to {to}")
@@ -99,5 +687,87 @@ def unpack(msg):
     click.echo()
 
 
+@cli.command()
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--output-dir', type=click.Path(file_okay=False), default='.',
+              help='Directory to write attachments to. The current directory by default.')
+def unpack_file(path, output_dir):
+    """
+    Unpacks a message from a file and writes its attachments to files.
+    """
+    from didcomm.errors import DIDCommError
+
+    click.echo()
+    try:
+        initial_msg, frm, to, paths = get_demo().unpack_file(path, output_dir)
+        if frm:
+            click.echo(f"authcrypted '{initial_msg}' from {frm} to {to}")
+        else:
+            click.echo(f"anoncrypted '{initial_msg}' to {to}")
+        for attachment_path in paths:
+            click.echo(f"attachment saved to {attachment_path}")
+    except DIDCommError as e:
+        click.echo(f"{e}")
+    click.echo()
+
+
+@cli.command()
+@click.argument('input', type=click.File('r'), default='-')
+@click.option('--output', type=click.File('w'), default='-', help='Output file. stdout by default.')
+@click.option('--workers', default=None, type=int, help='Number of worker processes. The number of CPUs by default.')
+@_precheck_option
+def unpack_batch(input, output, workers, precheck):
+    """
+    Unpacks messages from a JSONL file (stdin by default); one packed message per line.
+    Prints a JSON object per message as soon as it's unpacked.
+    Each object has the `index` of the input line (starting from 0)
+    and either `msg`, `from` and `to` or `error` fields.
+    """
+    from didcomm_demo.jsonl import error_to_str
+
+    demo = get_demo()
+    packed_msgs = (line for line in input if line.strip())
+    for res in demo.unpack_many(packed_msgs, workers=workers, precheck=precheck):
+        if res.ok:
+            msg, frm, to, _ = res.result
+            out = {"index": res.index, "msg": msg, "from": frm, "to": to}
+        else:
+            out = {"index": res.index, "error": error_to_str(res.error)}
+        output.write(json.dumps(out) + "\n")
+        output.flush()
+
+
+@cli.command()
+@click.option('--socket', 'socket_path', default=None,
+              help='Unix socket path to listen on. The socket is accessible by the current user only.')
+@click.option('--port', default=None, type=int, help='TCP port to listen on at 127.0.0.1')
+def serve(socket_path, port):
+    """
+    Runs a long-living process executing commands sent as JSON lines
+    (`{"command": "pack", "args": [...]}`) over a Unix socket or a TCP port.
+
+    Clients are not authenticated and can use all the secrets,
+    so the TCP port is bound to 127.0.0.1 and accepts local connections only.
+    """
+    from didcomm_demo.daemon import create_server
+
+    if (socket_path is None) == (port is None):
+        raise click.UsageError("Exactly one of --socket or --port must be set")
+    host = "127.0.0.1"
+    address = (host, port) if port is not None else socket_path
+    try:
+        server = create_server(address)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="'--socket'")
+    with server:
+        click.echo(f"Listening on {socket_path or f'{host}:{port}'}", err=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+_startup_imports = time.perf_counter() - IMPORT_STARTED
+
 if __name__ == '__main__':
     cli()
@@ -1,34 +1,114 @@
 import asyncio
+import dataclasses
+import functools
 import json
-from typing import Optional, List
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, List, Iterable, Iterator, TextIO, Tuple, Union, TYPE_CHECKING
 
 from didcomm.common.resolvers import ResolversConfig
 from didcomm.common.types import DID, JSON
 from didcomm.core.utils import id_generator_default, get_did
-from didcomm.message import Message
+from didcomm.errors import DIDCommError, DIDCommValueError, DIDUrlNotFoundError
+from didcomm.message import Attachment, Message
 from didcomm.pack_encrypted import pack_encrypted, PackEncryptedResult, PackEncryptedConfig
-from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+from didcomm.secrets.secrets_resolver import Secret
 from didcomm.secrets.secrets_resolver_editable import SecretsResolverEditable
-from didcomm.secrets.secrets_util import generate_x25519_keys_as_jwk_dict, generate_ed25519_keys_as_jwk_dict, \
-    jwk_to_secret
 from didcomm.unpack import unpack, UnpackResult
 from peerdid import peer_did
-from peerdid.core.did_doc_types import DIDCommServicePeerDID
-from peerdid.did_doc import DIDDocPeerDID
-from peerdid.types import VerificationMaterialFormatPeerDID, VerificationMaterialAgreement, \
-    VerificationMethodTypeAgreement, VerificationMaterialAuthentication, VerificationMethodTypeAuthentication
+from peerdid.types import VerificationMaterialFormatPeerDID
 
+from didcomm_demo.attachments import file_attachment, save_attachment, write_chunked, check_file_size, \
+    MAX_FILE_SIZE, MAX_PACKED_FILE_SIZE, MAX_SEGMENT_LENGTH
+from didcomm_demo.batch import BatchItemResult, DIDResolverMemo, SecretsResolverMemo, DEFAULT_BATCH_CONCURRENCY
+from didcomm_demo.compression import message_body, body_msg, DEFAULT_MAX_DECOMPRESSED_SIZE
+from didcomm_demo.did_doc_cache import DIDDocCache, DEFAULT_DID_DOC_CACHE_SIZE
+from didcomm_demo.did_doc_disk_cache import DIDDocDiskCache
 from didcomm_demo.did_resolver_peer_did import DIDResolverPeerDID
+from didcomm_demo.envelope import EnvelopeInfo, ENVELOPE_ENCRYPTED, parse_envelope
+from didcomm_demo.instrumentation import Instrumentation
+from didcomm_demo.key_pool import KeyPool
+from didcomm_demo.loop_thread import EventLoopThread
+from didcomm_demo.pack_keys import pack_encrypted_many
+from didcomm_demo.parallel import imap_as_completed, init_worker, unpack_in_worker, default_workers_count, \
+    resolve_peer_dids
+from didcomm_demo.peer_did_generator import generate_peer_did
+from didcomm_demo.replay import ReplayDetector, ReplayedMessageError, message_sender
+from didcomm_demo.secrets_store import SecretsStore, create_secrets_resolver
+from didcomm_demo.transport import HTTPTransport, SendResult, DeliveryError
+
+if TYPE_CHECKING:
+    from didcomm_demo.session import DIDCommSession
+
+
+def _generate_peer_did(_, **kwargs):
+    return generate_peer_did(**kwargs)
+
+
+def build_message(msg: str, to: Union[str, List[str]], frm: Optional[str] = None,
+                  attachments: Optional[List[Attachment]] = None,
+                  compress_threshold: Optional[int] = None) -> Message:
+    return Message(
+        body=message_body(msg, compress_threshold=compress_threshold),
+        id=id_generator_default(),
+        type="my-protocol/1.0",
+        frm=frm,
+        to=[to] if isinstance(to, str) else list(to),
+        attachments=attachments,
+    )
 
 
 class DIDCommDemo:
 
-    def __init__(self, secrets_resolver: Optional[SecretsResolverEditable] = None) -> None:
-        self.secrets_resolver = secrets_resolver or SecretsResolverDemo()
+    def __init__(self,
+                 secrets_resolver: Optional[SecretsResolverEditable] = None,
+                 did_doc_cache_size: int = DEFAULT_DID_DOC_CACHE_SIZE,
+                 secrets_store: SecretsStore = SecretsStore.JSON,
+                 instrumentation: Optional[Instrumentation] = None,
+                 key_pool: Optional[KeyPool] = None,
+                 did_doc_disk_cache: Optional[DIDDocDiskCache] = None,
+                 max_decompressed_size: int = DEFAULT_MAX_DECOMPRESSED_SIZE,
+                 replay_detector: Optional[ReplayDetector] = None,
+                 loop_thread: Optional[EventLoopThread] = None,
+                 transport: Optional[HTTPTransport] = None) -> None:
+        """
+        :param secrets_resolver: secrets resolver to store and look up private keys.
+                                 A resolver for `secrets_store` is created if not set.
+        :param did_doc_cache_size: max number of resolved DID Docs kept in the LRU cache.
+                                   The cache is disabled if 0.
+        :param secrets_store: type of the secrets store used if `secrets_resolver` is not set.
+        :param instrumentation: optional instrumentation recording per-stage timings of pack and unpack.
+        :param key_pool: optional pool of pre-generated keys used by `create_peer_did`.
+        :param did_doc_disk_cache: optional on-disk cache of resolved DID Docs shared by processes.
+        :param max_decompressed_size: max size in bytes of a compressed message's `msg` after decompression.
+                                      Larger messages are rejected by `unpack`.
+        :param replay_detector: optional detector of replayed messages.
+                                Messages already unpacked within its window are rejected by `unpack`.
+        :param loop_thread: optional event loop thread running the coroutines of sync methods,
+                            so that they can be called from many threads at once.
+                            An event loop of the calling thread is used if not set.
+        :param transport: transport delivering messages sent by `send`, closed by its owner.
+                          If not set, a transport is created on first send and closed by `close`.
+        """
+        self.secrets_resolver = secrets_resolver or create_secrets_resolver(secrets_store)
+        self.did_doc_cache_size = did_doc_cache_size
+        self.did_doc_cache = DIDDocCache(did_doc_cache_size) if did_doc_cache_size > 0 else None
+        self.did_doc_disk_cache = did_doc_disk_cache
+        self.max_decompressed_size = max_decompressed_size
+        self.replay_detector = replay_detector
+        self.loop_thread = loop_thread
+        self.transport = transport
+        self._own_transport = None
+        self._transport_lock = threading.Lock()
         self.resolvers_config = ResolversConfig(
             secrets_resolver=self.secrets_resolver,
-            did_resolver=DIDResolverPeerDID()
+            did_resolver=DIDResolverPeerDID(cache=self.did_doc_cache, disk_cache=did_doc_disk_cache)
         )
+        self.key_pool = key_pool
+        self.instrumentation = instrumentation
+        if instrumentation is not None:
+            self.resolvers_config = instrumentation.instrument_resolvers(self.resolvers_config)
 
     def create_peer_did(self,
                         auth_keys_count: int = 1,
@@ -36,106 +116,504 @@ class DIDCommDemo:
                         service_endpoint: Optional[str] = None,
                         service_routing_keys: Optional[List[str]] = None
                         ) -> str:
-        # 1. generate keys in JWK format
-        agreem_keys = [generate_x25519_keys_as_jwk_dict() for _ in range(agreement_keys_count)]
-        auth_keys = [generate_ed25519_keys_as_jwk_dict() for _ in range(auth_keys_count)]
-
-        # 2. prepare the keys for peer DID lib
-        agreem_keys_peer_did = [
-            VerificationMaterialAgreement(
-                type=VerificationMethodTypeAgreement.JSON_WEB_KEY_2020,
-                format=VerificationMaterialFormatPeerDID.JWK,
-                value=k[1],
+        return self._run_sync(
+            self.create_peer_did_async(
+                auth_keys_count=auth_keys_count,
+                agreement_keys_count=agreement_keys_count,
+                service_endpoint=service_endpoint,
+                service_routing_keys=service_routing_keys
             )
-            for k in agreem_keys
-        ]
-        auth_keys_peer_did = [
-            VerificationMaterialAuthentication(
-                type=VerificationMethodTypeAuthentication.JSON_WEB_KEY_2020,
-                format=VerificationMaterialFormatPeerDID.JWK,
-                value=k[1],
-            )
-            for k in auth_keys
-        ]
-
-        # 3. generate service
-        service = None
-        if service_endpoint:
-            service = json.dumps(
-                DIDCommServicePeerDID(
-                    id="new-id",
-                    service_endpoint=service_endpoint, routing_keys=service_routing_keys,
-                    accept=["didcomm/v2"]
-                ).to_dict()
+        )
+
+    async def create_peer_did_async(self,
+                                    auth_keys_count: int = 1,
+                                    agreement_keys_count: int = 1,
+                                    service_endpoint: Optional[str] = None,
+                                    service_routing_keys: Optional[List[str]] = None
+                                    ) -> str:
+        did, secrets = generate_peer_did(
+            auth_keys_count=auth_keys_count,
+            agreement_keys_count=agreement_keys_count,
+            service_endpoint=service_endpoint,
+            service_routing_keys=service_routing_keys,
+            key_pool=self.key_pool
+        )
+        await self._add_keys(secrets)
+
+        return did
+
+    def create_peer_dids(self,
+                         count: int,
+                         auth_keys_count: int = 1,
+                         agreement_keys_count: int = 1,
+                         service_endpoint: Optional[str] = None,
+                         service_routing_keys: Optional[List[str]] = None,
+                         workers: Optional[int] = None) -> List[str]:
+        return self._run_sync(
+            self.create_peer_dids_async(
+                count,
+                auth_keys_count=auth_keys_count,
+                agreement_keys_count=agreement_keys_count,
+                service_endpoint=service_endpoint,
+                service_routing_keys=service_routing_keys,
+                workers=workers
             )
+        )
+
+    async def create_peer_dids_async(self,
+                                     count: int,
+                                     auth_keys_count: int = 1,
+                                     agreement_keys_count: int = 1,
+                                     service_endpoint: Optional[str] = None,
+                                     service_routing_keys: Optional[List[str]] = None,
+                                     workers: Optional[int] = None) -> List[str]:
+        """
+        Creates many peer DIDs with the same structure at once.
+
+        Keys are generated on a pool of worker processes,
+        and the secrets of all the DIDs are stored in one bulk write.
 
-        # 4. call peer DID lib
-        # if we have just one key (auth), then use numalg0 algorithm
-        # otherwise use numalg2 algorithm
-        if len(auth_keys_peer_did) == 1 and not agreem_keys_peer_did and not service:
-            did = peer_did.create_peer_did_numalgo_0(auth_keys_peer_did[0])
+        :param count: number of peer DIDs to create
+        :param workers: number of worker processes. The number of CPUs by default. No pool is used if 1.
+        :return: the created peer DIDs
+        """
+        generate = functools.partial(
+            _generate_peer_did,
+            auth_keys_count=auth_keys_count,
+            agreement_keys_count=agreement_keys_count,
+            service_endpoint=service_endpoint,
+            service_routing_keys=service_routing_keys
+        )
+        workers = min(workers or default_workers_count(), count)
+        if workers <= 1:
+            generated = [generate(i) for i in range(count)]
         else:
-            did = peer_did.create_peer_did_numalgo_2(
-                encryption_keys=agreem_keys_peer_did,
-                signing_keys=auth_keys_peer_did,
-                service=service,
-            )
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                generated = list(executor.map(generate, range(count), chunksize=max(1, count // (4 * workers))))
 
-        # 5. set KIDs as in DID DOC for secrets and store the secret in the secrets resolver
-        did_doc = DIDDocPeerDID.from_json(peer_did.resolve_peer_did(did))
-        for auth_key, kid in zip(auth_keys, did_doc.auth_kids):
-            private_key = auth_key[0]
-            private_key["kid"] = kid
-            asyncio.get_event_loop().run_until_complete(
-                self.secrets_resolver.add_key(jwk_to_secret(private_key))
-            )
-        for agreem_key, kid in zip(agreem_keys, did_doc.agreement_kids):
-            private_key = agreem_key[0]
-            private_key["kid"] = kid
-            asyncio.get_event_loop().run_until_complete(
-                self.secrets_resolver.add_key(jwk_to_secret(private_key))
-            )
+        await self._add_keys([secret for _, secrets in generated for secret in secrets])
+        return [did for did, _ in generated]
 
-        return did
+    async def _add_keys(self, secrets: List[Secret]):
+        # use a bulk insert if the secrets resolver supports it
+        add_keys = getattr(self.secrets_resolver, "add_keys", None)
+        if add_keys is not None:
+            await add_keys(secrets)
+            return
+        for secret in secrets:
+            await self.secrets_resolver.add_key(secret)
 
     @staticmethod
     def resolve_peer_did(did: DID, format: VerificationMaterialFormatPeerDID.JWK) -> JSON:
         return peer_did.resolve_peer_did(did, format=format)
 
+    def resolve_peer_dids(self,
+                          dids: Iterable[str],
+                          format: VerificationMaterialFormatPeerDID = VerificationMaterialFormatPeerDID.JWK,
+                          workers: Optional[int] = None) -> Iterator[BatchItemResult]:
+        """
+        Resolves many peer DIDs in parallel on a pool of worker processes.
+
+        :param dids: peer DIDs; can be a lazy stream
+        :param workers: number of worker processes. The number of CPUs by default.
+        :return: iterator of results in completion order. `index` of a result points to the input DID,
+                 `result` is the DID Doc JSON as returned by `resolve_peer_did`.
+                 A DID that can't be resolved is yielded with its error (for example, `MalformedPeerDIDError`).
+        """
+        return resolve_peer_dids(dids, format=format.name.lower(), workers=workers, disk_cache=self.did_doc_disk_cache)
+
     def pack(self,
              msg: str,
-             to: str,
+             to: Union[str, List[str]],
              frm: Optional[str] = None,
              sign_frm: Optional[str] = None,
-             config: Optional[PackEncryptedConfig] = None) -> PackEncryptedResult:
-        message = Message(
-            body={"msg": msg},
-            id=id_generator_default(),
-            type="my-protocol/1.0",
-            frm=frm,
-            to=[to],
+             config: Optional[PackEncryptedConfig] = None,
+             compress_threshold: Optional[int] = None) -> PackEncryptedResult:
+        return self._run_sync(
+            self.pack_async(msg=msg, to=to, frm=frm, sign_frm=sign_frm, config=config,
+                            compress_threshold=compress_threshold)
+        )
+
+    async def pack_async(self,
+                         msg: str,
+                         to: Union[str, List[str]],
+                         frm: Optional[str] = None,
+                         sign_frm: Optional[str] = None,
+                         config: Optional[PackEncryptedConfig] = None,
+                         compress_threshold: Optional[int] = None) -> PackEncryptedResult:
+        """
+        :param to: receiver's DID or DIDs. A message to many receivers is encrypted once,
+                   with the content encryption key wrapped for every receiver's key agreement key.
+        :param compress_threshold: min size in bytes of `msg` to compress it with zlib before encryption.
+                                   Messages are not compressed if None.
+                                   `unpack` decompresses messages transparently.
+        """
+        return await self._pack_instrumented(self.resolvers_config, msg=msg, to=to, frm=frm, sign_frm=sign_frm,
+                                             config=config, compress_threshold=compress_threshold)
+
+    def pack_file(self,
+                  path: Union[str, os.PathLike],
+                  to: Union[str, List[str]],
+                  frm: Optional[str] = None,
+                  sign_frm: Optional[str] = None,
+                  output: Optional[TextIO] = None,
+                  media_type: Optional[str] = None,
+                  config: Optional[PackEncryptedConfig] = None,
+                  max_size: int = MAX_FILE_SIZE) -> PackEncryptedResult:
+        return self._run_sync(
+            self.pack_file_async(path, to=to, frm=frm, sign_frm=sign_frm, output=output, media_type=media_type,
+                                 config=config, max_size=max_size)
+        )
+
+    async def pack_file_async(self,
+                              path: Union[str, os.PathLike],
+                              to: Union[str, List[str]],
+                              frm: Optional[str] = None,
+                              sign_frm: Optional[str] = None,
+                              output: Optional[TextIO] = None,
+                              media_type: Optional[str] = None,
+                              config: Optional[PackEncryptedConfig] = None,
+                              max_size: int = MAX_FILE_SIZE) -> PackEncryptedResult:
+        """
+        Packs a message with a file as a base64 attachment. The message's `msg` is the file name.
+
+        Large files are not supported: the file is read into memory (not memory-mapped or streamed)
+        and held there with the packed message. Every envelope layer base64-encodes the file again, and
+        Authlib rejects encoded parts longer than `MAX_SEGMENT_LENGTH`, so at most about 60 KB (authcrypt with
+        a protected sender ID) to 140 KB (anoncrypt) can be packed, and never more than `MAX_FILE_SIZE`.
+
+        :param path: path of the file to send
+        :param output: optional text stream to write the packed message to by slices
+        :param media_type: media type of the file. Guessed by the file name if not set.
+        :param max_size: max size of the file in bytes. Can't be raised above `MAX_FILE_SIZE`.
+        :raises DIDCommValueError: if the file is too large or the packed message would be too large to unpack
+        """
+        check_file_size(path, min(max_size, MAX_FILE_SIZE))
+        attachment = file_attachment(path, media_type=media_type)
+        res = await self._pack_instrumented(self.resolvers_config, msg=attachment.filename, to=to, frm=frm,
+                                            sign_frm=sign_frm, config=config, attachments=[attachment])
+        del attachment
+        # the file is encoded once more by every layer of the message, the outermost ciphertext being the longest
+        if len(json.loads(res.packed_msg)["ciphertext"]) > MAX_SEGMENT_LENGTH:
+            raise DIDCommValueError(f"File {path} is too large to be unpacked once packed in this envelope")
+        if output is not None:
+            write_chunked(res.packed_msg, output)
+        return res
+
+    def pack_many(self,
+                  items: Iterable[Tuple],
+                  concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+                  config: Optional[PackEncryptedConfig] = None,
+                  compress_threshold: Optional[int] = None) -> List[BatchItemResult]:
+        return self._run_sync(self.pack_many_async(items, concurrency=concurrency, config=config,
+                                              compress_threshold=compress_threshold))
+
+    async def pack_many_async(self,
+                              items: Iterable[Tuple],
+                              concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+                              config: Optional[PackEncryptedConfig] = None,
+                              compress_threshold: Optional[int] = None) -> List[BatchItemResult]:
+        """
+        Packs many messages at once.
+
+        :param items: `(msg, to)`, `(msg, to, frm)` or `(msg, to, frm, sign_frm)` tuples
+        :param concurrency: max number of messages packed at the same time
+        :param config: pack config shared by all messages
+        :param compress_threshold: min size in bytes of a message to compress it (see `pack`)
+        :return: a result for every item in input order. A failed item carries its error instead of failing the batch.
+        """
+        # DIDs and secrets are usually shared by many messages in a batch,
+        # so resolve every DID and look up every secret only once
+        resolvers_config = ResolversConfig(
+            secrets_resolver=SecretsResolverMemo(self.resolvers_config.secrets_resolver),
+            did_resolver=DIDResolverMemo(self.resolvers_config.did_resolver)
         )
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def pack_item(index, item) -> BatchItemResult:
+            async with semaphore:
+                try:
+                    msg, to, frm, sign_frm = (tuple(item) + (None, None))[:4]
+                    res = await self._pack_instrumented(resolvers_config, msg=msg, to=to, frm=frm,
+                                                        sign_frm=sign_frm, config=config,
+                                                        compress_threshold=compress_threshold)
+                    return BatchItemResult(index=index, result=res)
+                except Exception as e:
+                    return BatchItemResult(index=index, error=e)
+
+        return list(await asyncio.gather(*[pack_item(i, item) for i, item in enumerate(items)]))
+
+    async def _pack_instrumented(self, resolvers_config: ResolversConfig, **kwargs) -> PackEncryptedResult:
+        if self.instrumentation is None:
+            return await self._pack(resolvers_config, **kwargs)
+        with self.instrumentation.record("pack") as recorder:
+            res = await self._pack(resolvers_config, **kwargs)
+            recorder.bytes = len(res.packed_msg)
+        return res
+
+    @staticmethod
+    async def _pack(resolvers_config: ResolversConfig,
+                    msg: str,
+                    to: Union[str, List[str]],
+                    frm: Optional[str] = None,
+                    sign_frm: Optional[str] = None,
+                    config: Optional[PackEncryptedConfig] = None,
+                    attachments: Optional[List[Attachment]] = None,
+                    compress_threshold: Optional[int] = None) -> PackEncryptedResult:
+        if not isinstance(to, str):
+            to = list(dict.fromkeys(to))
+            if len(to) == 1:
+                to = to[0]
+        message = build_message(msg, to=to, frm=frm, attachments=attachments, compress_threshold=compress_threshold)
         config = config or PackEncryptedConfig(protect_sender_id=True)
         config.forward = False  # until it's support in all languages
-        return asyncio.get_event_loop().run_until_complete(
-            pack_encrypted(
-                resolvers_config=self.resolvers_config,
-                message=message,
-                frm=frm,
-                to=to,
-                sign_frm=sign_frm,
-                pack_config=config
-            )
+        if not isinstance(to, str):
+            # pack_encrypted supports a single receiver only
+            return await pack_encrypted_many(resolvers_config, message, to, frm=frm, sign_frm=sign_frm, config=config)
+        return await pack_encrypted(
+            resolvers_config=resolvers_config,
+            message=message,
+            frm=frm,
+            to=to,
+            sign_frm=sign_frm,
+            pack_config=config
         )
 
-    def unpack(self, packed_msg: str) -> (str, str, UnpackResult):
-        res = asyncio.get_event_loop().run_until_complete(
-            unpack(
-                resolvers_config=self.resolvers_config,
-                packed_msg=packed_msg
-            )
+    def send(self,
+             msg: str,
+             to: Union[str, List[str]],
+             frm: Optional[str] = None,
+             sign_frm: Optional[str] = None,
+             config: Optional[PackEncryptedConfig] = None,
+             compress_threshold: Optional[int] = None) -> SendResult:
+        return self._run_sync(
+            self.send_async(msg=msg, to=to, frm=frm, sign_frm=sign_frm, config=config,
+                            compress_threshold=compress_threshold)
         )
-        msg = res.message.body["msg"]
+
+    async def send_async(self,
+                         msg: str,
+                         to: Union[str, List[str]],
+                         frm: Optional[str] = None,
+                         sign_frm: Optional[str] = None,
+                         config: Optional[PackEncryptedConfig] = None,
+                         compress_threshold: Optional[int] = None) -> SendResult:
+        """
+        Packs a message (see `pack`) and posts it to the HTTP(S) service endpoints of the receivers' DIDs.
+        A message to many receivers is posted once to every distinct endpoint.
+
+        :raises DeliveryError: if a receiver's DID has no HTTP(S) service endpoint
+                               or the message couldn't be delivered to an endpoint
+                               (it may have been delivered to the other ones)
+        """
+        receivers = [to] if isinstance(to, str) else list(dict.fromkeys(to))
+        # 1. find the endpoints first, so that nothing is packed for receivers that can't be reached
+        endpoints = list(dict.fromkeys([await self._service_endpoint(did) for did in receivers]))
+        # 2. pack once for all receivers
+        res = await self.pack_async(msg=msg, to=to, frm=frm, sign_frm=sign_frm, config=config,
+                                    compress_threshold=compress_threshold)
+        # 3. post to all endpoints at once
+        transport = self._transport()
+        deliveries = await asyncio.gather(*[transport.post_async(endpoint, res.packed_msg) for endpoint in endpoints],
+                                          return_exceptions=True)
+        for delivery in deliveries:
+            if isinstance(delivery, BaseException):
+                raise delivery
+        return SendResult(pack_result=res, deliveries=list(deliveries))
+
+    def _transport(self) -> HTTPTransport:
+        if self.transport is not None:
+            return self.transport
+        with self._transport_lock:
+            if self._own_transport is None:
+                self._own_transport = HTTPTransport()
+            return self._own_transport
+
+    def close(self):
+        """
+        Closes the transport created by `send` if any. Resources passed to the constructor are closed by their owners.
+        """
+        with self._transport_lock:
+            transport, self._own_transport = self._own_transport, None
+        if transport is not None:
+            transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def _service_endpoint(self, did: str) -> str:
+        did_doc = await self.resolvers_config.did_resolver.resolve(get_did(did))
+        services = did_doc.didcomm_services if did_doc is not None else []
+        for service in services:
+            if service.service_endpoint.startswith(("http://", "https://")):
+                return service.service_endpoint
+        raise DeliveryError(f"DID {did} has no HTTP(S) DIDComm service endpoint", endpoint=None)
+
+    def session(self,
+                frm: Optional[str],
+                to: str,
+                sign_frm: Optional[str] = None,
+                config: Optional[PackEncryptedConfig] = None,
+                compress_threshold: Optional[int] = None) -> "DIDCommSession":
+        return self._run_sync(self.session_async(frm, to, sign_frm=sign_frm, config=config,
+                                            compress_threshold=compress_threshold))
+
+    async def session_async(self,
+                            frm: Optional[str],
+                            to: str,
+                            sign_frm: Optional[str] = None,
+                            config: Optional[PackEncryptedConfig] = None,
+                            compress_threshold: Optional[int] = None) -> "DIDCommSession":
+        """
+        Opens a pairwise session resolving the DIDs and keys once for all messages packed from `frm` to `to`
+        (and unpacked).
+
+        :param frm: sender's DID. Anonymous encryption is used if None.
+        :param to: receiver's DID
+        :param sign_frm: sender's DID for optional signing
+        :param config: pack config. Sender ID is protected by default.
+        :param compress_threshold: min size in bytes of a message to compress it (see `pack`)
+        """
+        from didcomm_demo.session import DIDCommSession
+
+        session = DIDCommSession(self, frm=frm, to=to, sign_frm=sign_frm, config=config,
+                                 compress_threshold=compress_threshold)
+        await session.open_async()
+        return session
+
+    def inspect(self, packed_msg: str) -> EnvelopeInfo:
+        return self._run_sync(self.inspect_async(packed_msg))
+
+    async def inspect_async(self, packed_msg: str) -> EnvelopeInfo:
+        """
+        Inspects the outer layer of a packed message without decrypting it or resolving DIDs:
+        the envelope type, algorithms, recipients' key IDs and those of them having secrets.
+
+        :raises InvalidEnvelopeError: if the message is not a valid DIDComm message
+        """
+        info = parse_envelope(packed_msg)
+        if not info.recipient_kids:
+            return info
+        held_kids = await self.secrets_resolver.get_keys(info.recipient_kids)
+        return dataclasses.replace(info, held_kids=list(held_kids))
+
+    async def _precheck(self, packed_msg: str):
+        info = await self.inspect_async(packed_msg)
+        if info.type == ENVELOPE_ENCRYPTED and not info.held_kids:
+            # the same error as unpack raises after parsing the message
+            raise DIDUrlNotFoundError(f"No secrets are found in secrets resolver for DID URLs: {info.recipient_kids}")
+
+    def _precheck_error(self, packed_msg: str) -> Optional[Exception]:
+        try:
+            self._run_sync(self._precheck(packed_msg))
+        except DIDCommError as e:
+            return e
+        return None
+
+    def unpack(self, packed_msg: str, precheck: bool = False) -> (str, str, UnpackResult):
+        return self._run_sync(self.unpack_async(packed_msg, precheck=precheck))
+
+    async def unpack_async(self, packed_msg: str, precheck: bool = False) -> (str, str, UnpackResult):
+        """
+        :param precheck: whether to inspect the message first (see `inspect`) and reject it early
+                         if it's invalid or encrypted for keys without secrets
+        """
+        if precheck:
+            await self._precheck(packed_msg)
+        if self.instrumentation is None:
+            res = await unpack(resolvers_config=self.resolvers_config, packed_msg=packed_msg)
+        else:
+            with self.instrumentation.record("unpack") as recorder:
+                recorder.bytes = len(packed_msg)
+                res = await unpack(resolvers_config=self.resolvers_config, packed_msg=packed_msg)
+        msg = body_msg(res.message.body, self.max_decompressed_size)
+        self._check_replay(res)
         frm = get_did(res.metadata.encrypted_from) if res.metadata.encrypted_from else None
-        to = get_did(res.metadata.encrypted_to[0])
+        to = await self._find_recipient(res.metadata.encrypted_to)
         return msg, frm, to, res
+
+    def _check_replay(self, res: UnpackResult):
+        if self.replay_detector is not None and self.replay_detector.check_and_add(res.message.id,
+                                                                                   message_sender(res)):
+            raise ReplayedMessageError(f"Message {res.message.id} is a replay")
+
+    async def _find_recipient(self, to_kids: List[str]) -> str:
+        # a message to many receivers is unpacked by one of them: the one whose secrets are known
+        to_dids = [get_did(kid) for kid in to_kids]
+        if len(set(to_dids)) > 1:
+            kids = await self.resolvers_config.secrets_resolver.get_keys(to_kids)
+            if kids:
+                return get_did(kids[0])
+        return to_dids[0]
+
+    def unpack_file(self,
+                    path: Union[str, os.PathLike],
+                    directory: Union[str, os.PathLike],
+                    max_size: int = MAX_PACKED_FILE_SIZE) -> (str, Optional[str], str, List[str]):
+        return self._run_sync(self.unpack_file_async(path, directory, max_size=max_size))
+
+    async def unpack_file_async(self,
+                                path: Union[str, os.PathLike],
+                                directory: Union[str, os.PathLike],
+                                max_size: int = MAX_PACKED_FILE_SIZE) -> (str, Optional[str], str, List[str]):
+        """
+        Unpacks a message from a file and writes its base64 attachments to files in the directory.
+
+        :param path: path of the packed message file
+        :param directory: directory to write attachments to
+        :param max_size: max size of the message file in bytes; larger files are rejected before being read
+        :return: `msg`, `frm` and `to` as returned by `unpack` and the paths of the written attachments
+        :raises DIDCommValueError: if the message file is larger than `max_size`
+        """
+        check_file_size(path, max_size)
+        with open(path, encoding="utf-8") as f:
+            packed_msg = f.read()
+        msg, frm, to, res = await self.unpack_async(packed_msg)
+        del packed_msg
+        os.makedirs(directory, exist_ok=True)
+        paths = [save_attachment(a, directory) for a in res.message.attachments or []]
+        return msg, frm, to, [p for p in paths if p is not None]
+
+    def unpack_many(self,
+                    packed_msgs: Iterable[str],
+                    workers: Optional[int] = None,
+                    max_pending: Optional[int] = None,
+                    precheck: bool = False) -> Iterator[BatchItemResult]:
+        """
+        Unpacks many messages in parallel on a pool of worker processes.
+
+        :param packed_msgs: packed messages; can be a lazy stream
+        :param workers: number of worker processes. The number of CPUs by default.
+        :param max_pending: max number of messages sent to workers but not unpacked yet. `4 * workers` by default.
+        :param precheck: whether to inspect messages in this process and reject invalid ones
+                         or ones encrypted for keys without secrets without sending them to workers
+        :return: iterator of results in completion order. `index` of a result points to the input message,
+                 `result` is the same tuple as returned by `unpack`.
+                 Replays are detected in this process, as results complete.
+        """
+        workers = workers or default_workers_count()
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=init_worker,
+                                 initargs=(self.secrets_resolver, self.did_doc_cache_size,
+                                           self.did_doc_disk_cache, self.max_decompressed_size)) as executor:
+            for item in imap_as_completed(executor, unpack_in_worker, packed_msgs,
+                                          max_pending=max_pending or 4 * workers,
+                                          reject=self._precheck_error if precheck else None):
+                if item.ok and self.replay_detector is not None:
+                    try:
+                        self._check_replay(item.result[3])
+                    except ReplayedMessageError as e:
+                        item = BatchItemResult(index=item.index, error=e)
+                yield item
+
+    def _run_sync(self, coro):
+        if self.loop_thread is not None:
+            return self.loop_thread.run(coro)
+        return self._run(coro)
+
+    @staticmethod
+    def _run(coro):
+        return asyncio.get_event_loop().run_until_complete(coro)
@@ -0,0 +1,171 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass, asdict, field
+from typing import Any, Dict, List, Optional
+
+from didcomm.common.algorithms import AnonCryptAlg, AuthCryptAlg, SignAlg
+from didcomm.core.utils import get_did
+from didcomm.errors import MalformedMessageError, MalformedMessageCode
+
+ENVELOPE_ENCRYPTED = "encrypted"
+ENVELOPE_SIGNED = "signed"
+ENVELOPE_PLAINTEXT = "plaintext"
+
+# limits of envelope fields checked before any parsing of the content
+DEFAULT_MAX_ENVELOPE_SIZE = 64 * 1024 * 1024
+MAX_PROTECTED_HEADER_SIZE = 16 * 1024
+MAX_RECIPIENTS = 1024
+MAX_KID_SIZE = 4096
+
+_ANONCRYPT_ALGS = {a.value for a in AnonCryptAlg}
+_AUTHCRYPT_ALGS = {a.value for a in AuthCryptAlg}
+_SIGN_ALGS = {a.value for a in SignAlg}
+
+
+class InvalidEnvelopeError(MalformedMessageError):
+    """
+    A packed message rejected by its outer layer, before any decryption.
+    """
+
+    def __init__(self, message: str):
+        super().__init__(MalformedMessageCode.INVALID_MESSAGE, message)
+
+
+@dataclass(frozen=True)
+class EnvelopeInfo:
+    """
+    What can be told about a packed message without decrypting it or verifying signatures.
+
+    Attributes:
+        type (str): `encrypted`, `signed` or `plaintext` (the outermost layer)
+        size (int): size of the packed message in characters
+        alg (str): key agreement algorithm of an encrypted message or signing algorithm of a signed one
+        enc (str): content encryption algorithm of an encrypted message
+        authenticated (bool): whether an encrypted message is authcrypted with a visible sender key
+                              (a message with a protected sender ID is anoncrypted outside)
+        sender_kid (str): sender's key ID of an authcrypted message or signer's key ID of a signed one
+        recipient_kids (List[str]): recipients' key IDs of an encrypted message
+        held_kids (List[str]): recipients' key IDs having secrets in the secrets resolver
+    """
+
+    type: str
+    size: int
+    alg: Optional[str] = None
+    enc: Optional[str] = None
+    authenticated: bool = False
+    sender_kid: Optional[str] = None
+    recipient_kids: List[str] = field(default_factory=list)
+    held_kids: List[str] = field(default_factory=list)
+
+    @property
+    def recipients(self) -> List[str]:
+        """
+        Recipients' DIDs in order of their keys.
+        """
+        return list(dict.fromkeys(get_did(kid) for kid in self.recipient_kids))
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "recipients": self.recipients}
+
+
+def parse_envelope(packed_msg: str, max_size: int = DEFAULT_MAX_ENVELOPE_SIZE) -> EnvelopeInfo:
+    """
+    Parses the outer layer of a packed message: the protected header and recipients of an encrypted message
+    or the signatures of a signed one. Nothing is decrypted or resolved.
+    `held_kids` is not filled (see `DIDCommDemo.inspect`).
+
+    :param max_size: max size of the packed message in characters
+    :raises InvalidEnvelopeError: if the message is not a valid DIDComm message,
+                                  has unsupported algorithms or fields over the limits
+    """
+    if len(packed_msg) > max_size:
+        raise InvalidEnvelopeError(f"Message is larger than {max_size} characters")
+    try:
+        msg = json.loads(packed_msg)
+    except (ValueError, RecursionError):
+        raise InvalidEnvelopeError("Message is not JSON") from None
+    if not isinstance(msg, dict):
+        raise InvalidEnvelopeError("Message is not a JSON object")
+
+    if "ciphertext" in msg:
+        return _parse_encrypted(msg, len(packed_msg))
+    if "payload" in msg:
+        return _parse_signed(msg, len(packed_msg))
+    if isinstance(msg.get("id"), str) and isinstance(msg.get("type"), str):
+        return EnvelopeInfo(type=ENVELOPE_PLAINTEXT, size=len(packed_msg))
+    raise InvalidEnvelopeError("Message is neither encrypted, signed nor plaintext")
+
+
+def _parse_encrypted(msg: Dict[str, Any], size: int) -> EnvelopeInfo:
+    # 1. protected header
+    protected = _protected_header(msg.get("protected"))
+    alg, enc = protected.get("alg"), protected.get("enc")
+    if not isinstance(alg, str) or not isinstance(enc, str):
+        raise InvalidEnvelopeError("No encryption algorithms")
+    if (alg, enc) in _AUTHCRYPT_ALGS:
+        authenticated = True
+    elif (alg, enc) in _ANONCRYPT_ALGS:
+        authenticated = False
+    else:
+        raise InvalidEnvelopeError(f"Unsupported encryption algorithms: {alg}, {enc}")
+
+    # 2. recipients
+    recipients = msg.get("recipients")
+    if not isinstance(recipients, list) or not recipients:
+        raise InvalidEnvelopeError("No recipients")
+    if len(recipients) > MAX_RECIPIENTS:
+        raise InvalidEnvelopeError(f"More than {MAX_RECIPIENTS} recipients")
+    kids = [_kid(r.get("header") if isinstance(r, dict) else None) for r in recipients]
+
+    # 3. sender of authcrypted messages
+    sender_kid = None
+    if authenticated:
+        sender_kid = protected.get("skid")
+        if sender_kid is None and isinstance(protected.get("apu"), str):
+            sender_kid = _b64decode(protected["apu"]).decode("utf-8", errors="replace")
+        if not isinstance(sender_kid, str) or not 0 < len(sender_kid) <= MAX_KID_SIZE:
+            raise InvalidEnvelopeError("Invalid sender key ID")
+
+    return EnvelopeInfo(type=ENVELOPE_ENCRYPTED, size=size, alg=alg, enc=enc, authenticated=authenticated,
+                        sender_kid=sender_kid, recipient_kids=kids)
+
+
+def _parse_signed(msg: Dict[str, Any], size: int) -> EnvelopeInfo:
+    signatures = msg.get("signatures")
+    if not isinstance(signatures, list) or not signatures or not isinstance(signatures[0], dict):
+        raise InvalidEnvelopeError("No signatures")
+    signature = signatures[0]
+    alg = _protected_header(signature.get("protected")).get("alg")
+    if not isinstance(alg, str) or alg not in _SIGN_ALGS:
+        raise InvalidEnvelopeError(f"Unsupported signing algorithm: {alg}")
+    return EnvelopeInfo(type=ENVELOPE_SIGNED, size=size, alg=alg, sender_kid=_kid(signature.get("header")))
+
+
+def _protected_header(value: Any) -> Dict[str, Any]:
+    if not isinstance(value, str):
+        raise InvalidEnvelopeError("No protected header")
+    if len(value) > MAX_PROTECTED_HEADER_SIZE:
+        raise InvalidEnvelopeError(f"Protected header is larger than {MAX_PROTECTED_HEADER_SIZE} characters")
+    try:
+        protected = json.loads(_b64decode(value))
+    except (ValueError, RecursionError):
+        protected = None
+    if not isinstance(protected, dict):
+        raise InvalidEnvelopeError("Invalid protected header")
+    return protected
+
+
+def _kid(header: Any) -> str:
+    kid = header.get("kid") if isinstance(header, dict) else None
+    if not isinstance(kid, str) or not 0 < len(kid) <= MAX_KID_SIZE:
+        raise InvalidEnvelopeError("Invalid key ID")
+    return kid
+
+
+def _b64decode(value: str) -> bytes:
+    try:
+        return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+    except (binascii.Error, ValueError):
+        raise InvalidEnvelopeError("Invalid base64") from None
+
@@ -0,0 +1,56 @@
+import builtins
+import sys
+import time
+from typing import List, Tuple
+
+
+class ImportProfiler:
+    """
+    Measures time spent in `import` statements while installed.
+
+    Only top-level imports of modules not imported before are recorded,
+    so the time of a module includes the time of all modules it imports.
+    For a full tree use `python -X importtime`.
+    """
+
+    def __init__(self) -> None:
+        self.timings: List[Tuple[str, float]] = []
+        self._original_import = None
+        self._depth = 0
+
+    def install(self):
+        if self._original_import is None:
+            self._original_import = builtins.__import__
+            builtins.__import__ = self._import
+
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._depth -= 1
+            if self._depth == 0:
+                self.timings.append((name, elapsed))
+
+    def report(self, started: float, startup_imports: float) -> str:
+        """
+        Formats the import time breakdown.
+
+        :param started: `time.perf_counter()` value when the package started importing
+        :param startup_imports: time of the CLI module import (in seconds)
+        """
+        total = time.perf_counter() - started
+        lines = ["Startup profile (ms):", f"{startup_imports * 1000:10.1f}  CLI module imports"]
+        for name, elapsed in sorted(self.timings, key=lambda t: t[1], reverse=True):
+            lines.append(f"{elapsed * 1000:10.1f}  {name}")
+        lines.append(f"{total * 1000:10.1f}  total (since the CLI module import)")
+        return "\n".join(lines)
@@ -0,0 +1,356 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from authlib.jose import JsonWebEncryption, JsonWebSignature
+from didcomm.common.resolvers import ResolversConfig
+from didcomm.common.types import DID, DID_URL
+from didcomm.did_doc.did_doc import DIDDoc
+from didcomm.did_doc.did_resolver import DIDResolver
+from didcomm.secrets.secrets_resolver import SecretsResolver, Secret
+
+DID_RESOLUTION = "did_resolution"
+SECRETS_LOOKUP = "secrets_lookup"
+KEY_WRAP = "key_wrap"
+CONTENT_ENCRYPTION = "content_encryption"
+SIGNING = "signing"
+SERIALIZATION = "serialization"
+
+STAGES = [DID_RESOLUTION, SECRETS_LOOKUP, KEY_WRAP, CONTENT_ENCRYPTION, SIGNING, SERIALIZATION]
+
+# whole JWE processing; key wrap is what remains of it after content encryption
+_JWE = "jwe"
+
+
+@dataclass
+class StageTiming:
+    """
+    Attributes:
+        duration (float): total duration of the stage in seconds
+        bytes (int): number of bytes processed by the stage
+        calls (int): number of times the stage was entered
+    """
+
+    duration: float = 0.0
+    bytes: int = 0
+    calls: int = 0
+
+
+@dataclass
+class OperationTimings:
+    """
+    Per-stage timings of a single pack or unpack operation.
+
+    Attributes:
+        operation (str): `pack` or `unpack`
+        duration (float): total duration in seconds
+        bytes (int): size of the packed message
+        stages (dict): timings by stage name (see `STAGES`)
+    """
+
+    operation: str
+    duration: float
+    bytes: int
+    stages: Dict[str, StageTiming] = field(default_factory=dict)
+
+
+Callback = Callable[[OperationTimings], None]
+
+
+class _Recorder:
+
+    def __init__(self, operation: str) -> None:
+        self.operation = operation
+        self.bytes = 0
+        self.stages: Dict[str, StageTiming] = {}
+
+    def add(self, stage: str, duration: float, nbytes: int = 0):
+        timing = self.stages.get(stage)
+        if timing is None:
+            timing = self.stages[stage] = StageTiming()
+        timing.duration += duration
+        timing.bytes += nbytes
+        timing.calls += 1
+
+    def finish(self, duration: float) -> OperationTimings:
+        stages = dict(self.stages)
+        jwe = stages.pop(_JWE, None)
+        if jwe is not None:
+            content_encryption = stages.get(CONTENT_ENCRYPTION, StageTiming())
+            stages[KEY_WRAP] = StageTiming(duration=max(jwe.duration - content_encryption.duration, 0.0),
+                                           calls=jwe.calls)
+        # whatever is not measured explicitly is mostly JSON and base64 (de)serialization
+        stages[SERIALIZATION] = StageTiming(duration=max(duration - sum(s.duration for s in stages.values()), 0.0),
+                                            bytes=self.bytes, calls=1)
+        return OperationTimings(
+            operation=self.operation,
+            duration=duration,
+            bytes=self.bytes,
+            stages={stage: stages[stage] for stage in STAGES if stage in stages}
+        )
+
+
+# recorder of the operation being run in the current context (thread or asyncio task)
+_recorder = ContextVar("didcomm_demo_recorder", default=None)
+
+
+def _timed(stage: str, fn: Callable, nbytes: Callable[..., int]) -> Callable:
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        recorder = _recorder.get()
+        if recorder is None:
+            return fn(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            recorder.add(stage, time.perf_counter() - start, nbytes(*args, **kwargs))
+
+    return wrapper
+
+
+def _payload_size(obj) -> int:
+    if isinstance(obj, dict):
+        obj = obj.get("payload", "")
+    return len(obj) if isinstance(obj, (str, bytes)) else 0
+
+
+# JOSE hooks are installed while at least one operation is recorded and removed after the last one
+_hooks_lock = threading.Lock()
+_hooks_users = 0
+# (patched class or object, attribute name, original attribute or None if it was inherited)
+_hooks_originals: List[Tuple[object, str, Optional[Callable]]] = []
+
+
+def _jose_hook_targets() -> List[Tuple[object, str, str, Callable[..., int]]]:
+    targets = [
+        (JsonWebEncryption, "serialize_json", _JWE, lambda *args, **kwargs: 0),
+        (JsonWebEncryption, "deserialize_json", _JWE, lambda *args, **kwargs: 0),
+        (JsonWebSignature, "serialize_json", SIGNING,
+         lambda self, header_obj, payload, *args, **kwargs: _payload_size(payload)),
+        (JsonWebSignature, "deserialize_json", SIGNING, lambda self, obj, *args, **kwargs: _payload_size(obj)),
+    ]
+    for enc in JsonWebEncryption.ENC_REGISTRY.values():
+        targets.append((enc, "encrypt", CONTENT_ENCRYPTION, lambda msg, *args, **kwargs: len(msg)))
+        targets.append((enc, "decrypt", CONTENT_ENCRYPTION, lambda ciphertext, *args, **kwargs: len(ciphertext)))
+    return targets
+
+
+@contextmanager
+def _jose_hooks():
+    """
+    Wraps JOSE (Authlib) encryption and signing used by didcomm while an operation is recorded,
+    so that they're timed when called within it, and restores them afterwards.
+    Calls made meanwhile outside of recorded operations are not timed.
+    """
+    global _hooks_users
+    with _hooks_lock:
+        _hooks_users += 1
+        if _hooks_users == 1:
+            for target, name, stage, nbytes in _jose_hook_targets():
+                _hooks_originals.append((target, name, vars(target).get(name)))
+                setattr(target, name, _timed(stage, getattr(target, name), nbytes))
+    try:
+        yield
+    finally:
+        with _hooks_lock:
+            _hooks_users -= 1
+            if _hooks_users == 0:
+                for target, name, original in reversed(_hooks_originals):
+                    if original is None:
+                        delattr(target, name)
+                    else:
+                        setattr(target, name, original)
+                _hooks_originals.clear()
+
+
+class _InstrumentedDIDResolver(DIDResolver):
+
+    def __init__(self, did_resolver: DIDResolver) -> None:
+        self._did_resolver = did_resolver
+
+    async def resolve(self, did: DID) -> Optional[DIDDoc]:
+        recorder = _recorder.get()
+        if recorder is None:
+            return await self._did_resolver.resolve(did)
+        start = time.perf_counter()
+        try:
+            return await self._did_resolver.resolve(did)
+        finally:
+            recorder.add(DID_RESOLUTION, time.perf_counter() - start)
+
+
+class _InstrumentedSecretsResolver(SecretsResolver):
+
+    def __init__(self, secrets_resolver: SecretsResolver) -> None:
+        self._secrets_resolver = secrets_resolver
+
+    async def get_key(self, kid: DID_URL) -> Optional[Secret]:
+        recorder = _recorder.get()
+        if recorder is None:
+            return await self._secrets_resolver.get_key(kid)
+        start = time.perf_counter()
+        try:
+            return await self._secrets_resolver.get_key(kid)
+        finally:
+            recorder.add(SECRETS_LOOKUP, time.perf_counter() - start)
+
+    async def get_keys(self, kids: List[DID_URL]) -> List[DID_URL]:
+        recorder = _recorder.get()
+        if recorder is None:
+            return await self._secrets_resolver.get_keys(kids)
+        start = time.perf_counter()
+        try:
+            return await self._secrets_resolver.get_keys(kids)
+        finally:
+            recorder.add(SECRETS_LOOKUP, time.perf_counter() - start)
+
+
+class Instrumentation:
+    """
+    Records per-stage timings of pack and unpack operations
+    and passes them to callbacks (for example, a `MetricsRegistry`).
+
+    Only successful operations are passed to callbacks.
+    Durations of stages awaited concurrently with other operations (DID resolution and secrets lookup)
+    may include time spent by the other operations.
+    """
+
+    def __init__(self, callbacks: Sequence[Callback] = ()) -> None:
+        self.callbacks: List[Callback] = list(callbacks)
+
+    def add_callback(self, callback: Callback):
+        self.callbacks.append(callback)
+
+    def instrument_resolvers(self, resolvers_config: ResolversConfig) -> ResolversConfig:
+        return ResolversConfig(
+            secrets_resolver=_InstrumentedSecretsResolver(resolvers_config.secrets_resolver),
+            did_resolver=_InstrumentedDIDResolver(resolvers_config.did_resolver)
+        )
+
+    @contextmanager
+    def record(self, operation: str) -> Iterator[_Recorder]:
+        """
+        Records an operation run in the current thread or asyncio task.
+        Set `bytes` of the yielded recorder to the packed message size.
+        """
+        recorder = _Recorder(operation)
+        token = _recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            with _jose_hooks():
+                yield recorder
+        finally:
+            _recorder.reset(token)
+        timings = recorder.finish(time.perf_counter() - start)
+        for callback in self.callbacks:
+            callback(timings)
+
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+
+
+class _Histogram:
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Aggregates operation timings into histograms. Can be used as an `Instrumentation` callback.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._operations: Dict[str, _Histogram] = {}
+        self._operation_bytes: Dict[str, int] = {}
+        self._stages: Dict[Tuple[str, str], _Histogram] = {}
+        self._stage_bytes: Dict[Tuple[str, str], int] = {}
+
+    def __call__(self, timings: OperationTimings):
+        with self._lock:
+            op = timings.operation
+            self._histogram(self._operations, op).observe(timings.duration)
+            self._operation_bytes[op] = self._operation_bytes.get(op, 0) + timings.bytes
+            for stage, timing in timings.stages.items():
+                self._histogram(self._stages, (op, stage)).observe(timing.duration)
+                self._stage_bytes[(op, stage)] = self._stage_bytes.get((op, stage), 0) + timing.bytes
+
+    def _histogram(self, histograms: dict, key) -> _Histogram:
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = _Histogram(self.buckets)
+        return histogram
+
+    def to_prometheus(self) -> str:
+        """
+        Exports the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            lines += ["# HELP didcomm_operation_duration_seconds Duration of pack and unpack operations.",
+                      "# TYPE didcomm_operation_duration_seconds histogram"]
+            for op, histogram in sorted(self._operations.items()):
+                lines += self._histogram_lines("didcomm_operation_duration_seconds", f'operation="{op}"', histogram)
+            lines += ["# HELP didcomm_operation_bytes_total Size of packed messages.",
+                      "# TYPE didcomm_operation_bytes_total counter"]
+            for op, nbytes in sorted(self._operation_bytes.items()):
+                lines.append(f'didcomm_operation_bytes_total{{operation="{op}"}} {nbytes}')
+            lines += ["# HELP didcomm_stage_duration_seconds Duration of pack and unpack stages.",
+                      "# TYPE didcomm_stage_duration_seconds histogram"]
+            for (op, stage), histogram in sorted(self._stages.items()):
+                lines += self._histogram_lines("didcomm_stage_duration_seconds",
+                                               f'operation="{op}",stage="{stage}"', histogram)
+            lines += ["# HELP didcomm_stage_bytes_total Number of bytes processed by pack and unpack stages.",
+                      "# TYPE didcomm_stage_bytes_total counter"]
+            for (op, stage), nbytes in sorted(self._stage_bytes.items()):
+                lines.append(f'didcomm_stage_bytes_total{{operation="{op}",stage="{stage}"}} {nbytes}')
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _histogram_lines(name: str, labels: str, histogram: _Histogram) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        return lines
+
+    def summary(self) -> str:
+        """
+        Formats average durations and total bytes of every stage.
+        """
+        lines = []
+        with self._lock:
+            for op, histogram in sorted(self._operations.items()):
+                lines.append(f"{op}: {histogram.count} operation(s), "
+                             f"{histogram.sum / histogram.count * 1000:.3f} ms avg, "
+                             f"{self._operation_bytes[op]} bytes")
+                for stage in STAGES:
+                    stage_histogram = self._stages.get((op, stage))
+                    if stage_histogram is None:
+                        continue
+                    lines.append(f"    {stage:<20} {stage_histogram.sum / stage_histogram.count * 1000:10.3f} ms avg"
+                                 f" {self._stage_bytes[(op, stage)]:>12} bytes")
+        return "\n".join(lines)
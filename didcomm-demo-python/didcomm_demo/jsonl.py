@@ -0,0 +1,93 @@
+import json
+from typing import Awaitable, Callable, Iterable
+
+DEFAULT_MAX_IN_FLIGHT = 64
+
+Handler = Callable[[dict], Awaitable[dict]]
+
+
+def error_to_str(e: Exception) -> str:
+    return f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+
+
+def run_jsonl(lines: Iterable[str],
+              handler: Handler,
+              write: Callable[[str], None],
+              max_in_flight: int = DEFAULT_MAX_IN_FLIGHT):
+    # asyncio is imported on use: this module is imported on CLI startup
+    import asyncio
+
+    asyncio.get_event_loop().run_until_complete(
+        process_jsonl(lines, handler, write, max_in_flight=max_in_flight)
+    )
+
+
+async def process_jsonl(lines: Iterable[str],
+                        handler: Handler,
+                        write: Callable[[str], None],
+                        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT):
+    """
+    Processes newline-delimited JSON requests and writes a JSON result line per request in input order.
+
+    Input is read lazily on a worker thread, since reading stdin blocks, and a result is written as soon as it and
+    all the results before it are ready, so that a client can wait for a result before sending the next request.
+    At most `max_in_flight` requests are processed (or wait for output) at a time,
+    so memory stays flat for input of any length.
+    A request failing with an error gets a `{"error": "..."}` result.
+    If a request has an `id` field, it's copied to the result.
+
+    :param lines: input lines; empty lines are skipped
+    :param handler: a coroutine function processing a request
+    :param write: a function writing a result line
+    :param max_in_flight: max number of requests being processed at a time
+    """
+    import asyncio
+
+    loop = asyncio.get_event_loop()
+    line_iter = iter(lines)
+    slots = asyncio.Semaphore(max_in_flight)
+    # results being processed in input order; None after the last one
+    in_flight = asyncio.Queue()
+
+    async def write_results():
+        try:
+            while True:
+                result = await in_flight.get()
+                if result is None:
+                    return
+                write(await result)
+                slots.release()
+        except BaseException:
+            # unblocks the reader, which stops on a failed writer
+            for _ in range(max_in_flight):
+                slots.release()
+            raise
+
+    writer = asyncio.ensure_future(write_results())
+    try:
+        while not writer.done():
+            await slots.acquire()
+            line = await loop.run_in_executor(None, next, line_iter, None)
+            if line is None:
+                break
+            if not line.strip():
+                slots.release()
+                continue
+            in_flight.put_nowait(asyncio.ensure_future(_handle_line(line, handler)))
+    finally:
+        in_flight.put_nowait(None)
+        await writer
+
+
+async def _handle_line(line: str, handler: Handler) -> str:
+    request = None
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("A request must be a JSON object")
+        result = await handler(request)
+    except Exception as e:
+        result = {"error": error_to_str(e)}
+    if isinstance(request, dict) and "id" in request:
+        result = dict(id=request["id"], **result)
+    return json.dumps(result)
@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from didcomm.secrets.secrets_util import generate_x25519_keys_as_jwk_dict, generate_ed25519_keys_as_jwk_dict
+
+DEFAULT_LOW_WATERMARK = 16
+DEFAULT_HIGH_WATERMARK = 64
+
+# private and public keys in JWK format
+KeyPair = Tuple[dict, dict]
+
+X25519 = "x25519"
+ED25519 = "ed25519"
+
+_GENERATORS: Dict[str, Callable[[], KeyPair]] = {
+    X25519: generate_x25519_keys_as_jwk_dict,
+    ED25519: generate_ed25519_keys_as_jwk_dict,
+}
+
+
+@dataclass(frozen=True)
+class KeyPoolStats:
+    """
+    Attributes:
+        depth (dict): number of ready key pairs by key type (`x25519` and `ed25519`)
+        hits (int): number of key pairs taken from the pool
+        misses (int): number of key pairs generated on the caller's thread since the pool was empty
+        generated (int): number of key pairs generated by the background thread
+        refill_rate (float): key pairs generated by the background thread per second of refilling
+    """
+
+    depth: Dict[str, int]
+    hits: int
+    misses: int
+    generated: int
+    refill_rate: float
+
+
+class KeyPool:
+    """
+    A pool of pre-generated X25519 (key agreement) and Ed25519 (authentication) key pairs.
+
+    A background thread refills the pool of a key type up to `high_watermark` key pairs
+    as soon as it drops below `low_watermark`.
+    Getting a key pair never waits for the background thread: if the pool is empty, the key pair is generated inline.
+    """
+
+    def __init__(self,
+                 low_watermark: int = DEFAULT_LOW_WATERMARK,
+                 high_watermark: int = DEFAULT_HIGH_WATERMARK) -> None:
+        if not 0 <= low_watermark < high_watermark:
+            raise ValueError(f"Invalid watermarks: low {low_watermark}, high {high_watermark}")
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self._pools = {key_type: deque() for key_type in _GENERATORS}
+        self._lock = threading.Lock()
+        self._refill_needed = threading.Event()
+        self._closed = False
+        self._hits = 0
+        self._misses = 0
+        self._generated = 0
+        self._refill_time = 0.0
+        self._refill_needed.set()
+        self._thread = threading.Thread(target=self._refill, name="key-pool-refill", daemon=True)
+        self._thread.start()
+
+    def get_x25519(self) -> KeyPair:
+        return self._get(X25519)
+
+    def get_ed25519(self) -> KeyPair:
+        return self._get(ED25519)
+
+    def _get(self, key_type: str) -> KeyPair:
+        pool = self._pools[key_type]
+        try:
+            key_pair = pool.popleft()
+            hit = True
+        except IndexError:
+            key_pair = _GENERATORS[key_type]()
+            hit = False
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+        if len(pool) < self.low_watermark:
+            self._refill_needed.set()
+        return key_pair
+
+    def _refill(self):
+        while True:
+            self._refill_needed.wait()
+            if self._closed:
+                return
+            self._refill_needed.clear()
+            for key_type, pool in self._pools.items():
+                while len(pool) < self.high_watermark and not self._closed:
+                    start = time.perf_counter()
+                    key_pair = _GENERATORS[key_type]()
+                    with self._lock:
+                        self._generated += 1
+                        self._refill_time += time.perf_counter() - start
+                    pool.append(key_pair)
+                    # yield the GIL to request threads rather than holding it for a switch interval
+                    time.sleep(0)
+
+    def wait_filled(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until the pools of all key types reach the high watermark (useful on startup and in tests).
+
+        :return: False if the timeout elapsed
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while any(len(pool) < self.high_watermark for pool in self._pools.values()):
+            if self._closed or (deadline is not None and time.monotonic() > deadline):
+                return False
+            time.sleep(0.001)
+        return True
+
+    def stats(self) -> KeyPoolStats:
+        with self._lock:
+            return KeyPoolStats(
+                depth={key_type: len(pool) for key_type, pool in self._pools.items()},
+                hits=self._hits,
+                misses=self._misses,
+                generated=self._generated,
+                refill_rate=self._generated / self._refill_time if self._refill_time else 0.0
+            )
+
+    def close(self):
+        """
+        Stops the background thread.
+        """
+        self._closed = True
+        self._refill_needed.set()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
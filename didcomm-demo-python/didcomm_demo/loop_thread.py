@@ -0,0 +1,80 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Coroutine, Optional
+
+
+class EventLoopThread:
+    """
+    An event loop running forever in a dedicated daemon thread.
+
+    Coroutines can be run from any number of threads: they are submitted to the loop with
+    `run_coroutine_threadsafe`, so callers don't need an event loop of their own.
+    All coroutines run on the loop thread, so the state they share (for example DID Doc caches) is not accessed
+    concurrently.
+    """
+
+    def __init__(self, name: str = "didcomm-event-loop") -> None:
+        self._loop = asyncio.new_event_loop()
+        self._closed = False
+        # makes submitting a coroutine and stopping the loop atomic, so that nothing is submitted to a stopped loop
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run_loop, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_forever()
+        finally:
+            # coroutines still running on close are cancelled
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+            self._loop.close()
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """
+        Runs a coroutine on the loop thread and waits for its result.
+
+        :param timeout: max time to wait in seconds; the coroutine is cancelled on timeout
+        :raises RuntimeError: if called on the loop thread (it would wait for itself) or after `close`
+        :raises concurrent.futures.CancelledError: if the thread is closed while the coroutine is running
+        """
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("A coroutine can't be run synchronously on the event loop thread; await it instead")
+        with self._lock:
+            if self._closed:
+                coro.close()
+                raise RuntimeError("Event loop thread is closed")
+            # coroutines submitted before the loop is stopped are cancelled on stop (see `_run_loop`)
+            future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def close(self):
+        """
+        Stops the loop and waits for the thread to finish.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,164 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+from authlib.jose import JsonWebSignature
+from didcomm.common.algorithms import SignAlg
+from didcomm.common.resolvers import ResolversConfig
+from didcomm.common.types import DIDCommMessageTypes, JSON_OBJ
+from didcomm.core.anoncrypt import anoncrypt
+from didcomm.core.authcrypt import authcrypt
+from didcomm.core.keys.anoncrypt_keys_selector import find_anoncrypt_pack_recipient_public_keys
+from didcomm.core.keys.authcrypt_keys_selector import find_authcrypt_pack_sender_and_recipient_keys
+from didcomm.core.keys.sign_keys_selector import find_signing_key
+from didcomm.core.serialization import dict_to_json, dict_to_json_bytes
+from didcomm.core.types import Key
+from didcomm.core.utils import extract_key, extract_sign_alg, are_keys_compatible, get_did, is_did
+from didcomm.errors import DIDCommValueError, IncompatibleCryptoError
+from didcomm.message import Message
+from didcomm.pack_encrypted import PackEncryptedConfig, PackEncryptedResult
+
+
+@dataclass(frozen=True)
+class PackKeys:
+    """
+    Keys selected to pack messages.
+
+    Attributes:
+        to_keys (List[Key]): key agreement keys of all recipients
+        frm_key (Key): sender's key agreement key for authcrypt; None for anoncrypt
+        sign_key (Key): sender's signing key; None if messages are not signed
+        sign_alg (SignAlg): signing algorithm of `sign_key`
+    """
+
+    to_keys: List[Key]
+    frm_key: Optional[Key]
+    sign_key: Optional[Key]
+    sign_alg: Optional[SignAlg]
+
+
+def validate_message(message: Message, to: List[str], frm: Optional[str], sign_frm: Optional[str]):
+    """
+    Validates a message and its sender and recipients as `pack_encrypted` does, for every recipient.
+    Messages with `from_prior` are rejected since it's packed by `pack_encrypted` only.
+
+    :raises DIDCommValueError: if the message can't be packed by `pack_with_keys`
+    """
+    if not to:
+        raise DIDCommValueError("No recipients")
+    for recipient in to:
+        if not is_did(recipient):
+            raise DIDCommValueError(f"`to` value is not a valid DID of DID URL: {recipient}")
+    if frm is not None and not is_did(frm):
+        raise DIDCommValueError(f"`from` value is not a valid DID of DID URL: {frm}")
+    if sign_frm is not None and not is_did(sign_frm):
+        raise DIDCommValueError(f"`sign_from` value is not a valid DID of DID URL: {sign_frm}")
+    if message.to is not None:
+        if not isinstance(message.to, list):
+            raise DIDCommValueError(f"`message.to` value is not a list: {message.to}")
+        for recipient in to:
+            if get_did(recipient) not in message.to:
+                raise DIDCommValueError(
+                    f"`message.to` value {message.to} does not contain `to` value's DID {get_did(recipient)}")
+    if frm is not None and message.frm is not None and get_did(frm) != message.frm:
+        raise DIDCommValueError(f"`message.from` value {message.frm} is not equal to `from` value's DID {get_did(frm)}")
+    if message.from_prior is not None:
+        raise DIDCommValueError("`from_prior` is not supported when packing for many recipients")
+
+
+async def pack_encrypted_many(resolvers_config: ResolversConfig,
+                              message: Message,
+                              to: List[str],
+                              frm: Optional[str] = None,
+                              sign_frm: Optional[str] = None,
+                              config: Optional[PackEncryptedConfig] = None) -> PackEncryptedResult:
+    """
+    Packs a message as `pack_encrypted` does (without forwarding), but for any number of recipients.
+    Use `pack_encrypted` for a single recipient.
+
+    :param to: recipients' DIDs (or DID URLs)
+    :raises DIDCommValueError: if the message is invalid (see `validate_message`)
+    """
+    validate_message(message, to, frm, sign_frm)
+    keys = await find_pack_keys(frm, to, sign_frm, resolvers_config)
+    return pack_with_keys(message.as_dict(), keys, config or PackEncryptedConfig())
+
+
+async def find_pack_keys(frm: Optional[str],
+                         to: List[str],
+                         sign_frm: Optional[str],
+                         resolvers_config: ResolversConfig) -> PackKeys:
+    """
+    Selects keys as `pack_encrypted` does, but for any number of recipients:
+    the key agreement keys of all recipients compatible with the sender's key (authcrypt)
+    or with the first recipient's key (anoncrypt).
+
+    :param to: recipients' DIDs (or DID URLs)
+    :raises IncompatibleCryptoError: if a recipient has no compatible key
+    """
+    if not to:
+        raise DIDCommValueError("No recipients")
+
+    # 1. select encryption keys
+    frm_key = None
+    to_verification_methods = []
+    if frm is not None:
+        for recipient in to:
+            # the sender key selected for the first recipient is used for the others
+            pack_keys = await find_authcrypt_pack_sender_and_recipient_keys(
+                frm if frm_key is None else frm_key.kid, recipient, resolvers_config
+            )
+            if frm_key is None:
+                frm_key = Key(kid=pack_keys.sender_private_key.kid, key=extract_key(pack_keys.sender_private_key))
+            to_verification_methods.extend(pack_keys.recipient_public_keys)
+    else:
+        for recipient in to:
+            verification_methods = await find_anoncrypt_pack_recipient_public_keys(recipient, resolvers_config)
+            if to_verification_methods:
+                verification_methods = [vm for vm in verification_methods
+                                        if are_keys_compatible(to_verification_methods[0], vm)]
+                if not verification_methods:
+                    raise IncompatibleCryptoError()
+            to_verification_methods.extend(verification_methods)
+    to_keys = [Key(kid=vm.id, key=extract_key(vm)) for vm in to_verification_methods]
+
+    # 2. select the signing key
+    sign_key, sign_alg = None, None
+    if sign_frm is not None:
+        secret = await find_signing_key(sign_frm, resolvers_config)
+        sign_key, sign_alg = Key(kid=secret.kid, key=extract_key(secret)), extract_sign_alg(secret)
+
+    return PackKeys(to_keys=to_keys, frm_key=frm_key, sign_key=sign_key, sign_alg=sign_alg)
+
+
+def pack_with_keys(msg_dict: JSON_OBJ, keys: PackKeys, config: PackEncryptedConfig) -> PackEncryptedResult:
+    """
+    Signs (if needed) and encrypts a plaintext message with the selected keys.
+    The content is encrypted once; the content encryption key is wrapped for each recipient key.
+    The message must be validated first (see `validate_message`).
+    """
+    # 1. sign if needed
+    if keys.sign_key is not None:
+        protected = {"typ": DIDCommMessageTypes.SIGNED.value, "alg": keys.sign_alg.value}
+        msg_dict = JsonWebSignature().serialize_json(
+            [{"protected": protected, "header": {"kid": keys.sign_key.kid}}],
+            dict_to_json_bytes(msg_dict),
+            keys.sign_key.key
+        )
+
+    # 2. encrypt
+    if keys.frm_key is not None:
+        encrypt_res = authcrypt(msg_dict, keys.to_keys, keys.frm_key, config.enc_alg_auth)
+    else:
+        encrypt_res = anoncrypt(msg_dict, keys.to_keys, config.enc_alg_anon)
+
+    # 3. protect sender ID if needed
+    packed_msg_dict = encrypt_res.msg
+    if encrypt_res.from_kid is not None and config.protect_sender_id:
+        packed_msg_dict = anoncrypt(encrypt_res.msg, encrypt_res.to_keys, config.enc_alg_anon).msg
+
+    return PackEncryptedResult(
+        packed_msg=dict_to_json(packed_msg_dict),
+        to_kids=encrypt_res.to_kids,
+        from_kid=encrypt_res.from_kid,
+        sign_from_kid=keys.sign_key.kid if keys.sign_key is not None else None
+    )
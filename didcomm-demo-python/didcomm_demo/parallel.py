@@ -0,0 +1,177 @@
+import functools
+import itertools
+import os
+from concurrent.futures import Executor, Future, FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from didcomm.secrets.secrets_resolver_editable import SecretsResolverEditable
+from didcomm.unpack import UnpackResult
+
+from didcomm_demo.batch import BatchItemResult
+from didcomm_demo.compression import DEFAULT_MAX_DECOMPRESSED_SIZE
+from didcomm_demo.did_doc_disk_cache import DIDDocDiskCache, resolve_peer_did_json
+
+# DIDs resolved by a worker per task: resolving a DID takes less time than passing a task to a process
+DEFAULT_RESOLVE_CHUNK_SIZE = 256
+
+
+def default_workers_count() -> int:
+    return os.cpu_count() or 1
+
+
+def imap_as_completed(executor: Executor,
+                      fn: Callable,
+                      items: Iterable,
+                      max_pending: int,
+                      reject: Optional[Callable[[Any], Optional[Exception]]] = None) -> Iterator[BatchItemResult]:
+    """
+    Runs `fn` for every item on the executor and yields results as soon as they complete.
+
+    At most `max_pending` items are submitted at a time, so the input can be a lazy stream of any length.
+    A failed item is yielded with its error instead of failing the whole stream.
+
+    :param executor: executor to run `fn` on
+    :param fn: a function to be called for every item; must be picklable for process pools
+    :param items: input items
+    :param max_pending: max number of items submitted to the executor but not completed yet
+    :param reject: optional function returning an error for an item that must not be submitted
+    :return: iterator of results (in completion order) with `index` pointing to the input item
+    """
+    pending = {}
+    items = iter(enumerate(items))
+
+    def submit_next() -> bool:
+        try:
+            index, item = next(items)
+        except StopIteration:
+            return False
+        error = reject(item) if reject is not None else None
+        if error is None:
+            fut = executor.submit(fn, item)
+        else:
+            # a rejected item is yielded with its error as if it failed in the executor
+            fut = Future()
+            fut.set_exception(error)
+        pending[fut] = index
+        return True
+
+    while len(pending) < max_pending and submit_next():
+        pass
+
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            index = pending.pop(fut)
+            yield _to_batch_item_result(index, fut)
+            submit_next()
+
+
+def _to_batch_item_result(index: int, fut: Future) -> BatchItemResult:
+    try:
+        return BatchItemResult(index=index, result=fut.result())
+    except Exception as e:
+        return BatchItemResult(index=index, error=e)
+
+
+# DIDCommDemo instance of a worker process
+_worker_demo = None
+
+
+def init_worker(secrets_resolver: SecretsResolverEditable,
+                did_doc_cache_size: int,
+                did_doc_disk_cache: Optional[DIDDocDiskCache] = None,
+                max_decompressed_size: int = DEFAULT_MAX_DECOMPRESSED_SIZE):
+    """
+    Initializes a worker process.
+    Secrets are passed (and loaded) once per worker rather than once per task.
+    """
+    global _worker_demo
+    from didcomm_demo.didcomm_demo import DIDCommDemo
+    _worker_demo = DIDCommDemo(secrets_resolver, did_doc_cache_size=did_doc_cache_size,
+                               did_doc_disk_cache=did_doc_disk_cache,
+                               max_decompressed_size=max_decompressed_size)
+
+
+def unpack_in_worker(packed_msg: str) -> Tuple[str, Optional[str], str, UnpackResult]:
+    return _worker_demo.unpack(packed_msg)
+
+
+def resolve_peer_dids(dids: Iterable[str],
+                      format: str = "jwk",
+                      workers: Optional[int] = None,
+                      disk_cache: Optional[DIDDocDiskCache] = None,
+                      chunk_size: int = DEFAULT_RESOLVE_CHUNK_SIZE) -> Iterator[BatchItemResult]:
+    """
+    Resolves many peer DIDs to DID Doc JSONs in parallel on a pool of worker processes.
+
+    DIDs are sent to workers in chunks. A DID that can't be resolved (for example, a malformed one)
+    is yielded with its error.
+
+    :param dids: peer DIDs; can be a lazy stream
+    :param format: peer DID format name (`jwk` or `multibase`)
+    :param workers: number of worker processes. The number of CPUs by default. No pool is used if 1.
+    :param disk_cache: optional on-disk DID Doc cache
+    :param chunk_size: number of DIDs resolved by a worker per task
+    :return: iterator of results in completion order (in input order within a chunk).
+             `index` of a result points to the input DID, `result` is the DID Doc JSON.
+    """
+    workers = workers or default_workers_count()
+    resolve = functools.partial(_resolve_chunk, format=format)
+    chunks = _chunks(dids, chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            yield from resolve(chunk, disk_cache=disk_cache)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_resolve_worker,
+                             initargs=(disk_cache,)) as executor:
+        sizes = {}
+        for res in imap_as_completed(executor, resolve, _record_sizes(chunks, sizes), max_pending=2 * workers):
+            start, size = sizes.pop(res.index)
+            if res.ok:
+                yield from res.result
+            else:
+                # the worker failed as a whole (for example, was killed)
+                for index in range(start, start + size):
+                    yield BatchItemResult(index=index, error=res.error)
+
+
+def _chunks(items: Iterable[str], chunk_size: int) -> Iterator[Tuple[int, List[str]]]:
+    items = iter(items)
+    start = 0
+    while True:
+        chunk = list(itertools.islice(items, chunk_size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def _record_sizes(chunks: Iterator[Tuple[int, List[str]]], sizes: dict) -> Iterator[Tuple[int, List[str]]]:
+    for i, (start, chunk) in enumerate(chunks):
+        sizes[i] = start, len(chunk)
+        yield start, chunk
+
+
+# on-disk DID Doc cache of a worker process resolving DIDs
+_worker_disk_cache = None
+
+
+def _init_resolve_worker(disk_cache: Optional[DIDDocDiskCache]):
+    global _worker_disk_cache
+    _worker_disk_cache = disk_cache
+
+
+def _resolve_chunk(chunk: Tuple[int, List[str]],
+                   format: str,
+                   disk_cache: Optional[DIDDocDiskCache] = None) -> List[BatchItemResult]:
+    start, dids = chunk
+    disk_cache = disk_cache or _worker_disk_cache
+    results = []
+    for index, did in enumerate(dids, start):
+        try:
+            results.append(BatchItemResult(index=index, result=resolve_peer_did_json(did, format, disk_cache)))
+        except Exception as e:
+            results.append(BatchItemResult(index=index, error=e))
+    return results
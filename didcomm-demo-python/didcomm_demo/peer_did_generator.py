@@ -0,0 +1,94 @@
+import json
+from typing import List, Optional, Tuple, TYPE_CHECKING
+
+from didcomm.common.types import DID
+from didcomm.secrets.secrets_resolver import Secret
+from didcomm.secrets.secrets_util import generate_x25519_keys_as_jwk_dict, generate_ed25519_keys_as_jwk_dict, \
+    jwk_to_secret
+from peerdid import peer_did
+from peerdid.core.did_doc_types import DIDCommServicePeerDID
+from peerdid.core.peer_did_helper import create_multibase_encnumbasis
+from peerdid.types import VerificationMaterialFormatPeerDID, VerificationMaterialAgreement, \
+    VerificationMethodTypeAgreement, VerificationMaterialAuthentication, VerificationMethodTypeAuthentication, \
+    VerificationMaterial
+
+if TYPE_CHECKING:
+    from didcomm_demo.key_pool import KeyPool
+
+
+def generate_peer_did(auth_keys_count: int = 1,
+                      agreement_keys_count: int = 1,
+                      service_endpoint: Optional[str] = None,
+                      service_routing_keys: Optional[List[str]] = None,
+                      key_pool: Optional["KeyPool"] = None
+                      ) -> Tuple[DID, List[Secret]]:
+    """
+    Generates keys and a new peer DID for them.
+
+    :param key_pool: optional pool of pre-generated keys. Keys are generated inline if not set.
+    :return: the peer DID and the secrets (private keys) with KIDs as in the peer DID's DID Doc
+    """
+    # 1. generate (or take pre-generated) keys in JWK format
+    generate_x25519 = key_pool.get_x25519 if key_pool else generate_x25519_keys_as_jwk_dict
+    generate_ed25519 = key_pool.get_ed25519 if key_pool else generate_ed25519_keys_as_jwk_dict
+    agreem_keys = [generate_x25519() for _ in range(agreement_keys_count)]
+    auth_keys = [generate_ed25519() for _ in range(auth_keys_count)]
+
+    # 2. prepare the keys for peer DID lib
+    agreem_keys_peer_did = [
+        VerificationMaterialAgreement(
+            type=VerificationMethodTypeAgreement.JSON_WEB_KEY_2020,
+            format=VerificationMaterialFormatPeerDID.JWK,
+            value=k[1],
+        )
+        for k in agreem_keys
+    ]
+    auth_keys_peer_did = [
+        VerificationMaterialAuthentication(
+            type=VerificationMethodTypeAuthentication.JSON_WEB_KEY_2020,
+            format=VerificationMaterialFormatPeerDID.JWK,
+            value=k[1],
+        )
+        for k in auth_keys
+    ]
+
+    # 3. generate service
+    service = None
+    if service_endpoint:
+        service = json.dumps(
+            DIDCommServicePeerDID(
+                id="new-id",
+                service_endpoint=service_endpoint, routing_keys=service_routing_keys,
+                accept=["didcomm/v2"]
+            ).to_dict()
+        )
+
+    # 4. call peer DID lib
+    # if we have just one key (auth), then use numalg0 algorithm
+    # otherwise use numalg2 algorithm
+    if len(auth_keys_peer_did) == 1 and not agreem_keys_peer_did and not service:
+        did = peer_did.create_peer_did_numalgo_0(auth_keys_peer_did[0])
+    else:
+        did = peer_did.create_peer_did_numalgo_2(
+            encryption_keys=agreem_keys_peer_did,
+            signing_keys=auth_keys_peer_did,
+            service=service,
+        )
+
+    # 5. set KIDs as in DID DOC for secrets
+    secrets = []
+    for keys, keys_peer_did in ((auth_keys, auth_keys_peer_did), (agreem_keys, agreem_keys_peer_did)):
+        for key, key_peer_did in zip(keys, keys_peer_did):
+            private_key = key[0]
+            private_key["kid"] = peer_did_kid(did, key_peer_did)
+            secrets.append(jwk_to_secret(private_key))
+
+    return did, secrets
+
+
+def peer_did_kid(did: DID, key: VerificationMaterial) -> str:
+    """
+    Derives the KID of a numalgo 0 or 2 peer DID key without resolving the DID.
+    The KID is the DID plus the key's encnumbasis (multibase value without the transform prefix) as a fragment.
+    """
+    return did + "#" + create_multibase_encnumbasis(key)[1:]
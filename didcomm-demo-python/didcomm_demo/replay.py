@@ -0,0 +1,368 @@
+import fcntl
+import hashlib
+import math
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from functools import reduce
+from operator import or_
+from typing import Callable, Iterable, Optional, Tuple
+
+from didcomm.core.utils import get_did
+from didcomm.errors import DIDCommValueError
+from didcomm.unpack import UnpackResult
+
+DEFAULT_REPLAY_WINDOW = 3600
+DEFAULT_REPLAY_CAPACITY = 1_000_000
+DEFAULT_REPLAY_FP_RATE = 1e-6
+
+# blocked Bloom filter: every ID sets bits within one block of 256 bits (32 bytes),
+# at positions given by the bytes of its digest after the 8 bytes selecting the block
+_BLOCK_SIZE = 32
+_BLOCK_INDEX_SIZE = 8
+_MAX_HASHES = 24
+_DIGEST_SIZE = _BLOCK_INDEX_SIZE + _MAX_HASHES
+_BITS = [1 << i for i in range(_BLOCK_SIZE * 8)]
+
+# snapshot file: magic, window, capacity, fp rate, blocks per filter, hash count, current filter start time
+_SNAPSHOT_MAGIC = b"DIDCOMM-REPLAY-2"
+_SNAPSHOT_HEADER = struct.Struct("<16sdqdqqd")
+
+
+class ReplayedMessageError(DIDCommValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class ReplayDetectorStats:
+    """
+    Attributes:
+        checked (int): number of messages checked by this instance
+        replays (int): number of messages detected as replayed by this instance
+        tracked (int): number of message IDs added to the current filter
+        rotations (int): number of filter rotations by this instance
+        memory_bytes (int): size of the filters in bytes
+        fp_rate (float): configured false positive rate
+    """
+
+    checked: int
+    replays: int
+    tracked: int
+    rotations: int
+    memory_bytes: int
+    fp_rate: float
+
+
+class _BloomFilter:
+    """
+    A blocked Bloom filter: all bits of an ID are in one block smaller than a cache line, so that a check
+    reads a single block as an integer instead of testing bits one by one.
+    """
+
+    def __init__(self, blocks: int, hashes: int, data: Optional[bytearray] = None) -> None:
+        self.blocks = blocks
+        self.hashes = hashes
+        self.data = data if data is not None else bytearray(blocks * _BLOCK_SIZE)
+
+    def position(self, digest: bytes) -> Tuple[int, int]:
+        """
+        :return: offset of the block and the mask of the bits of a digest
+        """
+        block = int.from_bytes(digest[:_BLOCK_INDEX_SIZE], "little") % self.blocks
+        mask = reduce(or_, map(_BITS.__getitem__, digest[_BLOCK_INDEX_SIZE:_BLOCK_INDEX_SIZE + self.hashes]))
+        return block * _BLOCK_SIZE, mask
+
+    def contains(self, offset: int, mask: int) -> bool:
+        return int.from_bytes(self.data[offset:offset + _BLOCK_SIZE], "little") & mask == mask
+
+    def add(self, offset: int, mask: int):
+        value = int.from_bytes(self.data[offset:offset + _BLOCK_SIZE], "little") | mask
+        self.data[offset:offset + _BLOCK_SIZE] = value.to_bytes(_BLOCK_SIZE, "little")
+
+    def clear(self):
+        self.data = bytearray(len(self.data))
+
+
+def _block_fp_rate(bits_per_id: float, hashes: int) -> float:
+    # the number of IDs in a block is Poisson distributed; a block with i IDs has
+    # the false positive rate of a standard Bloom filter of its size
+    block_bits = _BLOCK_SIZE * 8
+    ids_per_block = block_bits / bits_per_id
+    p_ids = math.exp(-ids_per_block)
+    rate = 0.0
+    for i in range(int(ids_per_block * 8) + 50):
+        if i > 0:
+            p_ids *= ids_per_block / i
+        rate += p_ids * (1 - (1 - 1 / block_bits) ** (i * hashes)) ** hashes
+    return rate
+
+
+def filter_size(capacity: int, fp_rate: float) -> Tuple[int, int]:
+    """
+    Finds the smallest blocked Bloom filter holding `capacity` IDs at `fp_rate`.
+
+    :return: number of blocks and number of hashes
+    """
+    best = None
+    for hashes in range(1, _MAX_HASHES + 1):
+        # bisection of bits per ID: the rate decreases as bits are added
+        low, high = 1.0, 1024.0
+        if _block_fp_rate(high, hashes) > fp_rate:
+            continue
+        while high - low > 0.01:
+            mid = (low + high) / 2
+            if _block_fp_rate(mid, hashes) > fp_rate:
+                low = mid
+            else:
+                high = mid
+        if best is None or high < best[0]:
+            best = (high, hashes)
+    if best is None:
+        raise ValueError(f"fp_rate is too low: {fp_rate}")
+    bits_per_id, hashes = best
+    return math.ceil(capacity * bits_per_id / (_BLOCK_SIZE * 8)), hashes
+
+
+class ReplayDetector:
+    """
+    Detects replayed messages by (sender, message ID) within a time window in bounded memory.
+
+    IDs are kept in two (blocked) Bloom filters: the current one gets new IDs, the previous one is only checked.
+    Every `window` seconds the current filter becomes the previous one and the previous one is dropped,
+    so an ID is remembered for at least `window` and at most `2 * window` seconds.
+    Each filter is sized for `capacity` IDs per window at half of `fp_rate`, so that the chance of a fresh
+    message being taken for a replay is at most `fp_rate` while at most `capacity` messages are received per window.
+    A replay is never missed within the window.
+
+    If `path` is set, the filters are saved to it on every rotation and IDs added since are appended
+    to a journal (`<path>.journal`) as they're added, so that they survive a crash of the process
+    (and a power loss if `fsync` is set). The state is loaded from the path on creation.
+    A state file is locked by the detector until it's closed, so it can't be used by many processes at once.
+
+    :param window: min time in seconds a message ID is remembered
+    :param capacity: expected max number of messages per window
+    :param fp_rate: max rate of fresh messages detected as replays
+    :param path: optional file to persist the state to
+    :param clock: time function, `time.time` by default
+    :param fsync: whether to sync the journal to disk after every added ID
+    :raises ValueError: if the state file is invalid or used by another detector
+    """
+
+    def __init__(self,
+                 window: float = DEFAULT_REPLAY_WINDOW,
+                 capacity: int = DEFAULT_REPLAY_CAPACITY,
+                 fp_rate: float = DEFAULT_REPLAY_FP_RATE,
+                 path: Optional[str] = None,
+                 clock: Callable[[], float] = time.time,
+                 fsync: bool = False) -> None:
+        if window <= 0:
+            raise ValueError(f"window must be positive: {window}")
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive: {capacity}")
+        if not 0 < fp_rate < 1:
+            raise ValueError(f"fp_rate must be between 0 and 1: {fp_rate}")
+        self.window = window
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.path = path
+        self.fsync = fsync
+        self._clock = clock
+        # a fresh ID is checked against both filters, so each has half of the false positive rate
+        blocks, hashes = filter_size(capacity, fp_rate / 2)
+        self._current = _BloomFilter(blocks, hashes)
+        self._previous = _BloomFilter(blocks, hashes)
+        self._current_started = clock()
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._journal = None
+        self._checked = 0
+        self._replays = 0
+        self._tracked = 0
+        self._rotations = 0
+        if path is not None:
+            self._lock_file = open(path + ".lock", "a")
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self._lock_file.close()
+                raise ValueError(f"Replay detector state {path} is used by another process")
+            try:
+                snapshot_exists = os.path.exists(path)
+                journal_size = self._load()
+                # unbuffered, so that every added ID is written at once
+                self._journal = open(self._journal_path, "ab", buffering=0)
+                # a grown journal is merged into the snapshot, so that loading stays fast
+                if not snapshot_exists or journal_size > len(self._current.data) // 2:
+                    self._save()
+                with self._lock:
+                    self._rotate_if_needed()
+            except BaseException:
+                self.close()
+                raise
+
+    @property
+    def _journal_path(self) -> str:
+        return self.path + ".journal"
+
+    def check_and_add(self, msg_id: str, sender: Optional[str] = None) -> bool:
+        """
+        Checks whether a message was seen within the window and remembers it.
+
+        :param sender: sender's DID; None for anonymous messages
+        :return: True if the message is a replay
+        """
+        digest = _digest(msg_id, sender)
+        with self._lock:
+            self._rotate_if_needed()
+            self._checked += 1
+            offset, mask = self._current.position(digest)
+            if self._current.contains(offset, mask) or self._previous.contains(offset, mask):
+                self._replays += 1
+                return True
+            self._current.add(offset, mask)
+            self._tracked += 1
+            self._write_journal(digest)
+            return False
+
+    def check(self, msg_id: str, sender: Optional[str] = None) -> bool:
+        """
+        Checks whether a message was seen within the window without remembering it.
+        """
+        offset, mask = self._current.position(_digest(msg_id, sender))
+        with self._lock:
+            self._rotate_if_needed()
+            return self._current.contains(offset, mask) or self._previous.contains(offset, mask)
+
+    def add_many(self, ids: Iterable[tuple]):
+        """
+        Remembers many `(msg_id, sender)` pairs without checking them.
+        """
+        with self._lock:
+            self._rotate_if_needed()
+            digests = []
+            for msg_id, sender in ids:
+                digest = _digest(msg_id, sender)
+                self._current.add(*self._current.position(digest))
+                self._tracked += 1
+                digests.append(digest)
+            self._write_journal(b"".join(digests))
+
+    def _write_journal(self, data: bytes):
+        if self._journal is None or not data:
+            return
+        self._journal.write(data)
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def _rotate_if_needed(self):
+        elapsed = self._clock() - self._current_started
+        if elapsed < self.window:
+            return
+        if elapsed < 2 * self.window:
+            self._current, self._previous = self._previous, self._current
+            self._current.clear()
+        else:
+            # nothing seen in the last window
+            self._current.clear()
+            self._previous.clear()
+        self._current_started += self.window * int(elapsed // self.window)
+        self._tracked = 0
+        self._rotations += 1
+        if self.path is not None:
+            self._save()
+
+    def flush(self):
+        """
+        Syncs the journal to disk if `path` is set.
+        """
+        with self._lock:
+            if self._journal is not None:
+                os.fsync(self._journal.fileno())
+
+    def close(self):
+        """
+        Closes the journal and unlocks the state file.
+        """
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def stats(self) -> ReplayDetectorStats:
+        with self._lock:
+            return ReplayDetectorStats(
+                checked=self._checked,
+                replays=self._replays,
+                tracked=self._tracked,
+                rotations=self._rotations,
+                memory_bytes=len(self._current.data) + len(self._previous.data),
+                fp_rate=self.fp_rate
+            )
+
+    def _header(self) -> bytes:
+        return _SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, self.window, self.capacity, self.fp_rate,
+                                     self._current.blocks, self._current.hashes, self._current_started)
+
+    def _save(self):
+        # the snapshot is replaced atomically, then the journal it includes is truncated
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self._header())
+            f.write(self._current.data)
+            f.write(self._previous.data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        if self._journal is not None:
+            self._journal.truncate(0)
+
+    def _load(self) -> int:
+        """
+        :return: size of the journal
+        """
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                header = f.read(_SNAPSHOT_HEADER.size)
+                if len(header) != _SNAPSHOT_HEADER.size:
+                    raise ValueError(f"Invalid replay detector state file: {self.path}")
+                magic, window, capacity, fp_rate, blocks, hashes, current_started = _SNAPSHOT_HEADER.unpack(header)
+                if magic != _SNAPSHOT_MAGIC:
+                    raise ValueError(f"Invalid replay detector state file: {self.path}")
+                if (window, capacity, fp_rate) != (self.window, self.capacity, self.fp_rate):
+                    raise ValueError(f"Replay detector state {self.path} was saved with window={window}, "
+                                     f"capacity={capacity} and fp_rate={fp_rate}")
+                size = len(self._current.data)
+                current, previous = bytearray(f.read(size)), bytearray(f.read(size))
+                if len(current) != size or len(previous) != size:
+                    raise ValueError(f"Invalid replay detector state file: {self.path}")
+            self._current = _BloomFilter(blocks, hashes, current)
+            self._previous = _BloomFilter(blocks, hashes, previous)
+            self._current_started = current_started
+        if not os.path.exists(self._journal_path):
+            return 0
+        # IDs added after the snapshot belong to the snapshot's current filter
+        with open(self._journal_path, "rb") as f:
+            journal = f.read()
+        # a partially written digest at the end is ignored
+        for i in range(0, len(journal) - _DIGEST_SIZE + 1, _DIGEST_SIZE):
+            self._current.add(*self._current.position(journal[i:i + _DIGEST_SIZE]))
+            self._tracked += 1
+        return len(journal)
+
+
+def _digest(msg_id: str, sender: Optional[str]) -> bytes:
+    return hashlib.blake2b(f"{sender or ''}\n{msg_id}".encode(), digest_size=_DIGEST_SIZE).digest()
+
+
+def message_sender(res: UnpackResult) -> Optional[str]:
+    """
+    The sender's DID a message ID is unique for: the authenticated sender, the signer or the `from` of the message.
+    None for an anonymous message.
+    """
+    kid = res.metadata.encrypted_from or res.metadata.sign_from
+    return get_did(kid) if kid else res.message.frm
@@ -0,0 +1,250 @@
+import base64
+import hashlib
+import json
+import struct
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from didcomm.common.types import DID_URL, VerificationMaterialFormat
+from didcomm.secrets.secrets_resolver import Secret
+from didcomm.secrets.secrets_resolver_editable import SecretsResolverEditable
+from didcomm.secrets.secrets_util import jwk_to_secret
+
+# curves of OKP keys kept as raw key material, by their code in the store
+_CURVES = ["X25519", "Ed25519"]
+_CURVE_CODES = {crv: code for code, crv in enumerate(_CURVES)}
+_KEY_SIZE = 32
+# private key (d) followed by public key (x)
+_RECORD_SIZE = 2 * _KEY_SIZE
+
+_EMPTY = -1
+_MIN_SLOTS = 16
+_DID_NUMBER = struct.Struct("<I")
+
+
+class _StringTable:
+    """
+    Byte strings numbered in order of addition, kept in one buffer
+    and looked up by an open addressing hash table of their numbers.
+    """
+
+    def __init__(self) -> None:
+        self._data = bytearray()
+        self._offsets = array("Q", [0])
+        self._hashes = array("q")
+        self._slots = array("q", [_EMPTY]) * _MIN_SLOTS
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._data) + 8 * (len(self._offsets) + len(self._hashes) + len(self._slots))
+
+    def __getitem__(self, number: int) -> bytes:
+        return bytes(self._data[self._offsets[number]:self._offsets[number + 1]])
+
+    def find(self, value: bytes) -> int:
+        """
+        :return: number of the string or -1 if it's not in the table
+        """
+        return self._slots[self._find_slot(value, _hash(value))]
+
+    def add(self, value: bytes) -> int:
+        """
+        :return: number of the string, added if it's not in the table
+        """
+        value_hash = _hash(value)
+        slot = self._find_slot(value, value_hash)
+        if self._slots[slot] != _EMPTY:
+            return self._slots[slot]
+        number = len(self._hashes)
+        self._data += value
+        self._offsets.append(len(self._data))
+        self._hashes.append(value_hash)
+        self._slots[slot] = number
+        # keep the table at most half full
+        if 2 * len(self._hashes) > len(self._slots):
+            self._grow()
+        return number
+
+    def _find_slot(self, value: bytes, value_hash: int) -> int:
+        """
+        :return: the slot of the string or the empty slot to insert it to
+        """
+        mask = len(self._slots) - 1
+        slot = value_hash & mask
+        while True:
+            number = self._slots[slot]
+            if number == _EMPTY or (self._hashes[number] == value_hash and self[number] == value):
+                return slot
+            slot = (slot + 1) & mask
+
+    def _grow(self):
+        slots = array("q", [_EMPTY]) * (2 * len(self._slots))
+        mask = len(slots) - 1
+        for number, value_hash in enumerate(self._hashes):
+            slot = value_hash & mask
+            while slots[slot] != _EMPTY:
+                slot = (slot + 1) & mask
+            slots[slot] = number
+        self._slots = slots
+
+
+class SecretsResolverCompact(SecretsResolverEditable):
+    """
+    In-memory secrets resolver keeping millions of keys in little memory.
+
+    X25519 and Ed25519 keys (all keys of peer DIDs) are kept as raw 32-byte private and public keys
+    in packed arrays rather than as `Secret` objects with JWK strings. `Secret` objects are created on lookup.
+    Key IDs are split into the DID, interned in a table shared by all keys of the DID, and the fragment;
+    both tables are kept in packed arrays too. Keys of other types are kept as they are.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._dids = _StringTable()
+        # key records are numbered by their key ID: the DID number and the rest of the key ID (`#fragment`)
+        self._kids = _StringTable()
+        self._curves = bytearray()
+        self._material = bytearray()
+        self._other: Dict[DID_URL, Secret] = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def keys_count(self) -> int:
+        return len(self._kids) + sum(1 for kid in self._other if self._record(kid) == _EMPTY)
+
+    @property
+    def memory_bytes(self) -> int:
+        """
+        Size of the packed arrays in bytes (not including keys of other types).
+        """
+        return self._dids.memory_bytes + self._kids.memory_bytes + len(self._curves) + len(self._material)
+
+    async def add_key(self, secret: Secret):
+        self.add_keys_sync([secret])
+
+    async def add_keys(self, secrets: List[Secret]):
+        self.add_keys_sync(secrets)
+
+    def add_keys_sync(self, secrets: Iterable[Secret]):
+        with self._lock:
+            for secret in secrets:
+                self._add(secret)
+
+    def _add(self, secret: Secret):
+        raw = _raw_key(secret)
+        if raw is None:
+            # shadows a raw key with the same ID if any
+            self._other[secret.kid] = secret
+            return
+        curve, material = raw
+        self._other.pop(secret.kid, None)
+        did, fragment = _split_kid(secret.kid)
+        record = self._kids.add(_DID_NUMBER.pack(self._dids.add(did)) + fragment)
+        if record < len(self._curves):
+            # a key with the same ID is replaced
+            self._curves[record] = curve
+            self._material[record * _RECORD_SIZE:(record + 1) * _RECORD_SIZE] = material
+        else:
+            self._curves.append(curve)
+            self._material += material
+
+    def _record(self, kid: DID_URL) -> int:
+        did, fragment = _split_kid(kid)
+        did_number = self._dids.find(did)
+        if did_number == _EMPTY:
+            return _EMPTY
+        return self._kids.find(_DID_NUMBER.pack(did_number) + fragment)
+
+    def _kid(self, record: int) -> str:
+        kid = self._kids[record]
+        return (self._dids[_DID_NUMBER.unpack_from(kid)[0]] + kid[_DID_NUMBER.size:]).decode("utf-8")
+
+    async def get_kids(self) -> List[str]:
+        return self.get_kids_sync()
+
+    def get_kids_sync(self) -> List[str]:
+        with self._lock:
+            kids = (self._kid(record) for record in range(len(self._kids)))
+            return [kid for kid in kids if kid not in self._other] + list(self._other)
+
+    async def get_key(self, kid: DID_URL) -> Optional[Secret]:
+        return self.get_key_sync(kid)
+
+    def get_key_sync(self, kid: DID_URL) -> Optional[Secret]:
+        with self._lock:
+            if kid in self._other:
+                return self._other[kid]
+            record = self._record(kid)
+            if record == _EMPTY:
+                return None
+            curve = _CURVES[self._curves[record]]
+            material = bytes(self._material[record * _RECORD_SIZE:(record + 1) * _RECORD_SIZE])
+        # the fields are in the order of generated JWKs
+        return jwk_to_secret({
+            "crv": curve,
+            "x": _b64encode(material[_KEY_SIZE:]),
+            "d": _b64encode(material[:_KEY_SIZE]),
+            "kty": "OKP",
+            "kid": kid,
+        })
+
+    async def get_keys(self, kids: List[DID_URL]) -> List[DID_URL]:
+        return self.get_keys_sync(kids)
+
+    def get_keys_sync(self, kids: List[DID_URL]) -> List[DID_URL]:
+        with self._lock:
+            return [kid for kid in kids if kid in self._other or self._record(kid) != _EMPTY]
+
+
+def _split_kid(kid: str) -> Tuple[bytes, bytes]:
+    """
+    :return: the DID and the rest of the key ID starting with `#` (empty if there is no fragment)
+    """
+    did, sep, fragment = kid.partition("#")
+    return did.encode("utf-8"), (sep + fragment).encode("utf-8")
+
+
+def _hash(value: bytes) -> int:
+    # unlike hash(), the same in all processes, so that the resolver can be sent to worker processes
+    return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), "little", signed=True)
+
+
+def _raw_key(secret: Secret) -> Optional[tuple]:
+    """
+    :return: the curve code and the private and public keys of an X25519 or Ed25519 JWK secret;
+             None for other secrets
+    """
+    if secret.verification_material.format != VerificationMaterialFormat.JWK:
+        return None
+    jwk = json.loads(secret.verification_material.value)
+    if jwk.get("kty") != "OKP" or jwk.get("crv") not in _CURVE_CODES or set(jwk) - {"kty", "crv", "x", "d", "kid"}:
+        return None
+    d, x = _b64decode(jwk.get("d")), _b64decode(jwk.get("x"))
+    if d is None or x is None or len(d) != _KEY_SIZE or len(x) != _KEY_SIZE:
+        return None
+    return _CURVE_CODES[jwk["crv"]], d + x
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(value) -> Optional[bytes]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+    except ValueError:
+        return None
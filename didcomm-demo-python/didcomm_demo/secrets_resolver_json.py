@@ -0,0 +1,49 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from didcomm.common.types import DID_URL
+from didcomm.secrets.secrets_resolver import Secret
+from didcomm.secrets.secrets_resolver_editable import SecretsResolverEditable
+from didcomm.secrets.secrets_util import jwk_to_secret, secret_to_jwk_dict
+
+
+class SecretsResolverJson(SecretsResolverEditable):
+    """
+    Secrets resolver backed by a JSON file with a list of JWKs (the format of the library's `SecretsResolverDemo`).
+
+    The whole file is loaded into memory and rewritten on every change,
+    so `add_keys` adds many secrets with a single write.
+    """
+
+    def __init__(self, file_path="secrets.json"):
+        self.file_path = str(file_path)
+        self._secrets: Dict[DID_URL, Secret] = {}
+        if not Path(self.file_path).exists():
+            self._save()
+        with open(self.file_path) as f:
+            self._secrets = {jwk["kid"]: jwk_to_secret(jwk) for jwk in json.load(f)}
+
+    def _save(self):
+        # written to a temporary file first, so that the file is never left half-written
+        tmp_path = self.file_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump([secret_to_jwk_dict(s) for s in self._secrets.values()], f)
+        os.replace(tmp_path, self.file_path)
+
+    async def add_key(self, secret: Secret):
+        await self.add_keys([secret])
+
+    async def add_keys(self, secrets: List[Secret]):
+        self._secrets.update((secret.kid, secret) for secret in secrets)
+        self._save()
+
+    async def get_kids(self) -> List[str]:
+        return list(self._secrets.keys())
+
+    async def get_key(self, kid: DID_URL) -> Optional[Secret]:
+        return self._secrets.get(kid)
+
+    async def get_keys(self, kids: List[DID_URL]) -> List[DID_URL]:
+        return [kid for kid in kids if kid in self._secrets]
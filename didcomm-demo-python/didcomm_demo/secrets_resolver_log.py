@@ -0,0 +1,195 @@
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import BinaryIO, Iterable, List, Optional, Tuple
+
+from didcomm.common.types import DID_URL
+from didcomm.secrets.secrets_resolver import Secret
+from didcomm.secrets.secrets_resolver_editable import SecretsResolverEditable
+from didcomm.secrets.secrets_util import jwk_to_secret, secret_to_jwk_dict
+
+from didcomm_demo.secrets_resolver_compact import SecretsResolverCompact
+
+# the log is compacted when it has at least this many lines and twice as many lines as keys
+MIN_COMPACT_LINES = 1000
+
+# first line of the log: its generation, incremented by every compaction
+_HEADER_PREFIX = b'{"generation": '
+
+
+class SecretsResolverLog(SecretsResolverEditable):
+    """
+    Secrets resolver backed by an append-only log of JWKs (one JSON object per line),
+    safe to be used by many processes at once.
+
+    Added secrets are appended to the log under an exclusive lock of `<file_path>.lock`, so adding is O(1)
+    and no process loses keys added by another. Each process keeps the secrets in memory
+    (see `SecretsResolverCompact`) and reads only the lines appended since it last read the log,
+    when a key is not found in memory.
+    Keys replaced by adding a key with the same ID are dropped from the log by compaction,
+    run in a background thread once the log has twice as many lines as keys.
+    Replaced keys are seen by other processes after compaction.
+    The log starts with a header line with its generation, so that processes notice it's been rewritten.
+    """
+
+    def __init__(self, file_path="secrets.log"):
+        self.file_path = str(file_path)
+        self._lock_path = self.file_path + ".lock"
+        self._lock = threading.Lock()
+        self._secrets = SecretsResolverCompact()
+        # the log read so far: its generation, size and number of lines
+        self._generation = None
+        self._offset = 0
+        self._lines = 0
+        self._compaction = None
+        with self._file_lock(fcntl.LOCK_EX):
+            if not os.path.exists(self.file_path):
+                self._write_log(0, [])
+            self._read_tail()
+
+    def __getstate__(self):
+        return {"file_path": self.file_path}
+
+    def __setstate__(self, state):
+        self.__init__(state["file_path"])
+
+    @contextmanager
+    def _file_lock(self, operation: int):
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_tail(self):
+        """
+        Reads lines appended since the last read (or the whole log if it's been compacted since).
+        Must be called with the file lock held.
+        """
+        with open(self.file_path, "rb") as f:
+            generation, header_end = _read_header(f)
+            if generation != self._generation:
+                self._generation, self._offset, self._lines = generation, header_end, 0
+            f.seek(self._offset)
+            tail = f.read()
+        # a line without a newline is being written by a process that died
+        end = tail.rfind(b"\n") + 1
+        secrets = []
+        for line in tail[:end].splitlines():
+            self._lines += 1
+            try:
+                secrets.append(jwk_to_secret(json.loads(line)))
+            except (ValueError, KeyError, TypeError):
+                # a line broken by a process that died while writing it
+                continue
+        self._offset += end
+        self._secrets.add_keys_sync(secrets)
+
+    def _refresh(self):
+        # nothing to read if the log has neither grown nor been rewritten
+        try:
+            f = open(self.file_path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            generation, _ = _read_header(f)
+            size = os.fstat(f.fileno()).st_size
+        if generation == self._generation and size == self._offset:
+            return
+        with self._lock, self._file_lock(fcntl.LOCK_SH):
+            self._read_tail()
+
+    async def add_key(self, secret: Secret):
+        await self.add_keys([secret])
+
+    async def add_keys(self, secrets: List[Secret]):
+        """
+        Appends all the secrets to the log at once.
+        """
+        data = "".join(json.dumps(secret_to_jwk_dict(s)) + "\n" for s in secrets).encode("utf-8")
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._read_tail()
+            with open(self.file_path, "ab") as f:
+                # a broken last line left by a process that died is ended, so that it doesn't break the new ones
+                if f.tell() > self._offset:
+                    data = b"\n" + data
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+                self._offset = f.tell()
+            self._lines += len(secrets)
+            self._secrets.add_keys_sync(secrets)
+            if self._compaction_needed():
+                self._compaction = threading.Thread(target=self.compact, name="secrets-log-compaction", daemon=True)
+                self._compaction.start()
+
+    def _compaction_needed(self) -> bool:
+        if self._compaction is not None and self._compaction.is_alive():
+            return False
+        return self._lines >= max(MIN_COMPACT_LINES, 2 * self._secrets.keys_count)
+
+    def compact(self):
+        """
+        Rewrites the log with the last secret of every key ID.
+        """
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._read_tail()
+            secrets = (self._secrets.get_key_sync(kid) for kid in self._secrets.get_kids_sync())
+            self._write_log(self._generation + 1, secrets)
+            self._generation = None
+            self._read_tail()
+
+    def _write_log(self, generation: int, secrets: Iterable[Secret]):
+        """
+        Replaces the log with a new one of the given generation and secrets. Must be called with the file lock held.
+        """
+        tmp_path = self.file_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER_PREFIX + str(generation).encode("ascii") + b"}\n")
+            for secret in secrets:
+                f.write(json.dumps(secret_to_jwk_dict(secret)).encode("utf-8") + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.file_path)
+
+    def close(self):
+        """
+        Waits for a running compaction to finish.
+        """
+        if self._compaction is not None:
+            self._compaction.join()
+
+    async def get_kids(self) -> List[str]:
+        self._refresh()
+        return self._secrets.get_kids_sync()
+
+    async def get_key(self, kid: DID_URL) -> Optional[Secret]:
+        secret = self._secrets.get_key_sync(kid)
+        if secret is None:
+            self._refresh()
+            secret = self._secrets.get_key_sync(kid)
+        return secret
+
+    async def get_keys(self, kids: List[DID_URL]) -> List[DID_URL]:
+        found = self._secrets.get_keys_sync(kids)
+        if len(found) < len(kids):
+            self._refresh()
+            found = self._secrets.get_keys_sync(kids)
+        return found
+
+
+def _read_header(f: BinaryIO) -> Tuple[int, int]:
+    """
+    :return: the generation of the log and the size of its header (0 for logs without a header)
+    """
+    f.seek(0)
+    line = f.readline()
+    if line.startswith(_HEADER_PREFIX) and line.endswith(b"\n"):
+        try:
+            return int(json.loads(line)["generation"]), len(line)
+        except (ValueError, KeyError, TypeError):
+            pass
+    return 0, 0
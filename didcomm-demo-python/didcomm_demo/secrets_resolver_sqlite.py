@@ -0,0 +1,78 @@
+import json
+import sqlite3
+import threading
+from typing import List, Optional
+
+from didcomm.common.types import DID_URL
+from didcomm.secrets.secrets_resolver import Secret
+from didcomm.secrets.secrets_resolver_editable import SecretsResolverEditable
+from didcomm.secrets.secrets_util import jwk_to_secret, secret_to_jwk_dict
+
+# SQLite versions before 3.32 limit the number of host parameters to 999
+_MAX_QUERY_PARAMS = 900
+
+
+class SecretsResolverSqlite(SecretsResolverEditable):
+    """
+    Secrets resolver backed by an SQLite database.
+
+    Secrets are looked up by the primary key (kid) index,
+    so the keystore is never loaded into memory as a whole.
+    """
+
+    def __init__(self, file_path="secrets.db"):
+        self.file_path = str(file_path)
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.file_path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS secrets (kid TEXT PRIMARY KEY, jwk TEXT NOT NULL) WITHOUT ROWID"
+        )
+        return conn
+
+    def __getstate__(self):
+        return {"file_path": self.file_path}
+
+    def __setstate__(self, state):
+        self.file_path = state["file_path"]
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    async def add_key(self, secret: Secret):
+        await self.add_keys([secret])
+
+    async def add_keys(self, secrets: List[Secret]):
+        """
+        Adds all the secrets in one transaction.
+        """
+        rows = [(s.kid, json.dumps(secret_to_jwk_dict(s))) for s in secrets]
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany("INSERT OR REPLACE INTO secrets (kid, jwk) VALUES (?, ?)", rows)
+
+    async def get_kids(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT kid FROM secrets")]
+
+    async def get_key(self, kid: DID_URL) -> Optional[Secret]:
+        with self._lock:
+            row = self._conn.execute("SELECT jwk FROM secrets WHERE kid = ?", (kid,)).fetchone()
+        return jwk_to_secret(json.loads(row[0])) if row else None
+
+    async def get_keys(self, kids: List[DID_URL]) -> List[DID_URL]:
+        found = set()
+        with self._lock:
+            for i in range(0, len(kids), _MAX_QUERY_PARAMS):
+                chunk = kids[i:i + _MAX_QUERY_PARAMS]
+                query = "SELECT kid FROM secrets WHERE kid IN ({})".format(",".join("?" * len(chunk)))
+                found.update(row[0] for row in self._conn.execute(query, chunk))
+        return [kid for kid in kids if kid in found]
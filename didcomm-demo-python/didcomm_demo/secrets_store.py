@@ -0,0 +1,39 @@
+from enum import Enum
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from didcomm.secrets.secrets_resolver_editable import SecretsResolverEditable
+
+
+class SecretsStore(Enum):
+    JSON = "json"
+    SQLITE = "sqlite"
+    LOG = "log"
+
+
+DEFAULT_SECRETS_FILES = {
+    SecretsStore.JSON: "secrets.json",
+    SecretsStore.SQLITE: "secrets.db",
+    SecretsStore.LOG: "secrets.log",
+}
+
+
+def create_secrets_resolver(store: SecretsStore = SecretsStore.JSON,
+                            file_path: Optional[str] = None) -> "SecretsResolverEditable":
+    """
+    Creates a secrets resolver for the given store type.
+
+    :param store: secrets store type
+    :param file_path: path to the store file. A default file in the current directory is used if not set.
+    :return: a new secrets resolver
+    """
+    # resolvers are imported on use, so that the CLI can import this module on startup cheaply
+    file_path = file_path or DEFAULT_SECRETS_FILES[store]
+    if store == SecretsStore.SQLITE:
+        from didcomm_demo.secrets_resolver_sqlite import SecretsResolverSqlite
+        return SecretsResolverSqlite(file_path)
+    if store == SecretsStore.LOG:
+        from didcomm_demo.secrets_resolver_log import SecretsResolverLog
+        return SecretsResolverLog(file_path)
+    from didcomm_demo.secrets_resolver_json import SecretsResolverJson
+    return SecretsResolverJson(file_path)
@@ -0,0 +1,221 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+from didcomm.common.resolvers import ResolversConfig
+from didcomm.common.types import DID, DID_URL
+from didcomm.core.utils import get_did
+from didcomm.did_doc.did_doc import DIDDoc
+from didcomm.did_doc.did_resolver import DIDResolver
+from didcomm.errors import DIDCommValueError
+from didcomm.pack_encrypted import PackEncryptedConfig, PackEncryptedResult
+from didcomm.secrets.secrets_resolver import SecretsResolver, Secret
+from didcomm.unpack import unpack, UnpackResult
+
+from didcomm_demo.compression import body_msg
+from didcomm_demo.didcomm_demo import build_message
+from didcomm_demo.pack_keys import PackKeys, find_pack_keys, pack_with_keys, validate_message
+
+if TYPE_CHECKING:
+    from didcomm_demo.didcomm_demo import DIDCommDemo
+
+
+@dataclass(frozen=True)
+class SessionStats:
+    """
+    Attributes:
+        packed (int): number of packed messages
+        unpacked (int): number of unpacked messages
+        resolutions (int): number of times DIDs and keys were resolved (once plus once per invalidation)
+        pack_seconds (float): total time spent packing
+        unpack_seconds (float): total time spent unpacking
+    """
+
+    packed: int
+    unpacked: int
+    resolutions: int
+    pack_seconds: float
+    unpack_seconds: float
+
+
+class _PinnedDIDResolver(DIDResolver):
+
+    def __init__(self, did_docs: Dict[DID, DIDDoc], did_resolver: DIDResolver) -> None:
+        self._did_docs = did_docs
+        self._did_resolver = did_resolver
+
+    async def resolve(self, did: DID) -> Optional[DIDDoc]:
+        did_doc = self._did_docs.get(did)
+        return did_doc if did_doc is not None else await self._did_resolver.resolve(did)
+
+
+class _PinnedSecretsResolver(SecretsResolver):
+
+    def __init__(self, secrets: Dict[DID_URL, Secret], secrets_resolver: SecretsResolver) -> None:
+        self._secrets = secrets
+        self._secrets_resolver = secrets_resolver
+
+    async def get_key(self, kid: DID_URL) -> Optional[Secret]:
+        secret = self._secrets.get(kid)
+        return secret if secret is not None else await self._secrets_resolver.get_key(kid)
+
+    async def get_keys(self, kids: List[DID_URL]) -> List[DID_URL]:
+        found = [kid for kid in kids if kid in self._secrets]
+        return found or await self._secrets_resolver.get_keys(kids)
+
+
+@dataclass(frozen=True)
+class _PinnedKeys:
+    pack_keys: PackKeys
+    resolvers_config: ResolversConfig
+
+
+class DIDCommSession:
+    """
+    A pairwise session packing messages from `frm` to `to` and unpacking messages exchanged between them.
+
+    DIDs are resolved, keys are selected and loaded only once, when the session is opened,
+    so packing a message is mostly encryption (and signing). Messages are packed on the calling thread
+    without an event loop.
+    Unpacking uses the pinned DID Docs and secrets, and rejects authcrypted messages from anyone but the parties.
+
+    Call `invalidate` if the keys change (for example, secrets are rotated);
+    they are resolved again on the next use.
+    Create sessions with `DIDCommDemo.session`.
+    """
+
+    def __init__(self,
+                 demo: "DIDCommDemo",
+                 frm: Optional[str],
+                 to: str,
+                 sign_frm: Optional[str] = None,
+                 config: Optional[PackEncryptedConfig] = None,
+                 compress_threshold: Optional[int] = None) -> None:
+        self.demo = demo
+        self.frm = frm
+        self.to = to
+        self.sign_frm = sign_frm
+        self.config = config or PackEncryptedConfig(protect_sender_id=True)
+        self.compress_threshold = compress_threshold
+        self._keys: Optional[_PinnedKeys] = None
+        self._lock = threading.Lock()
+        self._packed = 0
+        self._unpacked = 0
+        self._resolutions = 0
+        self._pack_seconds = 0.0
+        self._unpack_seconds = 0.0
+
+    async def open_async(self):
+        """
+        Resolves the DIDs and keys unless they're already resolved.
+        """
+        await self._get_keys()
+
+    async def _get_keys(self) -> _PinnedKeys:
+        keys = self._keys
+        if keys is None:
+            keys = self._keys = await self._resolve()
+        return keys
+
+    def invalidate(self):
+        self._keys = None
+
+    async def _resolve(self) -> _PinnedKeys:
+        resolvers_config = self.demo.resolvers_config
+
+        # 1. select encryption and signing keys as pack_encrypted does
+        pack_keys = await find_pack_keys(self.frm, [self.to], self.sign_frm, resolvers_config)
+
+        # 2. pin the DID Docs of both parties and own secrets for unpacking
+        did_docs = {}
+        for did in {get_did(d) for d in (self.frm, self.to, self.sign_frm) if d is not None}:
+            did_doc = await resolvers_config.did_resolver.resolve(did)
+            if did_doc is not None:
+                did_docs[did] = did_doc
+        secrets = {}
+        for did in {get_did(d) for d in (self.frm, self.sign_frm) if d is not None}:
+            did_doc = did_docs[did]
+            kids = await resolvers_config.secrets_resolver.get_keys(
+                did_doc.key_agreement_kids + did_doc.authentication_kids
+            )
+            for kid in kids:
+                secret = await resolvers_config.secrets_resolver.get_key(kid)
+                if secret is not None:
+                    secrets[kid] = secret
+
+        with self._lock:
+            self._resolutions += 1
+        return _PinnedKeys(
+            pack_keys=pack_keys,
+            resolvers_config=ResolversConfig(
+                secrets_resolver=_PinnedSecretsResolver(secrets, resolvers_config.secrets_resolver),
+                did_resolver=_PinnedDIDResolver(did_docs, resolvers_config.did_resolver)
+            )
+        )
+
+    def pack(self, msg: str) -> PackEncryptedResult:
+        keys = self._keys or self.demo._run_sync(self._get_keys())
+        return self._pack(keys, msg)
+
+    async def pack_async(self, msg: str) -> PackEncryptedResult:
+        return self._pack(await self._get_keys(), msg)
+
+    def _pack(self, keys: _PinnedKeys, msg: str) -> PackEncryptedResult:
+        instrumentation = self.demo.instrumentation
+        if instrumentation is None:
+            return self._do_pack(keys, msg)
+        with instrumentation.record("pack") as recorder:
+            res = self._do_pack(keys, msg)
+            recorder.bytes = len(res.packed_msg)
+        return res
+
+    def _do_pack(self, keys: _PinnedKeys, msg: str) -> PackEncryptedResult:
+        start = time.perf_counter()
+        message = build_message(msg, to=self.to, frm=self.frm, compress_threshold=self.compress_threshold)
+        validate_message(message, [self.to], self.frm, self.sign_frm)
+        res = pack_with_keys(message.as_dict(), keys.pack_keys, self.config)
+        with self._lock:
+            self._packed += 1
+            self._pack_seconds += time.perf_counter() - start
+        return res
+
+    def unpack(self, packed_msg: str) -> (str, Optional[str], str, UnpackResult):
+        return self.demo._run_sync(self.unpack_async(packed_msg))
+
+    async def unpack_async(self, packed_msg: str) -> (str, Optional[str], str, UnpackResult):
+        """
+        :return: the same tuple as `DIDCommDemo.unpack` returns
+        :raises DIDCommValueError: if the message is authcrypted by someone else than the session's parties
+        """
+        keys = await self._get_keys()
+        instrumentation = self.demo.instrumentation
+        if instrumentation is None:
+            return await self._unpack(keys, packed_msg)
+        with instrumentation.record("unpack") as recorder:
+            recorder.bytes = len(packed_msg)
+            return await self._unpack(keys, packed_msg)
+
+    async def _unpack(self, keys: _PinnedKeys, packed_msg: str) -> (str, Optional[str], str, UnpackResult):
+        start = time.perf_counter()
+        res = await unpack(resolvers_config=keys.resolvers_config, packed_msg=packed_msg)
+        frm = get_did(res.metadata.encrypted_from) if res.metadata.encrypted_from else None
+        if frm is not None and frm not in {get_did(d) for d in (self.to, self.frm) if d is not None}:
+            raise DIDCommValueError(f"The message is from {frm} rather than a party of the session")
+        to = get_did(res.metadata.encrypted_to[0])
+        with self._lock:
+            self._unpacked += 1
+            self._unpack_seconds += time.perf_counter() - start
+        msg = body_msg(res.message.body, self.demo.max_decompressed_size)
+        self.demo._check_replay(res)
+        return msg, frm, to, res
+
+    def stats(self) -> SessionStats:
+        with self._lock:
+            return SessionStats(
+                packed=self._packed,
+                unpacked=self._unpacked,
+                resolutions=self._resolutions,
+                pack_seconds=self._pack_seconds,
+                unpack_seconds=self._unpack_seconds
+            )
@@ -0,0 +1,337 @@
+import asyncio
+import http.client
+import random
+import ssl
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Deque, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+from didcomm.errors import DIDCommError
+from didcomm.pack_encrypted import PackEncryptedResult
+
+DIDCOMM_ENCRYPTED_CONTENT_TYPE = "application/didcomm-encrypted+json"
+
+DEFAULT_MAX_CONNECTIONS_PER_ENDPOINT = 8
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_RETRIES = 3
+# delay before the first retry in seconds, doubled for every next one
+DEFAULT_BACKOFF = 0.1
+DEFAULT_TIMEOUT = 10.0
+
+_MAX_BACKOFF = 5.0
+# responses worth retrying: the endpoint is overloaded or temporarily unavailable
+_RETRY_STATUSES = {429, 502, 503, 504}
+# latencies of the most recent requests to an endpoint kept for percentiles
+_LATENCY_SAMPLES = 1024
+
+
+class DeliveryError(DIDCommError):
+    """
+    A message couldn't be delivered to a service endpoint.
+
+    Attributes:
+        endpoint (str): the service endpoint URI; None if the receiver has no endpoint
+        status (int): HTTP status of the last response; None if no response was received
+    """
+
+    def __init__(self, message: str, endpoint: Optional[str], status: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.endpoint = endpoint
+        self.status = status
+
+
+@dataclass(frozen=True)
+class DeliveryResult:
+    """
+    Attributes:
+        endpoint (str): the service endpoint URI the message was posted to
+        status (int): HTTP status of the response
+        attempts (int): number of requests made, including retries
+        duration (float): time to deliver the message in seconds, including retries
+    """
+
+    endpoint: str
+    status: int
+    attempts: int
+    duration: float
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass(frozen=True)
+class SendResult:
+    """
+    Attributes:
+        pack_result (PackEncryptedResult): the packed message
+        deliveries (list): a delivery per distinct service endpoint of the receivers
+    """
+
+    pack_result: PackEncryptedResult
+    deliveries: List[DeliveryResult]
+
+
+@dataclass(frozen=True)
+class EndpointStats:
+    """
+    Attributes:
+        origin (str): scheme, host and port of the endpoints, for example `https://example.com:443`
+        requests (int): number of HTTP requests made, including retries
+        failures (int): number of messages that couldn't be delivered
+        retries (int): number of requests retried after an error or a retryable status
+        connections (int): number of connections opened
+        latency_mean (float): mean duration of a request in seconds (of the most recent ones)
+        latency_p50 (float): median duration of a request in seconds
+        latency_p95 (float): 95th percentile of request durations in seconds
+    """
+
+    origin: str
+    requests: int
+    failures: int
+    retries: int
+    connections: int
+    latency_mean: float
+    latency_p50: float
+    latency_p95: float
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def summary(self) -> str:
+        return (f"{self.origin}: {self.requests} request(s), {self.failures} failure(s), {self.retries} retries, "
+                f"{self.connections} connection(s), latency mean {self.latency_mean * 1000:.1f} ms, "
+                f"p50 {self.latency_p50 * 1000:.1f} ms, p95 {self.latency_p95 * 1000:.1f} ms")
+
+
+class _Endpoint:
+    """
+    Idle keep-alive connections and stats of an origin.
+    """
+
+    def __init__(self, scheme: str, host: str, port: Optional[int], max_connections: int) -> None:
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.slots = threading.BoundedSemaphore(max_connections)
+        self.lock = threading.Lock()
+        self.idle: Deque[http.client.HTTPConnection] = deque()
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.connections = 0
+        self.latencies: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+
+    def acquire(self, timeout: float, ssl_context: Optional[ssl.SSLContext]) -> Tuple[http.client.HTTPConnection, bool]:
+        """
+        :return: a connection and whether it has been used before
+        """
+        with self.lock:
+            if self.idle:
+                return self.idle.pop(), True
+            self.connections += 1
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=timeout, context=ssl_context), False
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout), False
+
+    def release(self, connection: http.client.HTTPConnection):
+        with self.lock:
+            self.idle.append(connection)
+
+    def close_idle(self):
+        with self.lock:
+            idle, self.idle = self.idle, deque()
+        for connection in idle:
+            connection.close()
+
+
+class HTTPTransport:
+    """
+    Delivers packed messages to DIDComm service endpoints by HTTP(S) POST.
+
+    Connections are kept alive and reused by all messages to the same origin (scheme, host and port),
+    at most `max_connections_per_endpoint` of them at a time; at most `max_concurrency` messages are posted at once.
+    Connection errors and 429, 502, 503 and 504 responses are retried with exponential backoff and jitter,
+    so a message may be delivered more than once (receivers can reject duplicates by replay detection).
+    Can be used by many threads at once.
+    """
+
+    def __init__(self,
+                 max_connections_per_endpoint: int = DEFAULT_MAX_CONNECTIONS_PER_ENDPOINT,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 retries: int = DEFAULT_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF,
+                 timeout: float = DEFAULT_TIMEOUT,
+                 keep_alive: bool = True,
+                 ssl_context: Optional[ssl.SSLContext] = None) -> None:
+        """
+        :param max_connections_per_endpoint: max number of connections to an origin at a time
+        :param max_concurrency: max number of messages posted at once
+        :param retries: max number of retries of a message
+        :param backoff: delay before the first retry in seconds, doubled for every next one
+        :param timeout: connect and read timeout of a request in seconds
+        :param keep_alive: whether to reuse connections; a connection per request is opened if False
+        :param ssl_context: optional SSL context of HTTPS connections. The default one is used if not set.
+        """
+        if max_connections_per_endpoint < 1 or max_concurrency < 1:
+            raise ValueError("Max connections and concurrency must be positive")
+        if retries < 0 or backoff < 0:
+            raise ValueError("Retries and backoff must not be negative")
+        self.max_connections_per_endpoint = max_connections_per_endpoint
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self._ssl_context = ssl_context
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="didcomm-transport")
+        self._endpoints: Dict[str, _Endpoint] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _endpoint(self, scheme: str, host: str, port: Optional[int]) -> _Endpoint:
+        origin = f"{scheme}://{host}:{port or (443 if scheme == 'https' else 80)}"
+        with self._lock:
+            endpoint = self._endpoints.get(origin)
+            if endpoint is None:
+                endpoint = self._endpoints[origin] = _Endpoint(scheme, host, port, self.max_connections_per_endpoint)
+            return endpoint
+
+    def post(self, endpoint: str, data: Union[str, bytes],
+             content_type: str = DIDCOMM_ENCRYPTED_CONTENT_TYPE) -> DeliveryResult:
+        """
+        Posts a packed message to a service endpoint and waits for a 2xx response.
+
+        :param endpoint: HTTP or HTTPS service endpoint URI
+        :param data: the packed message
+        :raises DeliveryError: if the message couldn't be delivered after all retries
+                               or the endpoint responded with a non-retryable error status
+        """
+        if self._closed:
+            raise RuntimeError("Transport is closed")
+        url = urlsplit(endpoint)
+        if url.scheme not in ("http", "https") or not url.hostname:
+            raise DeliveryError(f"Unsupported service endpoint: {endpoint}", endpoint)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        try:
+            port = url.port
+        except ValueError:
+            raise DeliveryError(f"Unsupported service endpoint: {endpoint}", endpoint)
+        target = (url.path or "/") + (f"?{url.query}" if url.query else "")
+        headers = {"Content-Type": content_type}
+        if not self.keep_alive:
+            headers["Connection"] = "close"
+
+        ep = self._endpoint(url.scheme, url.hostname, port)
+        with self._slots, ep.slots:
+            start = time.perf_counter()
+            attempts = 0
+            while True:
+                attempts += 1
+                status, error, stale = self._request(ep, target, data, headers)
+                if status is not None and 200 <= status < 300:
+                    return DeliveryResult(endpoint=endpoint, status=status, attempts=attempts,
+                                          duration=time.perf_counter() - start)
+                if stale:
+                    # the endpoint has closed idle connections; retried at once on a new connection
+                    attempts -= 1
+                    continue
+                if attempts > self.retries or (status is not None and status not in _RETRY_STATUSES):
+                    break
+                with ep.lock:
+                    ep.retries += 1
+                delay = min(self.backoff * 2 ** (attempts - 1), _MAX_BACKOFF)
+                time.sleep(delay * random.uniform(0.5, 1.0))
+        with ep.lock:
+            ep.failures += 1
+        if status is not None:
+            raise DeliveryError(f"Service endpoint {endpoint} responded with HTTP {status}", endpoint, status)
+        raise DeliveryError(f"Service endpoint {endpoint} is unreachable: {error}", endpoint) from error
+
+    def _request(self, ep: _Endpoint, target: str, data: bytes,
+                 headers: dict) -> Tuple[Optional[int], Optional[Exception], bool]:
+        """
+        :return: the response status (None on error), the error and whether it happened on a reused connection
+                 closed by the endpoint
+        """
+        connection, reused = ep.acquire(self.timeout, self._ssl_context)
+        start = time.perf_counter()
+        try:
+            connection.request("POST", target, body=data, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            stale = reused and isinstance(e, ConnectionError)
+            if stale:
+                # other idle connections have likely been closed too
+                ep.close_idle()
+            else:
+                with ep.lock:
+                    ep.requests += 1
+            return None, e, stale
+        with ep.lock:
+            ep.requests += 1
+            ep.latencies.append(time.perf_counter() - start)
+        if self.keep_alive and not response.will_close:
+            ep.release(connection)
+        else:
+            connection.close()
+        return response.status, None, False
+
+    async def post_async(self, endpoint: str, data: Union[str, bytes],
+                         content_type: str = DIDCOMM_ENCRYPTED_CONTENT_TYPE) -> DeliveryResult:
+        """
+        Posts a packed message on a transport thread (see `post`).
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, self.post, endpoint, data, content_type)
+
+    def stats(self) -> Dict[str, EndpointStats]:
+        """
+        :return: stats by origin
+        """
+        with self._lock:
+            endpoints = dict(self._endpoints)
+        stats = {}
+        for origin, ep in endpoints.items():
+            with ep.lock:
+                latencies = sorted(ep.latencies)
+                counts = ep.requests, ep.failures, ep.retries, ep.connections
+            stats[origin] = EndpointStats(
+                origin, *counts,
+                latency_mean=sum(latencies) / len(latencies) if latencies else 0.0,
+                latency_p50=_percentile(latencies, 0.5),
+                latency_p95=_percentile(latencies, 0.95),
+            )
+        return stats
+
+    def close(self):
+        """
+        Waits for messages being posted and closes all connections.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            endpoints = list(self._endpoints.values())
+        for ep in endpoints:
+            ep.close_idle()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(int(q * len(values)), len(values) - 1)]
@@ -1,5 +1,8 @@
 import asyncio
 import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 from peerdid.types import VerificationMaterialFormatPeerDID
 
@@ -32,3 +35,55 @@ def check_expected_did_doc(did, auth_keys_count, agreement_keys_count, service_e
         assert did_doc.get("service")[0]["accept"] == ["didcomm/v2"]
         if service_routing_keys is not None:
             assert did_doc.get("service")[0]["routingKeys"] == service_routing_keys
+
+
+class StandInServer:
+    """
+    A local HTTP server standing in for a DIDComm service endpoint. Keeps connections alive.
+
+    :param statuses: statuses of the first responses (200 for the rest)
+    :param delay: time to handle a request in seconds
+    :param drop_idle: whether to close connections after every response without telling the client
+    """
+
+    def __init__(self, statuses=(), delay=0.0, drop_idle=False) -> None:
+        self.statuses = list(statuses)
+        self.requests = []
+        self.connections = set()
+        self.in_flight = self.max_in_flight = 0
+        lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                with lock:
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                    server.connections.add(self.client_address)
+                    status = server.statuses.pop(0) if server.statuses else 200
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                time.sleep(delay)
+                with lock:
+                    server.requests.append((self.path, self.headers["Content-Type"], body))
+                    server.in_flight -= 1
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                self.close_connection = drop_idle
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}/didcomm"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
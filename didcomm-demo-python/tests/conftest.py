@@ -0,0 +1,24 @@
+import pytest
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+
+from didcomm_demo.didcomm_demo import DIDCommDemo
+
+
+@pytest.fixture()
+def secrets_resolver(tmp_path):
+    return SecretsResolverDemo(tmp_path / "secrets.json")
+
+
+@pytest.fixture()
+def demo(secrets_resolver):
+    return DIDCommDemo(secrets_resolver)
+
+
+@pytest.fixture()
+def did_frm(demo):
+    return demo.create_peer_did()
+
+
+@pytest.fixture()
+def did_to(demo):
+    return demo.create_peer_did()
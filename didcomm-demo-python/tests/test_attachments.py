@@ -0,0 +1,132 @@
+import base64
+import io
+import os
+
+import pytest
+from didcomm.errors import DIDCommValueError
+from didcomm.message import Attachment, AttachmentDataBase64, AttachmentDataLinks
+from didcomm.pack_encrypted import PackEncryptedConfig
+
+from didcomm_demo.attachments import file_attachment, save_attachment, MAX_FILE_SIZE
+
+
+def write_file(path, size):
+    content = os.urandom(size)
+    path.write_bytes(content)
+    return content
+
+
+@pytest.mark.parametrize("size", [0, 1000, 60 * 1024])
+@pytest.mark.parametrize("protect_sender_id", [True, False])
+def test_pack_unpack_file_authcrypt(demo, did_frm, did_to, tmp_path, size, protect_sender_id):
+    content = write_file(tmp_path / "doc.pdf", size)
+    output = io.StringIO()
+    res = demo.pack_file(tmp_path / "doc.pdf", to=did_to, frm=did_frm, output=output,
+                         config=PackEncryptedConfig(protect_sender_id=protect_sender_id))
+    assert output.getvalue() == res.packed_msg
+    (tmp_path / "packed.json").write_text(res.packed_msg)
+
+    msg, frm, to, paths = demo.unpack_file(tmp_path / "packed.json", tmp_path / "out")
+    assert (msg, frm, to) == ("doc.pdf", did_frm, did_to)
+    assert paths == [str(tmp_path / "out" / "doc.pdf")]
+    assert (tmp_path / "out" / "doc.pdf").read_bytes() == content
+    assert int(os.path.getmtime(paths[0])) == int(os.path.getmtime(tmp_path / "doc.pdf"))
+
+
+def test_pack_unpack_file_anoncrypt_signed(demo, did_frm, did_to, tmp_path):
+    content = write_file(tmp_path / "data.bin", 1000)
+    packed_msg = demo.pack_file(tmp_path / "data.bin", to=did_to, sign_frm=did_frm).packed_msg
+    (tmp_path / "packed.json").write_text(packed_msg)
+
+    msg, frm, to, paths = demo.unpack_file(tmp_path / "packed.json", tmp_path / "out")
+    assert (msg, frm, to) == ("data.bin", None, did_to)
+    assert (tmp_path / "out" / "data.bin").read_bytes() == content
+
+
+def test_file_attachment(tmp_path):
+    write_file(tmp_path / "doc.pdf", 10)
+    attachment = file_attachment(tmp_path / "doc.pdf")
+    assert (attachment.filename, attachment.media_type, attachment.byte_count) == ("doc.pdf", "application/pdf", 10)
+
+    write_file(tmp_path / "data", 10)
+    assert file_attachment(tmp_path / "data").media_type == "application/octet-stream"
+    assert file_attachment(tmp_path / "data", media_type="text/plain").media_type == "text/plain"
+
+
+@pytest.mark.parametrize(
+    "filename,expected",
+    [
+        pytest.param("../../etc/passwd", "passwd", id="relative"),
+        pytest.param("/etc/passwd", "passwd", id="absolute"),
+        pytest.param("..", "attachment-id", id="parent"),
+        pytest.param(None, "attachment-id", id="no-name"),
+    ]
+)
+def test_save_attachment_filename(tmp_path, filename, expected):
+    attachment = Attachment(id="attachment-id", data=AttachmentDataBase64(base64=base64.b64encode(b"data").decode()),
+                            filename=filename)
+    assert save_attachment(attachment, tmp_path) == str(tmp_path / expected)
+    assert (tmp_path / expected).read_bytes() == b"data"
+
+
+@pytest.mark.parametrize("attachment_id", ["../pwned.txt", "/tmp/pwned.txt"])
+def test_save_attachment_id_without_directories(tmp_path, attachment_id):
+    attachment = Attachment(id=attachment_id, data=AttachmentDataBase64(base64=base64.b64encode(b"data").decode()))
+    (tmp_path / "out").mkdir()
+    assert save_attachment(attachment, tmp_path / "out") == str(tmp_path / "out" / "pwned.txt")
+    assert not (tmp_path / "pwned.txt").exists()
+
+
+def test_save_attachment_no_valid_name(tmp_path):
+    attachment = Attachment(id="..", data=AttachmentDataBase64(base64=base64.b64encode(b"data").decode()),
+                            filename=".")
+    with pytest.raises(DIDCommValueError):
+        save_attachment(attachment, tmp_path)
+    assert os.listdir(tmp_path) == []
+
+
+def test_save_attachment_keeps_existing_file(tmp_path):
+    (tmp_path / "secrets.json").write_bytes(b"secrets")
+    attachment = Attachment(id="attachment-id", data=AttachmentDataBase64(base64=base64.b64encode(b"data").decode()),
+                            filename="secrets.json")
+    with pytest.raises(DIDCommValueError):
+        save_attachment(attachment, tmp_path)
+    assert (tmp_path / "secrets.json").read_bytes() == b"secrets"
+
+
+def test_save_attachment_invalid_base64(tmp_path):
+    attachment = Attachment(id="attachment-id", data=AttachmentDataBase64(base64="not base64!"), filename="data")
+    with pytest.raises(DIDCommValueError):
+        save_attachment(attachment, tmp_path)
+    assert os.listdir(tmp_path) == []
+
+
+def test_save_attachment_not_base64(tmp_path):
+    attachment = Attachment(id="attachment-id", data=AttachmentDataLinks(links=["https://example.com"], hash="hash"))
+    assert save_attachment(attachment, tmp_path) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_pack_file_too_large(demo, did_frm, did_to, tmp_path):
+    write_file(tmp_path / "data.bin", MAX_FILE_SIZE + 1)
+    with pytest.raises(DIDCommValueError):
+        demo.pack_file(tmp_path / "data.bin", to=did_to, frm=did_frm)
+
+    write_file(tmp_path / "data.bin", 1000)
+    with pytest.raises(DIDCommValueError):
+        demo.pack_file(tmp_path / "data.bin", to=did_to, frm=did_frm, max_size=999)
+
+    # small enough for the file size bound, but too large once encoded by every layer of the message
+    write_file(tmp_path / "data.bin", MAX_FILE_SIZE)
+    with pytest.raises(DIDCommValueError):
+        demo.pack_file(tmp_path / "data.bin", to=did_to, frm=did_frm)
+
+
+def test_unpack_file_too_large(demo, did_frm, did_to, tmp_path):
+    write_file(tmp_path / "data.bin", 1000)
+    packed_msg = demo.pack_file(tmp_path / "data.bin", to=did_to, frm=did_frm).packed_msg
+    (tmp_path / "packed.json").write_text(packed_msg)
+
+    with pytest.raises(DIDCommValueError):
+        demo.unpack_file(tmp_path / "packed.json", tmp_path / "out", max_size=len(packed_msg) - 1)
+    assert demo.unpack_file(tmp_path / "packed.json", tmp_path / "out", max_size=len(packed_msg))[0] == "data.bin"
@@ -0,0 +1,52 @@
+from benchmarks.compare import compare_results
+from benchmarks.runner import BenchmarkResult, Case, percentile, run_case
+
+
+def result(name="authcrypt", ops_per_sec=100.0, p95_ms=10.0, peak_memory_bytes=1000, payload_size=100):
+    return BenchmarkResult(
+        suite="pack", name=name, params={"payload_size": payload_size}, iterations=10, ops_per_sec=ops_per_sec,
+        p50_ms=5.0, p95_ms=p95_ms, p99_ms=20.0, peak_memory_bytes=peak_memory_bytes
+    )
+
+
+def test_percentile():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([1.0], 99) == 1
+
+
+def test_run_case():
+    calls = []
+    res = run_case(Case("suite", "name", {"a": 1}, lambda: lambda: calls.append(1)), min_time=0, min_iterations=3)
+    assert res.key == "suite/name[a=1]"
+    assert res.iterations == 3
+    assert len(calls) == 3 + 2  # a warm-up call and a call for memory measurement
+    assert res.ops_per_sec > 0
+    assert res.p50_ms <= res.p95_ms <= res.p99_ms
+    assert res.output_bytes is None
+
+
+def test_run_case_output_size():
+    res = run_case(Case("suite", "name", {}, lambda: lambda: "packed", output_size=len), min_time=0, min_iterations=1)
+    assert res.output_bytes == 6
+
+
+def test_compare_results():
+    baseline = [result(), result(name="anoncrypt"), result(name="removed")]
+    current = [
+        result(ops_per_sec=95.0, p95_ms=10.5),
+        result(name="anoncrypt", ops_per_sec=50.0, peak_memory_bytes=2000),
+        result(name="added")
+    ]
+
+    comparisons = compare_results(baseline, current)
+    assert [c.current.name for c in comparisons] == ["authcrypt", "anoncrypt"]
+    assert comparisons[0].regressions(threshold=0.1) == []
+    assert comparisons[0].regressions(threshold=0.01) == ["ops/sec -5.0%", "p95 +5.0%"]
+    assert comparisons[1].regressions(threshold=0.1) == ["ops/sec -50.0%", "peak memory +100.0%"]
+
+
+def test_result_to_dict():
+    assert BenchmarkResult.from_dict(result().to_dict()) == result()
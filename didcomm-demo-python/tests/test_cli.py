@@ -1,13 +1,20 @@
 import json
+import os
+import subprocess
+import sys
+from pathlib import Path
 
 import pytest
 from click.testing import CliRunner
 from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
 from peerdid.peer_did import is_peer_did
+from peerdid.types import VerificationMaterialFormatPeerDID
 
-from didcomm_demo.didcomm_cli import set_secrets_resolver, cli
+from didcomm_demo.did_doc_disk_cache import DIDDocDiskCache
+from didcomm_demo.didcomm_cli import set_secrets_resolver, set_did_doc_cache_dir, cli
 from didcomm_demo.didcomm_demo import DIDCommDemo
-from tests.common import get_secret_resolver_kids, check_expected_did_doc
+from didcomm_demo.secrets_resolver_sqlite import SecretsResolverSqlite
+from tests.common import get_secret_resolver_kids, check_expected_did_doc, StandInServer
 
 
 @pytest.fixture()
@@ -101,6 +108,44 @@ def test_resolve_peer_did(secrets_resolver):
     assert did_doc["id"] == did
 
 
+def test_resolve_peer_did_disk_cache(secrets_resolver, tmp_path):
+    did = "did:peer:0z6MkqRYqQiSgvZQdnBytw86Qbs2ZWUkGv22od935YF4s8M7V"
+    runner = CliRunner()
+    try:
+        outputs = [
+            runner.invoke(cli, [f'--did-doc-cache={tmp_path / "cache"}', 'resolve-peer-did', did]).output
+            for _ in range(2)
+        ]
+    finally:
+        set_did_doc_cache_dir(None)
+    assert outputs[0] == outputs[1]
+
+    cache = DIDDocDiskCache(tmp_path / "cache")
+    assert cache.get_json(did, "jwk") == outputs[0].strip()
+    assert cache.get_json(did, "multibase") is None
+
+
+def test_resolve_peer_dids(secrets_resolver, tmp_path):
+    dids = DIDCommDemo(secrets_resolver).create_peer_dids(3, workers=1)
+    lines = [dids[0], json.dumps({"did": dids[1]}), "not a DID", "", dids[2]]
+    runner = CliRunner()
+    try:
+        result = runner.invoke(cli, [f'--did-doc-cache={tmp_path / "cache"}', 'resolve-peer-dids', '--workers=2'],
+                               input="\n".join(lines) + "\n")
+    finally:
+        set_did_doc_cache_dir(None)
+    assert result.exit_code == 0
+    assert "Resolved 3 of 4 peer DIDs" in result.output
+
+    results = sorted((json.loads(line) for line in result.output.splitlines() if line.startswith("{")),
+                     key=lambda r: r["index"])
+    assert [r["did"] for r in results] == [dids[0], dids[1], "not a DID", dids[2]]
+    assert "MalformedPeerDIDError" in results[2]["error"]
+    for did, res in zip(dids, results[:2] + results[3:]):
+        assert res["did_doc"] == json.loads(DIDCommDemo.resolve_peer_did(did, VerificationMaterialFormatPeerDID.JWK))
+    assert DIDDocDiskCache(tmp_path / "cache").get_json(dids[0], "jwk") is not None
+
+
 MESSAGES = ["hello", "111", '{"aaa": "bbb"}']
 
 
@@ -144,3 +189,195 @@ def test_pack_unpack_anoncrypt(input_msg, secrets_resolver, did_to):
     res = result.output.strip()
     assert input_msg in res
     assert did_to in res
+
+
+def test_pack_many_recipients(secrets_resolver, did_frm, did_to):
+    did_other = DIDCommDemo(secrets_resolver).create_peer_did()
+    runner = CliRunner()
+    result = runner.invoke(cli, ['pack', 'hello', f'--from={did_frm}', f'--to={did_to}', f'--to={did_other}'])
+    assert result.exit_code == 0
+    packed_msg = result.output.strip()
+    assert packed_msg.count('"encrypted_key"') == 2
+
+    result = runner.invoke(cli, ['unpack', packed_msg])
+    assert result.exit_code == 0
+    assert f"authcrypted 'hello' from {did_frm} to {did_to}" in result.output
+
+
+def test_pack_batch(secrets_resolver, did_frm, did_to):
+    lines = [json.dumps({"msg": msg, "from": did_frm, "to": did_to}) for msg in MESSAGES] + \
+            [json.dumps({"msg": "anon", "to": did_to}), '{"msg": "malformed', '["not", "an", "object"]',
+             json.dumps({"msg": "bad", "to": "did:peer:0invalid"})]
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ['pack-batch'], input="\n".join(lines) + "\n")
+    assert result.exit_code == 0
+    results = [json.loads(line) for line in result.output.splitlines()]
+    assert len(results) == len(lines)
+    assert results[-3]["error"].startswith("JSONDecodeError")
+    assert results[-2]["error"] == "ValueError: A request must be a JSON object"
+    assert "error" in results[-1]
+
+    for input_msg, res in zip(MESSAGES + ["anon"], results):
+        result = runner.invoke(cli, ['unpack', res["packed_msg"]])
+        assert result.exit_code == 0
+        assert input_msg in result.output
+
+
+def test_unpack_batch(secrets_resolver, did_frm, did_to):
+    demo = DIDCommDemo(secrets_resolver)
+    packed_msgs = [demo.pack(msg=msg, frm=did_frm, to=did_to).packed_msg for msg in MESSAGES] + ["{}"]
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ['unpack-batch', '--workers=2'], input="\n".join(packed_msgs) + "\n")
+    assert result.exit_code == 0
+    results = sorted((json.loads(line) for line in result.output.splitlines()), key=lambda r: r["index"])
+    assert len(results) == len(packed_msgs)
+    assert "error" in results[-1]
+    for input_msg, res in zip(MESSAGES, results):
+        assert res["msg"] == input_msg
+        assert res["from"] == did_frm
+        assert res["to"] == did_to
+
+
+def test_pack_unpack_file(secrets_resolver, did_frm, did_to, tmp_path):
+    content = os.urandom(60 * 1024)
+    (tmp_path / "data.bin").write_bytes(content)
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ['pack-file', str(tmp_path / "data.bin"), f'--from={did_frm}', f'--to={did_to}',
+                                 f'--output={tmp_path / "packed.json"}'])
+    assert result.exit_code == 0
+
+    result = runner.invoke(cli, ['unpack-file', str(tmp_path / "packed.json"), f'--output-dir={tmp_path / "out"}'])
+    assert result.exit_code == 0
+    assert f"authcrypted 'data.bin' from {did_frm} to {did_to}" in result.output
+    assert str(tmp_path / "out" / "data.bin") in result.output
+    assert (tmp_path / "out" / "data.bin").read_bytes() == content
+
+
+def test_secrets_store_option(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    runner = CliRunner()
+    result = runner.invoke(cli, ['--secrets-store=sqlite', 'create-peer-did'])
+    assert result.exit_code == 0
+    peer_did = result.output.strip()
+
+    kids = get_secret_resolver_kids(SecretsResolverSqlite(tmp_path / "secrets.db"))
+    assert len(kids) == 2
+    for kid in kids:
+        assert kid.startswith(peer_did)
+
+
+def test_startup_is_lazy(tmp_path):
+    # a fresh interpreter is needed since the test process has everything imported already
+    code = (
+        "import sys\n"
+        "from didcomm_demo.didcomm_cli import cli\n"
+        "assert not [m for m in sys.modules if m.split('.')[0] in ('didcomm', 'peerdid')]\n"
+        "cli.main(['resolve-peer-did', sys.argv[1]], standalone_mode=False)\n"
+        "assert not [m for m in sys.modules if m.split('.')[0] == 'didcomm']\n"
+    )
+    did = "did:peer:0z6MkqRYqQiSgvZQdnBytw86Qbs2ZWUkGv22od935YF4s8M7V"
+    subprocess.run(
+        [sys.executable, "-c", code, did], cwd=tmp_path, check=True, capture_output=True,
+        env={**os.environ, "PYTHONPATH": str(Path(__file__).parent.parent)}
+    )
+    assert not (tmp_path / "secrets.json").exists()
+
+
+def test_startup_profile(secrets_resolver):
+    runner = CliRunner()
+    result = runner.invoke(cli, ['--startup-profile', 'create-peer-did'])
+    assert result.exit_code == 0
+    assert "Startup profile (ms):" in result.output
+    assert "CLI module imports" in result.output
+
+
+def test_timings(secrets_resolver, did_frm, did_to):
+    runner = CliRunner()
+    result = runner.invoke(cli, ['--timings', 'pack', 'hello', f'--from={did_frm}', f'--to={did_to}'])
+    assert result.exit_code == 0
+    assert "pack: 1 operation(s)" in result.output
+    assert "key_wrap" in result.output
+
+
+def test_create_peer_dids(secrets_resolver, tmp_path):
+    output = tmp_path / "dids.jsonl"
+    runner = CliRunner()
+    result = runner.invoke(cli, ['create-peer-dids', '--count=3', '--workers=1', f'--output={output}'])
+    assert result.exit_code == 0
+    assert "DIDs/sec" in result.output
+
+    dids = [json.loads(line)["did"] for line in output.read_text().splitlines()]
+    assert len(dids) == 3
+    kids = get_secret_resolver_kids(secrets_resolver)
+    assert len(kids) == 6
+    for did in dids:
+        assert is_peer_did(did)
+        check_expected_did_doc(did, auth_keys_count=1, agreement_keys_count=1)
+
+
+def test_jsonl_mode(secrets_resolver):
+    runner = CliRunner()
+
+    result = runner.invoke(cli, ['create-peer-did', '--jsonl'],
+                           input='{}\n{"agreement_keys_count": 2, "service_endpoint": "https://endpoint", '
+                                 '"service_routing_keys": ["key1"]}\n')
+    assert result.exit_code == 0
+    did_frm, did_to = [json.loads(line)["did"] for line in result.output.splitlines()]
+    check_expected_did_doc(did_to, auth_keys_count=1, agreement_keys_count=2, service_endpoint="https://endpoint")
+
+    result = runner.invoke(cli, ['resolve-peer-did', '--stdin'],
+                           input=json.dumps({"did": did_to, "format": "multibase"}) + "\n" +
+                           json.dumps({"did": "did:peer:0invalid"}) + "\n")
+    assert result.exit_code == 0
+    results = [json.loads(line) for line in result.output.splitlines()]
+    assert results[0]["did_doc"]["id"] == did_to
+    assert "MalformedPeerDIDError" in results[1]["error"]
+
+    requests = [{"id": i, "msg": msg, "to": did_to, "from": did_frm} for i, msg in enumerate(MESSAGES)]
+    result = runner.invoke(cli, ['pack', '--jsonl', '--max-in-flight=2'],
+                           input="".join(json.dumps(r) + "\n" for r in requests))
+    assert result.exit_code == 0
+    packed = [json.loads(line) for line in result.output.splitlines()]
+    assert [p["id"] for p in packed] == [0, 1, 2]
+
+    result = runner.invoke(cli, ['unpack', '--jsonl'],
+                           input="".join(json.dumps({"packed_msg": p["packed_msg"]}) + "\n" for p in packed) +
+                           json.dumps({"packed_msg": json.loads(packed[0]["packed_msg"])}) + "\n")
+    assert result.exit_code == 0
+    results = [json.loads(line) for line in result.output.splitlines()]
+    assert [r["msg"] for r in results] == MESSAGES + MESSAGES[:1]
+    for r in results:
+        assert r["from"] == did_frm
+        assert r["to"] == did_to
+
+
+def test_send(secrets_resolver, did_frm):
+    runner = CliRunner()
+    with StandInServer(statuses=[503]) as server:
+        did_to = DIDCommDemo(secrets_resolver).create_peer_did(service_endpoint=server.url)
+        result = runner.invoke(cli, ['send', 'hello', f'--from={did_frm}', f'--to={did_to}', '--stats'])
+        assert result.exit_code == 0
+        assert f"Delivered to {server.url}: HTTP 200 (2 attempt(s)" in result.output
+
+        result = runner.invoke(cli, ['send', '--jsonl'], input=json.dumps({"msg": "hi", "to": did_to}) + "\n")
+        assert result.exit_code == 0
+        delivery, = json.loads(result.output)["deliveries"]
+        assert (delivery["endpoint"], delivery["status"]) == (server.url, 200)
+
+    assert len(server.requests) == 3
+    result = runner.invoke(cli, ['unpack', server.requests[-1][2].decode()])
+    assert "hi" in result.output
+    result = runner.invoke(cli, ['send', 'hello', f'--to={did_frm}'])
+    assert "no HTTP(S) DIDComm service endpoint" in result.output
+
+
+def test_missing_arguments(secrets_resolver):
+    runner = CliRunner()
+    assert runner.invoke(cli, ['pack', 'hello']).exit_code == 2
+    assert runner.invoke(cli, ['pack', '--to', 'did:peer:0']).exit_code == 2
+    assert runner.invoke(cli, ['unpack']).exit_code == 2
+    assert runner.invoke(cli, ['resolve-peer-did']).exit_code == 2
+    assert runner.invoke(cli, ['send', 'hello']).exit_code == 2
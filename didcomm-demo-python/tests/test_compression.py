@@ -0,0 +1,116 @@
+import base64
+import json
+import os
+import zlib
+
+import pytest
+from click.testing import CliRunner
+from didcomm.errors import DIDCommValueError
+
+from didcomm_demo.compression import message_body, body_msg, COMPRESSED_MSG_KEY
+from didcomm_demo.didcomm_cli import set_secrets_resolver, set_max_decompressed_size, cli
+from didcomm_demo.didcomm_demo import DIDCommDemo
+
+VERBOSE_MSG = json.dumps([{"type": "https://example.com/protocols/item/1.0", "index": i} for i in range(200)])
+
+
+def compressed_body(data: bytes):
+    return {COMPRESSED_MSG_KEY: base64.b64encode(zlib.compress(data)).decode()}
+
+
+def test_message_body():
+    assert message_body(VERBOSE_MSG) == {"msg": VERBOSE_MSG}
+    assert message_body(VERBOSE_MSG, compress_threshold=len(VERBOSE_MSG) + 1) == {"msg": VERBOSE_MSG}
+
+    body = message_body(VERBOSE_MSG, compress_threshold=len(VERBOSE_MSG))
+    assert list(body) == [COMPRESSED_MSG_KEY]
+    assert len(body[COMPRESSED_MSG_KEY]) < len(VERBOSE_MSG) / 10
+    assert body_msg(body) == VERBOSE_MSG
+
+
+@pytest.mark.parametrize("size", [1000, 200 * 1024])
+def test_message_body_incompressible(size):
+    msg = base64.b64encode(os.urandom(size)).decode()
+    assert message_body(msg, compress_threshold=0) == {"msg": msg}
+
+
+def test_body_msg_max_decompressed_size():
+    body = compressed_body(b"a" * 1000)
+    assert body_msg(body, max_decompressed_size=1000) == "a" * 1000
+    with pytest.raises(DIDCommValueError, match="larger than 999 bytes"):
+        body_msg(body, max_decompressed_size=999)
+
+
+def test_body_msg_zip_bomb():
+    # 256 MB of zeros compress to about 256 KB
+    compressor = zlib.compressobj(1)
+    chunk = bytes(1024 * 1024)
+    data = b"".join(compressor.compress(chunk) for _ in range(256)) + compressor.flush()
+    with pytest.raises(DIDCommValueError, match="larger than"):
+        body_msg({COMPRESSED_MSG_KEY: base64.b64encode(data).decode()}, max_decompressed_size=1024 * 1024)
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        pytest.param({COMPRESSED_MSG_KEY: "not base64!"}, id="not-base64"),
+        pytest.param({COMPRESSED_MSG_KEY: base64.b64encode(b"not zlib").decode()}, id="not-zlib"),
+        pytest.param({COMPRESSED_MSG_KEY: base64.b64encode(zlib.compress(b"a" * 100)[:10]).decode()}, id="truncated"),
+        pytest.param(compressed_body(b"\xff\xfe"), id="not-utf8"),
+        pytest.param({COMPRESSED_MSG_KEY: 1}, id="not-string"),
+    ]
+)
+def test_body_msg_invalid(body):
+    with pytest.raises(DIDCommValueError):
+        body_msg(body)
+
+
+@pytest.mark.parametrize("protect_sender_id", [True, False])
+def test_pack_unpack_compressed(demo, did_frm, did_to, protect_sender_id):
+    from didcomm.pack_encrypted import PackEncryptedConfig
+
+    config = PackEncryptedConfig(protect_sender_id=protect_sender_id)
+    packed_msg = demo.pack(VERBOSE_MSG, to=did_to, frm=did_frm, config=config, compress_threshold=1024).packed_msg
+    uncompressed_packed_msg = demo.pack(VERBOSE_MSG, to=did_to, frm=did_frm, config=config).packed_msg
+    assert len(packed_msg) < len(uncompressed_packed_msg) / 5
+
+    msg, frm, to, res = demo.unpack(packed_msg)
+    assert (msg, frm, to) == (VERBOSE_MSG, did_frm, did_to)
+    assert COMPRESSED_MSG_KEY in res.message.body
+
+
+def test_unpack_max_decompressed_size(secrets_resolver, demo, did_to):
+    packed_msg = demo.pack(VERBOSE_MSG, to=did_to, compress_threshold=0).packed_msg
+    limited_demo = DIDCommDemo(secrets_resolver, max_decompressed_size=len(VERBOSE_MSG) - 1)
+    with pytest.raises(DIDCommValueError):
+        limited_demo.unpack(packed_msg)
+
+
+def test_pack_many_and_session_compressed(demo, did_frm, did_to):
+    results = demo.pack_many([(VERBOSE_MSG, did_to, did_frm)], compress_threshold=0)
+    assert demo.unpack(results[0].result.packed_msg)[0] == VERBOSE_MSG
+
+    session = demo.session(did_frm, did_to, compress_threshold=0)
+    packed_msg = session.pack(VERBOSE_MSG).packed_msg
+    assert session.unpack(packed_msg)[0] == VERBOSE_MSG
+    assert demo.unpack(packed_msg)[3].message.body.keys() == {COMPRESSED_MSG_KEY}
+
+
+def test_cli(secrets_resolver, did_frm, did_to):
+    set_secrets_resolver(secrets_resolver)
+    runner = CliRunner()
+    result = runner.invoke(cli, ['pack', VERBOSE_MSG, f'--from={did_frm}', f'--to={did_to}',
+                                 '--compress-threshold=1024'])
+    assert result.exit_code == 0
+    packed_msg = result.output.strip()
+
+    result = runner.invoke(cli, ['unpack', packed_msg])
+    assert result.exit_code == 0
+    assert VERBOSE_MSG in result.output
+
+    try:
+        result = runner.invoke(cli, ['--max-decompressed-size=100', 'unpack', packed_msg])
+        assert result.exit_code == 0
+        assert "larger than 100 bytes" in result.output
+    finally:
+        set_max_decompressed_size(None)
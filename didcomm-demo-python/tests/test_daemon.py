@@ -0,0 +1,95 @@
+import json
+import os
+import stat
+import threading
+
+import pytest
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+
+from didcomm_demo.daemon import create_server, DaemonClient, DaemonCommandError, parse_address
+from didcomm_demo.didcomm_cli import set_secrets_resolver
+
+
+@pytest.fixture()
+def secrets_resolver(tmp_path):
+    secrets_resolver = SecretsResolverDemo(tmp_path / "secrets.json")
+    set_secrets_resolver(secrets_resolver)
+    return secrets_resolver
+
+
+@pytest.fixture(params=["unix", "tcp"])
+def address(request, tmp_path, secrets_resolver):
+    server = create_server(str(tmp_path / "cli.sock") if request.param == "unix" else ("127.0.0.1", 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+def test_parse_address():
+    assert parse_address("127.0.0.1:8080") == ("127.0.0.1", 8080)
+    assert parse_address("/tmp/didcomm-cli.sock") == "/tmp/didcomm-cli.sock"
+
+
+def test_create_pack_unpack(address):
+    with DaemonClient(address) as client:
+        did_frm = client.call("create-peer-did").strip()
+        did_to = client.call("create-peer-did", "--service-endpoint", "https://endpoint",
+                             "--service-routing-key", "key1").strip()
+        assert did_frm.startswith("did:peer:2")
+
+        did_doc = client.call("resolve-peer-did", did_to)
+        assert did_to in did_doc
+
+        packed_msg = client.call("pack", "Hello Bob!", "--from", did_frm, "--to", did_to).strip()
+        unpacked_msg = client.call("unpack", packed_msg)
+        assert "Hello Bob!" in unpacked_msg
+        assert did_frm in unpacked_msg
+        assert did_to in unpacked_msg
+
+
+def test_stdin(address):
+    did = "did:peer:0z6MkqRYqQiSgvZQdnBytw86Qbs2ZWUkGv22od935YF4s8M7V"
+    with DaemonClient(address) as client:
+        # reads an empty stdin rather than the daemon's one
+        assert client.call("resolve-peer-did", "--jsonl").strip() == ""
+        output = client.call("resolve-peer-did", "--jsonl", input=json.dumps({"did": did}) + "\n")
+        assert json.loads(output)["did_doc"]["id"] == did
+    with DaemonClient(address) as client:
+        assert "Usage" in client.call("--help")
+
+
+def test_errors(address):
+    with DaemonClient(address) as client:
+        with pytest.raises(DaemonCommandError) as e:
+            client.call("unknown-command")
+        assert e.value.exit_code == 2
+
+        with pytest.raises(DaemonCommandError):
+            client.call("serve", "--port", "1")
+
+        # the connection is still usable after errors
+        assert client.call("resolve-peer-did", "did:peer:0z6MkqRYqQiSgvZQdnBytw86Qbs2ZWUkGv22od935YF4s8M7V")
+
+
+def test_unix_socket_owner_only(tmp_path):
+    path = tmp_path / "cli.sock"
+    for _ in range(2):
+        # a socket left by a previous run is replaced
+        server = create_server(str(path))
+        server.server_close()
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_refuses_to_replace_other_files(tmp_path):
+    path = tmp_path / "secrets.json"
+    path.write_text("[]")
+    with pytest.raises(ValueError, match="not a socket"):
+        create_server(str(path))
+    assert path.read_text() == "[]"
+
+
+def test_tcp_loopback_only():
+    with pytest.raises(ValueError, match="loopback"):
+        create_server(("0.0.0.0", 0))
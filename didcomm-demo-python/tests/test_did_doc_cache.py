@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+
+from didcomm_demo.did_doc_cache import DIDDocCache
+from didcomm_demo.did_resolver_peer_did import DIDResolverPeerDID
+from didcomm_demo.didcomm_demo import DIDCommDemo
+
+DID_0 = "did:peer:0z6MkqRYqQiSgvZQdnBytw86Qbs2ZWUkGv22od935YF4s8M7V"
+DID_1 = "did:peer:0z6MkgoLTnTypo3tDRwCkZXSccTPHRLhF4ZnjhueYAFpEX6vg"
+
+
+def test_get_put_hits_misses():
+    cache = DIDDocCache(max_size=2)
+    assert cache.get("did:example:1") is None
+    cache.put("did:example:1", "doc1")
+    assert cache.get("did:example:1") == "doc1"
+
+    stats = cache.stats()
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.evictions == 0
+    assert stats.size == 1
+
+
+def test_evicts_least_recently_used():
+    cache = DIDDocCache(max_size=2)
+    cache.put("did:example:1", "doc1")
+    cache.put("did:example:2", "doc2")
+    cache.get("did:example:1")
+    cache.put("did:example:3", "doc3")
+
+    assert cache.get("did:example:2") is None
+    assert cache.get("did:example:1") == "doc1"
+    assert cache.get("did:example:3") == "doc3"
+    assert cache.stats().evictions == 1
+    assert len(cache) == 2
+
+
+def test_invalid_max_size():
+    with pytest.raises(ValueError):
+        DIDDocCache(max_size=0)
+
+
+def test_thread_safety():
+    cache = DIDDocCache(max_size=10)
+
+    def worker(n):
+        for i in range(1000):
+            did = f"did:example:{(n + i) % 20}"
+            if cache.get(did) is None:
+                cache.put(did, did)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = cache.stats()
+    assert stats.hits + stats.misses == 8000
+    assert stats.size <= 10
+
+
+@pytest.mark.asyncio
+async def test_resolver_uses_cache():
+    cache = DIDDocCache(max_size=1)
+    resolver = DIDResolverPeerDID(cache=cache)
+
+    did_doc = await resolver.resolve(DID_0)
+    assert await resolver.resolve(DID_0) is did_doc
+    assert did_doc == await DIDResolverPeerDID().resolve(DID_0)
+
+    await resolver.resolve(DID_1)
+    stats = cache.stats()
+    assert stats.hits == 1
+    assert stats.misses == 2
+    assert stats.evictions == 1
+
+
+def test_demo_cache_config(tmp_path):
+    secrets_resolver = SecretsResolverDemo(tmp_path / "secrets.json")
+
+    assert DIDCommDemo(secrets_resolver, did_doc_cache_size=0).did_doc_cache is None
+
+    demo = DIDCommDemo(secrets_resolver, did_doc_cache_size=16)
+    did_frm = demo.create_peer_did()
+    did_to = demo.create_peer_did()
+    packed = demo.pack(msg="hello", frm=did_frm, to=did_to)
+    demo.unpack(packed.packed_msg)
+
+    stats = demo.did_doc_cache.stats()
+    assert stats.max_size == 16
+    assert stats.misses == 2
+    assert stats.hits > 0
@@ -0,0 +1,136 @@
+import os
+import pickle
+import stat
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+
+from didcomm_demo.did_doc_disk_cache import DIDDocDiskCache
+from didcomm_demo.did_resolver_peer_did import DIDResolverPeerDID, resolve_peer_did_doc
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.parallel import resolve_peer_dids
+from didcomm_demo.peer_did_generator import generate_peer_did
+
+DID_0 = "did:peer:0z6MkqRYqQiSgvZQdnBytw86Qbs2ZWUkGv22od935YF4s8M7V"
+DID_2 = "did:peer:2.Ez6LSbysY2xFMRpGMhb7tFTLMpeuPRaqaWM1yECx2AtzE3KCc.Vz6MkqRYqQiSgvZQdnBytw86Qbs2ZWUkGv22od935YF4s8M7V.Vz6MkgoLTnTypo3tDRwCkZXSccTPHRLhF4ZnjhueYAFpEX6vg.SeyJ0IjoiZG0iLCJzIjoiaHR0cHM6Ly9leGFtcGxlLmNvbS9lbmRwb2ludCIsInIiOlsiZGlkOmV4YW1wbGU6c29tZW1lZGlhdG9yI3NvbWVrZXkiXSwiYSI6WyJkaWRjb21tL3YyIiwiZGlkY29tbS9haXAyO2Vudj1yZmM1ODciXX0"  # noqa: E501
+
+
+@pytest.fixture()
+def cache(tmp_path):
+    cache = DIDDocDiskCache(tmp_path / "cache")
+    yield cache
+    cache.close()
+
+
+@pytest.mark.parametrize("did", [DID_0, DID_2])
+def test_get_put(cache, did):
+    assert cache.get(did) is None
+    cache.put(did, resolve_peer_did_doc(did))
+    assert cache.get(did) == resolve_peer_did_doc(did)
+
+    stats = cache.stats()
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.size > 0
+
+
+def test_json_kept_apart_from_did_docs(cache):
+    cache.put_json(DID_0, "jwk", "{}")
+    assert cache.get_json(DID_0, "jwk") == "{}"
+    assert cache.get_json(DID_0, "multibase") is None
+    assert cache.get(DID_0) is None
+
+
+def test_shared_by_instances(cache, tmp_path):
+    cache.put(DID_0, resolve_peer_did_doc(DID_0))
+    other = DIDDocDiskCache(tmp_path / "cache")
+    assert other.get(DID_0) == resolve_peer_did_doc(DID_0)
+    assert pickle.loads(pickle.dumps(other)).get(DID_0) == resolve_peer_did_doc(DID_0)
+    other.close()
+
+
+def test_evicts_least_recently_used(tmp_path):
+    dids = [generate_peer_did()[0] for _ in range(10)]
+    size = len(resolve_peer_did_doc(dids[0]).did) * 4
+    cache = DIDDocDiskCache(tmp_path / "cache", max_size=size * 5)
+    for did in dids:
+        cache.put(did, resolve_peer_did_doc(did))
+
+    stats = cache.stats()
+    assert 0 < stats.size <= stats.max_size
+    assert stats.evictions > 0
+    assert cache.get(dids[0]) is None
+    assert cache.get(dids[-1]) is not None
+
+    cache.clear()
+    assert cache.stats().size == 0
+
+
+def test_owner_only(tmp_path, cache):
+    cache.put(DID_2, resolve_peer_did_doc(DID_2))
+    assert stat.S_IMODE(os.stat(tmp_path / "cache").st_mode) == 0o700
+    for name in os.listdir(tmp_path / "cache"):
+        assert stat.S_IMODE(os.stat(tmp_path / "cache" / name).st_mode) == 0o600
+
+
+def test_existing_directory_not_changed(tmp_path):
+    os.makedirs(tmp_path / "shared")
+    os.chmod(tmp_path / "shared", 0o755)
+    DIDDocDiskCache(tmp_path / "shared").close()
+    assert stat.S_IMODE(os.stat(tmp_path / "shared").st_mode) == 0o755
+    assert stat.S_IMODE(os.stat(tmp_path / "shared" / "did_docs.db").st_mode) == 0o600
+
+    # a database created by an older version with the default mode
+    os.chmod(tmp_path / "shared" / "did_docs.db", 0o666)
+    DIDDocDiskCache(tmp_path / "shared").close()
+    assert stat.S_IMODE(os.stat(tmp_path / "shared" / "did_docs.db").st_mode) == 0o600
+
+
+def test_existing_directory_writable_by_others(tmp_path):
+    os.makedirs(tmp_path / "shared")
+    os.chmod(tmp_path / "shared", 0o777)
+    with pytest.raises(ValueError, match="writable by other users"):
+        DIDDocDiskCache(tmp_path / "shared")
+    assert stat.S_IMODE(os.stat(tmp_path / "shared").st_mode) == 0o777
+    assert os.listdir(tmp_path / "shared") == []
+
+
+def test_invalid_max_size(tmp_path):
+    with pytest.raises(ValueError):
+        DIDDocDiskCache(tmp_path, max_size=0)
+
+
+def _resolve_all(args):
+    directory, dids = args
+    resolver = DIDResolverPeerDID(disk_cache=DIDDocDiskCache(directory, max_size=20_000))
+    return [DIDCommDemo._run(resolver.resolve(did)) == resolve_peer_did_doc(did) for did in dids]
+
+
+def test_processes(tmp_path):
+    dids = [generate_peer_did()[0] for _ in range(30)]
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        results = executor.map(_resolve_all, [(str(tmp_path), dids[i:] + dids[:i]) for i in range(0, 30, 5)])
+        assert all(all(r) for r in results)
+    assert 0 < DIDDocDiskCache(tmp_path).stats().size <= 20_000
+
+
+def test_demo(tmp_path):
+    demo = DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets.json"),
+                       did_doc_disk_cache=DIDDocDiskCache(tmp_path / "cache"))
+    did_frm, did_to = demo.create_peer_did(), demo.create_peer_did()
+    demo.unpack(demo.pack(msg="hello", to=did_to, frm=did_frm).packed_msg)
+    assert demo.did_doc_disk_cache.get(did_to) == resolve_peer_did_doc(did_to)
+
+    # a new process (without the in-memory cache) finds DID Docs on disk
+    demo = DIDCommDemo(demo.secrets_resolver, did_doc_disk_cache=DIDDocDiskCache(tmp_path / "cache"))
+    demo.unpack(demo.pack(msg="hello", to=did_to, frm=did_frm).packed_msg)
+    assert demo.did_doc_disk_cache.stats().misses == 0
+
+
+def test_resolve_peer_dids_in_chunks(cache):
+    dids = [generate_peer_did()[0] for _ in range(5)]
+    results = list(resolve_peer_dids(dids, format="multibase", workers=2, disk_cache=cache, chunk_size=2))
+    assert sorted(res.index for res in results) == list(range(5))
+    for res in results:
+        assert res.result == cache.get_json(dids[res.index], "multibase")
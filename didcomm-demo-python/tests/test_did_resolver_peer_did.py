@@ -1,10 +1,15 @@
+import itertools
 import json
 
 import pytest
 from didcomm.common.types import VerificationMethodType, VerificationMaterial, VerificationMaterialFormat
 from didcomm.did_doc.did_doc import VerificationMethod, DIDCommService
+from peerdid.core.peer_did_helper import encode_service
+from peerdid.errors import MalformedPeerDIDError
 
-from didcomm_demo.did_resolver_peer_did import DIDResolverPeerDID
+from didcomm_demo.did_resolver_peer_did import DIDResolverPeerDID, resolve_peer_did_doc, \
+    _resolve_peer_did_doc_from_json
+from didcomm_demo.peer_did_generator import generate_peer_did
 
 
 @pytest.fixture()
@@ -111,3 +116,66 @@ async def test_numalgo_2(resolver):
             ]
         )
     ]
+
+
+def _differential_dids():
+    # numalgo 0 and 2 DIDs with different numbers of keys and services
+    for auth_keys_count, agreement_keys_count in itertools.product(range(4), range(4)):
+        if auth_keys_count or agreement_keys_count:
+            for service_endpoint, service_routing_keys in ((None, None), ("https://example.com", ["did:example:1"])):
+                for _ in range(5):
+                    yield generate_peer_did(auth_keys_count, agreement_keys_count,
+                                            service_endpoint, service_routing_keys)[0]
+
+    did = generate_peer_did(auth_keys_count=1, agreement_keys_count=1)[0]
+    for service in [
+        {"type": "DIDCommMessaging", "serviceEndpoint": "https://example.com", "routingKeys": []},
+        {"type": "DIDCommMessaging", "serviceEndpoint": {"uri": "https://example.com"}, "routingKeys": ["did:example:1"],
+         "accept": ["didcomm/v2"]},
+        # no routing keys - resolved with empty routing keys
+        {"type": "DIDCommMessaging", "serviceEndpoint": "https://example.com"},
+        # no endpoint - both resolutions fail the same way
+        [{"type": "DIDCommMessaging", "routingKeys": []}, {"type": "LinkedDomains", "serviceEndpoint": "x"}],
+        {"type": "LinkedDomains", "serviceEndpoint": "https://example.com"},
+        [],
+    ]:
+        yield did + encode_service(json.dumps(service))
+
+
+def _malformed_dids():
+    did_0 = generate_peer_did(auth_keys_count=1, agreement_keys_count=0)[0]
+    did_2 = generate_peer_did(auth_keys_count=1, agreement_keys_count=1)[0]
+    agreement_key, auth_key = did_2[12:].split(".")[0], did_2[12:].split(".")[1][1:]
+    return [
+        "did:peer:0" + agreement_key,
+        "did:peer:2.V" + agreement_key,
+        "did:peer:2.E" + auth_key,
+        "did:peer:2.A" + auth_key,
+        did_2 + ".SeyJzIjoiaHR0cHM6Ly9leGFtcGxlLmNvbSJ9",
+        did_2 + ".S!",
+        did_0[:-1],
+        "did:example:1",
+    ]
+
+
+def _outcome(resolve, did):
+    try:
+        return resolve(did)
+    except Exception as e:
+        return type(e), str(e)
+
+
+def test_same_as_resolution_from_json():
+    dids = list(_differential_dids())
+    assert len(dids) == 156
+    for did in dids:
+        assert _outcome(resolve_peer_did_doc, did) == _outcome(_resolve_peer_did_doc_from_json, did), did
+
+
+@pytest.mark.parametrize("did", _malformed_dids())
+def test_malformed_same_as_resolution_from_json(did):
+    with pytest.raises(MalformedPeerDIDError) as e:
+        _resolve_peer_did_doc_from_json(did)
+    with pytest.raises(MalformedPeerDIDError) as direct_e:
+        resolve_peer_did_doc(did)
+    assert str(direct_e.value) == str(e.value)
@@ -1,26 +1,18 @@
+import asyncio
 import json
 
 import pytest
+from didcomm.errors import DIDCommValueError
 from didcomm.pack_encrypted import PackEncryptedConfig
 from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
 from peerdid.peer_did import is_peer_did
 from peerdid.types import VerificationMaterialFormatPeerDID
 
 from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.secrets_resolver_json import SecretsResolverJson
 from tests.common import get_secret_resolver_kids, check_expected_did_doc
 
 
-@pytest.fixture()
-def secrets_resolver(tmp_path):
-    tmp_file = tmp_path / "secrets.json"
-    return SecretsResolverDemo(tmp_file)
-
-
-@pytest.fixture()
-def demo(secrets_resolver):
-    return DIDCommDemo(secrets_resolver)
-
-
 def test_create_peer_did_numalg_0_one_auth_key(demo):
     did = demo.create_peer_did(auth_keys_count=1, agreement_keys_count=0)
     assert is_peer_did(did)
@@ -178,3 +170,149 @@ def test_pack_authcrypt_not_hidden_sender(input_msg, demo, did_frm, did_to):
     assert unpack_res.metadata.encrypted is True
     assert unpack_res.metadata.anonymous_sender is False
     assert unpack_res.metadata.non_repudiation is False
+
+
+@pytest.mark.asyncio
+async def test_async_api_in_running_loop(demo):
+    did_frm = await demo.create_peer_did_async()
+    did_to = await demo.create_peer_did_async()
+
+    packed = await asyncio.gather(
+        *[demo.pack_async(msg=msg, frm=did_frm, to=did_to) for msg in MESSAGES]
+    )
+    unpacked = await asyncio.gather(
+        *[demo.unpack_async(res.packed_msg) for res in packed]
+    )
+
+    for input_msg, (unpacked_msg, frm, to, _) in zip(MESSAGES, unpacked):
+        assert input_msg == unpacked_msg
+        assert frm == did_frm
+        assert to == did_to
+
+
+def test_pack_many(demo, did_frm, did_to):
+    items = [(msg, did_to, did_frm) for msg in MESSAGES] + \
+            [(msg, did_to) for msg in MESSAGES] + \
+            [(msg, did_to, did_frm, did_frm) for msg in MESSAGES]
+    results = demo.pack_many(items, concurrency=4)
+
+    assert [res.index for res in results] == list(range(len(items)))
+    for item, res in zip(items, results):
+        assert res.ok
+        unpacked_msg, frm, to, unpack_res = demo.unpack(res.result.packed_msg)
+        assert unpacked_msg == item[0]
+        assert to == did_to
+        assert frm == (item[2] if len(item) > 2 else None)
+        assert unpack_res.metadata.non_repudiation is (len(item) > 3)
+
+
+def test_pack_many_per_item_errors(demo, did_frm, did_to):
+    items = [
+        ("hello", did_to, did_frm),
+        ("hello", "did:peer:0invalid", did_frm),
+        ("hello", did_to, "not-a-did"),
+        ("hello", did_to),
+    ]
+    results = demo.pack_many(items)
+
+    assert [res.ok for res in results] == [True, False, False, True]
+    assert results[1].result is None
+    assert isinstance(results[1].error, Exception)
+    assert demo.unpack(results[3].result.packed_msg)[0] == "hello"
+
+
+def test_unpack_many(demo, did_frm, did_to):
+    packed_msgs = [demo.pack(msg=msg, frm=did_frm, to=did_to).packed_msg for msg in MESSAGES]
+    packed_msgs.insert(1, "not a packed message")
+
+    results = sorted(demo.unpack_many(iter(packed_msgs), workers=2, max_pending=2), key=lambda r: r.index)
+
+    assert [res.index for res in results] == list(range(len(packed_msgs)))
+    assert not results[1].ok
+    for input_msg, res in zip(MESSAGES, results[:1] + results[2:]):
+        assert res.ok
+        unpacked_msg, frm, to, _ = res.result
+        assert unpacked_msg == input_msg
+        assert frm == did_frm
+        assert to == did_to
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_create_peer_dids(demo, workers):
+    dids = demo.create_peer_dids(5, auth_keys_count=1, agreement_keys_count=1,
+                                 service_endpoint="http://endpoint", service_routing_keys=["key1"],
+                                 workers=workers)
+    assert len(set(dids)) == 5
+    kids = get_secret_resolver_kids(demo.secrets_resolver)
+    assert len(kids) == 10
+    for did in dids:
+        assert is_peer_did(did)
+        assert len([kid for kid in kids if kid.startswith(did)]) == 2
+        check_expected_did_doc(did, auth_keys_count=1, agreement_keys_count=1,
+                               service_endpoint="http://endpoint", service_routing_keys=["key1"])
+
+    packed = demo.pack(msg="hello", frm=dids[0], to=dids[1], sign_frm=dids[0])
+    assert demo.unpack(packed.packed_msg)[:3] == ("hello", dids[0], dids[1])
+
+
+def test_create_peer_dids_single_write(tmp_path, monkeypatch):
+    secrets_resolver = SecretsResolverJson(tmp_path / "secrets.json")
+    saves = []
+    monkeypatch.setattr(secrets_resolver, "_save", lambda: saves.append(1))
+    DIDCommDemo(secrets_resolver).create_peer_dids(10, workers=1)
+    assert len(saves) == 1
+    assert len(get_secret_resolver_kids(secrets_resolver)) == 20
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_resolve_peer_dids(demo, workers):
+    dids = demo.create_peer_dids(5, workers=1)
+    dids.insert(2, "did:peer:2.Xbad")
+
+    results = sorted(demo.resolve_peer_dids(iter(dids), VerificationMaterialFormatPeerDID.MULTIBASE, workers=workers),
+                     key=lambda r: r.index)
+
+    assert [res.index for res in results] == list(range(len(dids)))
+    assert not results[2].ok
+    assert type(results[2].error).__name__ == "MalformedPeerDIDError"
+    for did, res in zip(dids[:2] + dids[3:], results[:2] + results[3:]):
+        assert res.result == DIDCommDemo.resolve_peer_did(did, VerificationMaterialFormatPeerDID.MULTIBASE)
+
+
+@pytest.mark.parametrize(
+    "authcrypt,sign,protect_sender_id",
+    [
+        pytest.param(True, False, True, id="authcrypt"),
+        pytest.param(True, True, False, id="authcrypt-signed-not-hidden-sender"),
+        pytest.param(False, False, False, id="anoncrypt"),
+        pytest.param(False, True, False, id="anoncrypt-signed"),
+    ]
+)
+def test_pack_many_recipients(tmp_path, demo, did_frm, authcrypt, sign, protect_sender_id):
+    # every receiver has only own secrets
+    receivers = [DIDCommDemo(SecretsResolverDemo(tmp_path / f"secrets{i}.json")) for i in range(3)]
+    dids_to = [receiver.create_peer_did(agreement_keys_count=2) for receiver in receivers]
+
+    res = demo.pack(msg="hello", to=dids_to, frm=did_frm if authcrypt else None, sign_frm=did_frm if sign else None,
+                    config=PackEncryptedConfig(protect_sender_id=protect_sender_id))
+    assert len(res.to_kids) == 6
+    assert res.packed_msg.count('"encrypted_key"') == 6
+    for receiver, did_to in zip(receivers, dids_to):
+        msg, frm, to, unpack_res = receiver.unpack(res.packed_msg)
+        assert (msg, frm, to) == ("hello", did_frm if authcrypt else None, did_to)
+        assert unpack_res.message.to == dids_to
+        assert unpack_res.metadata.non_repudiation == sign
+        assert unpack_res.metadata.anonymous_sender == (not authcrypt or protect_sender_id)
+
+
+def test_pack_many_recipients_duplicates(demo, did_frm, did_to):
+    res = demo.pack(msg="hello", to=[did_to, did_to], frm=did_frm)
+    assert res.to_kids == demo.pack(msg="hello", to=did_to, frm=did_frm).to_kids
+    msg, frm, to, unpack_res = demo.unpack(res.packed_msg)
+    assert (msg, frm, to) == ("hello", did_frm, did_to)
+    assert unpack_res.message.to == [did_to]
+
+
+def test_pack_no_recipients(demo, did_frm):
+    with pytest.raises(DIDCommValueError):
+        demo.pack(msg="hello", to=[], frm=did_frm)
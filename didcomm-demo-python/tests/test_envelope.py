@@ -0,0 +1,147 @@
+import base64
+import json
+
+import pytest
+from click.testing import CliRunner
+from didcomm.common.resolvers import ResolversConfig
+from didcomm.errors import DIDUrlNotFoundError
+from didcomm.pack_plaintext import pack_plaintext
+from didcomm.pack_signed import pack_signed
+from didcomm.pack_encrypted import PackEncryptedConfig
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+
+from didcomm_demo.didcomm_cli import set_secrets_resolver, cli
+from didcomm_demo.didcomm_demo import DIDCommDemo, build_message
+from didcomm_demo.envelope import parse_envelope, InvalidEnvelopeError, MAX_RECIPIENTS
+
+
+@pytest.fixture()
+def other_demo(tmp_path):
+    return DIDCommDemo(SecretsResolverDemo(tmp_path / "other_secrets.json"))
+
+
+def b64(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+def encrypted(protected, recipients=None) -> str:
+    return json.dumps({
+        "protected": b64(protected),
+        "recipients": recipients if recipients is not None else [{"header": {"kid": "did:example:1#key-1"}}],
+        "iv": "", "ciphertext": "", "tag": "",
+    })
+
+
+def test_inspect_authcrypt(demo, did_frm, did_to):
+    res = demo.pack("hello", to=did_to, frm=did_frm, config=PackEncryptedConfig(protect_sender_id=False))
+    info = demo.inspect(res.packed_msg)
+    assert (info.type, info.alg, info.enc) == ("encrypted", "ECDH-1PU+A256KW", "A256CBC-HS512")
+    assert info.authenticated
+    assert info.sender_kid == res.from_kid
+    assert info.recipient_kids == res.to_kids
+    assert info.held_kids == res.to_kids
+    assert info.recipients == [did_to]
+    assert info.size == len(res.packed_msg)
+
+
+def test_inspect_anoncrypt_not_held(demo, other_demo, did_frm):
+    did_to = other_demo.create_peer_did()
+    res = demo.pack("hello", to=did_to, frm=did_frm)
+    info = demo.inspect(res.packed_msg)
+    assert (info.type, info.alg, info.enc) == ("encrypted", "ECDH-ES+A256KW", "XC20P")
+    assert not info.authenticated
+    assert info.sender_kid is None
+    assert info.recipient_kids == res.to_kids
+    assert info.held_kids == []
+    assert other_demo.inspect(res.packed_msg).held_kids == res.to_kids
+
+
+def test_inspect_signed_and_plaintext(demo, did_frm, did_to):
+    resolvers_config = demo.resolvers_config
+    message = build_message("hello", to=did_to, frm=did_frm)
+    signed = demo._run(pack_signed(resolvers_config=resolvers_config, message=message, sign_frm=did_frm))
+    info = demo.inspect(signed.packed_msg)
+    assert (info.type, info.alg, info.sender_kid) == ("signed", "EdDSA", signed.sign_from_kid)
+
+    plaintext = demo._run(pack_plaintext(resolvers_config=ResolversConfig(None, None), message=message))
+    assert demo.inspect(plaintext.packed_msg).type == "plaintext"
+
+
+@pytest.mark.parametrize(
+    "packed_msg",
+    [
+        pytest.param("not json", id="not-json"),
+        pytest.param("[]", id="not-object"),
+        pytest.param("[" * 100000, id="deeply-nested"),
+        pytest.param("{}", id="empty"),
+        pytest.param('{"ciphertext": "", "protected": "not base64!"}', id="protected-not-base64"),
+        pytest.param('{"ciphertext": "", "protected": 1}', id="protected-not-string"),
+        pytest.param(encrypted({"alg": "RSA-OAEP", "enc": "A256GCM"}), id="unsupported-alg"),
+        pytest.param(encrypted({"alg": ["ECDH-ES+A256KW"], "enc": "A256GCM"}), id="alg-not-string"),
+        pytest.param(encrypted({"alg": "ECDH-ES+A256KW", "enc": "A256GCM"}, recipients=[]), id="no-recipients"),
+        pytest.param(encrypted({"alg": "ECDH-ES+A256KW", "enc": "A256GCM"}, recipients=[{"header": {}}]),
+                     id="no-kid"),
+        pytest.param(encrypted({"alg": "ECDH-ES+A256KW", "enc": "A256GCM"},
+                               recipients=[{"header": {"kid": "k"}}] * (MAX_RECIPIENTS + 1)), id="too-many-recipients"),
+        pytest.param(encrypted({"alg": "ECDH-ES+A256KW", "enc": "A256GCM"},
+                               recipients=[{"header": {"kid": "k" * 10000}}]), id="kid-too-long"),
+        pytest.param(encrypted({"alg": "ECDH-ES+A256KW", "enc": "A256GCM", "x": "x" * 20000}),
+                     id="protected-too-large"),
+        pytest.param(encrypted({"alg": "ECDH-1PU+A256KW", "enc": "A256CBC-HS512"}), id="authcrypt-no-sender"),
+        pytest.param('{"payload": "", "signatures": [{"protected": "' + b64({"alg": "none"}) + '"}]}',
+                     id="signed-unsupported-alg"),
+    ]
+)
+def test_parse_envelope_invalid(packed_msg):
+    with pytest.raises(InvalidEnvelopeError):
+        parse_envelope(packed_msg)
+
+
+def test_parse_envelope_max_size():
+    packed_msg = encrypted({"alg": "ECDH-ES+A256KW", "enc": "A256GCM"})
+    assert parse_envelope(packed_msg, max_size=len(packed_msg)).recipient_kids == ["did:example:1#key-1"]
+    with pytest.raises(InvalidEnvelopeError):
+        parse_envelope(packed_msg, max_size=len(packed_msg) - 1)
+
+
+def test_unpack_precheck(demo, other_demo, did_frm, did_to):
+    packed_msg = demo.pack("hello", to=did_to, frm=did_frm).packed_msg
+    assert demo.unpack(packed_msg, precheck=True)[:3] == ("hello", did_frm, did_to)
+    with pytest.raises(DIDUrlNotFoundError):
+        other_demo.unpack(packed_msg, precheck=True)
+    with pytest.raises(InvalidEnvelopeError):
+        demo.unpack("{}", precheck=True)
+
+
+def test_unpack_many_precheck(demo, other_demo, did_frm, did_to):
+    packed_msgs = [demo.pack("hello", to=did_to, frm=did_frm).packed_msg,
+                   "{}",
+                   demo.pack("hello", to=other_demo.create_peer_did()).packed_msg]
+    results = sorted(demo.unpack_many(packed_msgs, workers=1, precheck=True), key=lambda r: r.index)
+    assert results[0].result[:3] == ("hello", did_frm, did_to)
+    assert isinstance(results[1].error, InvalidEnvelopeError)
+    assert isinstance(results[2].error, DIDUrlNotFoundError)
+
+
+def test_cli(demo, did_frm, did_to):
+    set_secrets_resolver(demo.secrets_resolver)
+    packed_msg = demo.pack("hello", to=did_to, frm=did_frm).packed_msg
+    runner = CliRunner()
+    result = runner.invoke(cli, ['inspect', packed_msg])
+    assert result.exit_code == 0
+    info = json.loads(result.output)
+    assert info["type"] == "encrypted"
+    assert info["recipients"] == [did_to]
+    assert info["held_kids"] == info["recipient_kids"]
+
+    result = runner.invoke(cli, ['inspect', '{}'])
+    assert result.exit_code == 1
+
+    result = runner.invoke(cli, ['inspect', '--jsonl'],
+                           input=json.dumps({"packed_msg": json.loads(packed_msg)}) + "\n")
+    assert result.exit_code == 0
+    assert json.loads(result.output)["recipients"] == [did_to]
+
+    result = runner.invoke(cli, ['unpack', '--precheck', '{}'])
+    assert result.exit_code == 0
+    assert "neither encrypted, signed nor plaintext" in result.output
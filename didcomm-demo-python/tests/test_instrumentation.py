@@ -0,0 +1,109 @@
+import pytest
+from authlib.jose import JsonWebEncryption, JsonWebSignature
+from didcomm.pack_encrypted import PackEncryptedConfig
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.instrumentation import Instrumentation, MetricsRegistry, OperationTimings, STAGES, SIGNING, \
+    CONTENT_ENCRYPTION, KEY_WRAP, DID_RESOLUTION, SECRETS_LOOKUP, SERIALIZATION
+
+
+@pytest.fixture()
+def timings():
+    return []
+
+
+@pytest.fixture()
+def demo(tmp_path, timings):
+    return DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets.json"), instrumentation=Instrumentation([timings.append]))
+
+
+@pytest.fixture()
+def did_frm(demo):
+    return demo.create_peer_did()
+
+
+@pytest.fixture()
+def did_to(demo):
+    return demo.create_peer_did()
+
+
+def test_pack_unpack_timings(demo, timings, did_frm, did_to):
+    packed_msg = demo.pack(msg="hello", to=did_to, frm=did_frm, sign_frm=did_frm).packed_msg
+    demo.unpack(packed_msg)
+
+    assert [t.operation for t in timings] == ["pack", "unpack"]
+    for t in timings:
+        assert list(t.stages) == STAGES
+        assert t.bytes == len(packed_msg)
+        assert t.stages[SERIALIZATION].bytes == len(packed_msg)
+        assert t.stages[CONTENT_ENCRYPTION].bytes > 0
+        assert t.stages[SIGNING].bytes > 0
+        assert t.stages[DID_RESOLUTION].calls > 0
+        assert t.stages[SECRETS_LOOKUP].calls > 0
+        assert sum(s.duration for s in t.stages.values()) == pytest.approx(t.duration)
+
+
+def test_anoncrypt_has_no_signing(demo, timings, did_to):
+    demo.pack(msg="hello", to=did_to)
+    assert SIGNING not in timings[0].stages
+    assert KEY_WRAP in timings[0].stages
+
+
+def test_pack_many_timings(demo, timings, did_frm, did_to):
+    demo.pack_many([("hello", did_to, did_frm)] * 3, config=PackEncryptedConfig(protect_sender_id=False))
+    assert [t.operation for t in timings] == ["pack"] * 3
+
+
+def test_failed_operations_not_recorded(demo, timings):
+    with pytest.raises(Exception):
+        demo.unpack("{}")
+    assert timings == []
+
+
+def test_disabled(tmp_path, timings):
+    demo = DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets2.json"))
+    did = demo.create_peer_did()
+    demo.unpack(demo.pack(msg="hello", to=did).packed_msg)
+    assert timings == []
+
+
+def test_jose_hooks_restored(demo, did_to):
+    originals = [vars(JsonWebEncryption)["serialize_json"], vars(JsonWebSignature)["deserialize_json"]]
+    encs = list(JsonWebEncryption.ENC_REGISTRY.values())
+    with demo.instrumentation.record("pack"):
+        assert vars(JsonWebEncryption)["serialize_json"] is not originals[0]
+        with demo.instrumentation.record("pack"):
+            pass
+        # still recording the outer operation
+        assert vars(JsonWebEncryption)["serialize_json"] is not originals[0]
+    demo.unpack(demo.pack(msg="hello", to=did_to).packed_msg)
+
+    assert [vars(JsonWebEncryption)["serialize_json"], vars(JsonWebSignature)["deserialize_json"]] == originals
+    assert not any("encrypt" in vars(enc) or "decrypt" in vars(enc) for enc in encs)
+
+
+def test_metrics_registry():
+    registry = MetricsRegistry(buckets=(0.001, 0.01))
+    for duration in 0.0005, 0.005, 0.05:
+        registry(OperationTimings(operation="pack", duration=duration, bytes=100, stages={}))
+
+    text = registry.to_prometheus()
+    assert "# TYPE didcomm_operation_duration_seconds histogram" in text
+    assert 'didcomm_operation_duration_seconds_bucket{operation="pack",le="0.001"} 1' in text
+    assert 'didcomm_operation_duration_seconds_bucket{operation="pack",le="0.01"} 2' in text
+    assert 'didcomm_operation_duration_seconds_bucket{operation="pack",le="+Inf"} 3' in text
+    assert 'didcomm_operation_duration_seconds_count{operation="pack"} 3' in text
+    assert 'didcomm_operation_bytes_total{operation="pack"} 300' in text
+    assert text.endswith("\n")
+
+
+def test_metrics_registry_stages(demo, did_frm, did_to):
+    registry = MetricsRegistry()
+    demo.instrumentation.add_callback(registry)
+    demo.pack(msg="hello", to=did_to, frm=did_frm)
+
+    text = registry.to_prometheus()
+    for stage in DID_RESOLUTION, SECRETS_LOOKUP, KEY_WRAP, CONTENT_ENCRYPTION, SERIALIZATION:
+        assert f'didcomm_stage_duration_seconds_count{{operation="pack",stage="{stage}"}} 1' in text
+    assert "pack: 1 operation(s)" in registry.summary()
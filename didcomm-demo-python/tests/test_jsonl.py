@@ -0,0 +1,81 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from didcomm_demo.jsonl import process_jsonl
+
+
+@pytest.mark.asyncio
+async def test_results_in_input_order_with_bounded_in_flight():
+    in_flight = 0
+    max_seen_in_flight = 0
+
+    async def handle(request):
+        nonlocal in_flight, max_seen_in_flight
+        in_flight += 1
+        max_seen_in_flight = max(max_seen_in_flight, in_flight)
+        await asyncio.sleep(0.001 * (request["n"] % 3))
+        in_flight -= 1
+        return {"n": request["n"]}
+
+    lines = (json.dumps({"n": n}) for n in range(50))
+    out = []
+    await process_jsonl(lines, handle, out.append, max_in_flight=4)
+
+    assert [json.loads(line)["n"] for line in out] == list(range(50))
+    assert max_seen_in_flight <= 4
+
+
+@pytest.mark.asyncio
+async def test_errors_and_ids():
+    async def handle(request):
+        if request.get("fail"):
+            raise ValueError("failed")
+        return {"ok": True}
+
+    lines = ['{"id": 1}', '', 'not json', '[1]', '{"id": "x", "fail": true}']
+    out = []
+    await process_jsonl(lines, handle, out.append)
+
+    results = [json.loads(line) for line in out]
+    assert results[0] == {"id": 1, "ok": True}
+    assert "error" in results[1]
+    assert "error" in results[2]
+    assert results[3] == {"id": "x", "error": "ValueError: failed"}
+
+
+@pytest.mark.asyncio
+async def test_result_written_before_next_line_is_read():
+    # an interactive client sends the next request only after getting the result of the previous one
+    answered = threading.Event()
+    out = []
+
+    def lines():
+        for n in range(3):
+            yield json.dumps({"n": n})
+            assert answered.wait(timeout=5)
+            answered.clear()
+
+    def write(line):
+        out.append(line)
+        answered.set()
+
+    async def handle(request):
+        return {"n": request["n"]}
+
+    await asyncio.wait_for(process_jsonl(lines(), handle, write), timeout=10)
+    assert [json.loads(line)["n"] for line in out] == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_write_error():
+    async def handle(request):
+        return {}
+
+    def write(line):
+        raise BrokenPipeError()
+
+    with pytest.raises(BrokenPipeError):
+        await asyncio.wait_for(process_jsonl(("{}" for _ in range(10)), handle, write, max_in_flight=2), timeout=10)
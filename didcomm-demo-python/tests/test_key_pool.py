@@ -0,0 +1,64 @@
+import pytest
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+from peerdid.peer_did import is_peer_did
+
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.key_pool import KeyPool, X25519, ED25519
+from tests.common import get_secret_resolver_kids, check_expected_did_doc
+
+
+@pytest.fixture()
+def key_pool():
+    with KeyPool(low_watermark=2, high_watermark=4) as key_pool:
+        assert key_pool.wait_filled(timeout=10)
+        yield key_pool
+
+
+def test_fills_up_to_high_watermark(key_pool):
+    stats = key_pool.stats()
+    assert stats.depth == {X25519: 4, ED25519: 4}
+    assert stats.generated == 8
+    assert stats.refill_rate > 0
+    assert stats.hits == 0
+    assert stats.misses == 0
+
+
+def test_get_takes_from_pool_and_refills(key_pool):
+    private_keys = [key_pool.get_x25519()[0] for _ in range(3)]
+    assert len({k["d"] for k in private_keys}) == 3
+    assert key_pool.stats().hits == 3
+
+    # dropped below the low watermark
+    assert key_pool.wait_filled(timeout=10)
+    assert key_pool.stats().generated == 11
+
+
+def test_generates_inline_if_empty():
+    with KeyPool(low_watermark=0, high_watermark=1) as key_pool:
+        assert key_pool.wait_filled(timeout=10)
+        key_pool.close()
+        key_pool.get_ed25519()
+        private_key, public_key = key_pool.get_ed25519()
+        assert private_key["crv"] == public_key["crv"] == "Ed25519"
+
+        stats = key_pool.stats()
+        assert stats.hits == 1
+        assert stats.misses == 1
+
+
+def test_invalid_watermarks():
+    with pytest.raises(ValueError):
+        KeyPool(low_watermark=4, high_watermark=4)
+
+
+def test_create_peer_did(tmp_path, key_pool):
+    demo = DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets.json"), key_pool=key_pool)
+    did_frm = demo.create_peer_did(auth_keys_count=2, agreement_keys_count=3)
+    assert is_peer_did(did_frm)
+    assert len(get_secret_resolver_kids(demo.secrets_resolver)) == 5
+    check_expected_did_doc(did_frm, auth_keys_count=2, agreement_keys_count=3, service_endpoint=None)
+    assert key_pool.stats().hits == 5
+
+    did_to = demo.create_peer_did()
+    msg, frm, to, _ = demo.unpack(demo.pack(msg="hello", to=did_to, frm=did_frm, sign_frm=did_frm).packed_msg)
+    assert (msg, frm, to) == ("hello", did_frm, did_to)
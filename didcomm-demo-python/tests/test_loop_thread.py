@@ -0,0 +1,94 @@
+import asyncio
+import concurrent.futures
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.loop_thread import EventLoopThread
+
+
+@pytest.fixture()
+def loop_thread():
+    with EventLoopThread() as loop_thread:
+        yield loop_thread
+
+
+async def current_thread():
+    await asyncio.sleep(0)
+    return threading.current_thread()
+
+
+def test_run(loop_thread):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        threads = set(executor.map(lambda _: loop_thread.run(current_thread()), range(32)))
+    assert len(threads) == 1
+    assert threads.pop() is not threading.current_thread()
+
+
+def test_run_on_loop_thread(loop_thread):
+    async def nested():
+        return loop_thread.run(current_thread())
+
+    with pytest.raises(RuntimeError, match="on the event loop thread"):
+        loop_thread.run(nested())
+
+
+def test_run_timeout(loop_thread):
+    cancelled = threading.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(concurrent.futures.TimeoutError):
+        loop_thread.run(slow(), timeout=0.01)
+    assert cancelled.wait(1)
+
+
+def test_close():
+    loop_thread = EventLoopThread()
+    loop_thread.close()
+    loop_thread.close()
+    assert loop_thread.loop.is_closed()
+    with pytest.raises(RuntimeError, match="closed"):
+        loop_thread.run(current_thread())
+
+
+def test_concurrent_pack_unpack(tmp_path, loop_thread):
+    # threads without event loops of their own pack and unpack at once
+    demo = DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets.json"), loop_thread=loop_thread)
+    dids = [demo.create_peer_did() for _ in range(4)]
+
+    def exchange(i):
+        frm, to = dids[i % len(dids)], dids[(i + 1) % len(dids)]
+        packed_msg = demo.pack(f"msg {i}", to=to, frm=frm if i % 2 else None).packed_msg
+        msg, unpacked_frm, unpacked_to, _ = demo.unpack(packed_msg)
+        session = demo.session(frm=frm, to=to)
+        assert session.unpack(session.pack(msg).packed_msg)[0] == msg
+        return msg, unpacked_frm, unpacked_to
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(exchange, range(64)))
+    assert results == [
+        (f"msg {i}", dids[i % len(dids)] if i % 2 else None, dids[(i + 1) % len(dids)]) for i in range(64)
+    ]
+
+
+def test_run_racing_close():
+    # every call either completes, is cancelled by close or is rejected after it; none waits forever
+    for _ in range(20):
+        loop_thread = EventLoopThread()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(loop_thread.run, current_thread()) for _ in range(8)]
+            loop_thread.close()
+            for future in futures:
+                try:
+                    future.result(timeout=5)
+                except (RuntimeError, concurrent.futures.CancelledError):
+                    pass
@@ -0,0 +1,78 @@
+import dataclasses
+
+import pytest
+from didcomm.errors import DIDCommValueError
+from didcomm.message import FromPrior
+from didcomm.pack_encrypted import PackEncryptedConfig, pack_encrypted
+from didcomm.unpack import unpack
+
+from didcomm_demo.didcomm_demo import build_message
+from didcomm_demo.envelope import parse_envelope
+from didcomm_demo.pack_keys import pack_encrypted_many
+
+
+@pytest.fixture()
+def did_to(demo):
+    # content is encrypted for both key agreement keys of the recipient
+    return demo.create_peer_did(agreement_keys_count=2)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "authcrypt,sign,protect_sender_id",
+    [
+        pytest.param(True, False, True, id="authcrypt"),
+        pytest.param(True, False, False, id="authcrypt-not-hidden-sender"),
+        pytest.param(True, True, True, id="authcrypt-signed"),
+        pytest.param(False, False, False, id="anoncrypt"),
+        pytest.param(False, True, False, id="anoncrypt-signed"),
+    ]
+)
+async def test_parity_with_pack_encrypted(demo, did_frm, did_to, authcrypt, sign, protect_sender_id):
+    frm, sign_frm = did_frm if authcrypt else None, did_frm if sign else None
+    message = build_message("hello", to=did_to, frm=frm)
+    config = PackEncryptedConfig(protect_sender_id=protect_sender_id, forward=False)
+
+    expected = await pack_encrypted(resolvers_config=demo.resolvers_config, message=message, to=did_to, frm=frm,
+                                    sign_frm=sign_frm, pack_config=config)
+    res = await pack_encrypted_many(demo.resolvers_config, message, [did_to], frm=frm, sign_frm=sign_frm,
+                                    config=config)
+
+    assert (res.to_kids, res.from_kid, res.sign_from_kid) == \
+           (expected.to_kids, expected.from_kid, expected.sign_from_kid)
+    assert dataclasses.replace(parse_envelope(res.packed_msg), size=0) == \
+           dataclasses.replace(parse_envelope(expected.packed_msg), size=0)
+    unpacked = await unpack(demo.resolvers_config, res.packed_msg)
+    expected_unpacked = await unpack(demo.resolvers_config, expected.packed_msg)
+    assert unpacked.message == expected_unpacked.message == message
+    assert unpacked.metadata == expected_unpacked.metadata
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "to,frm,message_to,message_frm",
+    [
+        pytest.param([], None, None, None, id="no-recipients"),
+        pytest.param(["not-a-did"], None, None, None, id="invalid-to"),
+        pytest.param(["{to}"], "not-a-did", None, None, id="invalid-from"),
+        pytest.param(["{to}", "{frm}"], None, ["{to}"], None, id="to-not-in-message"),
+        pytest.param(["{to}"], "{frm}", ["{to}"], "{to}", id="from-not-message-from"),
+    ]
+)
+async def test_invalid_message(demo, did_frm, did_to, to, frm, message_to, message_frm):
+    def fill(value):
+        return value.format(to=did_to, frm=did_frm) if value is not None else None
+
+    message = build_message("hello", to=[fill(t) for t in message_to or to], frm=fill(message_frm))
+    if message_to is None:
+        message.to = None
+    with pytest.raises(DIDCommValueError):
+        await pack_encrypted_many(demo.resolvers_config, message, [fill(t) for t in to], frm=fill(frm))
+
+
+@pytest.mark.asyncio
+async def test_from_prior_rejected(demo, did_frm, did_to):
+    message = build_message("hello", to=[did_to, did_frm])
+    message.from_prior = FromPrior(iss=did_frm, sub=did_to)
+    with pytest.raises(DIDCommValueError):
+        await pack_encrypted_many(demo.resolvers_config, message, [did_to, did_frm])
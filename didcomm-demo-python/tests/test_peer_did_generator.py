@@ -0,0 +1,24 @@
+import pytest
+from peerdid.did_doc import DIDDocPeerDID
+from peerdid.peer_did import resolve_peer_did
+
+from didcomm_demo.peer_did_generator import generate_peer_did
+
+
+@pytest.mark.parametrize(
+    "auth_keys_count,agreement_keys_count,service_endpoint",
+    [
+        pytest.param(1, 0, None, id="numalgo0"),
+        pytest.param(1, 1, None, id="1auth-1agreem"),
+        pytest.param(2, 3, None, id="2auth-3agreem"),
+        pytest.param(0, 2, None, id="0auth-2agreem"),
+        pytest.param(2, 2, "https://my-endpoint", id="2auth-2agreem-service"),
+    ]
+)
+def test_kids_match_resolved_did_doc(auth_keys_count, agreement_keys_count, service_endpoint):
+    did, secrets = generate_peer_did(auth_keys_count=auth_keys_count,
+                                     agreement_keys_count=agreement_keys_count,
+                                     service_endpoint=service_endpoint,
+                                     service_routing_keys=["key1"] if service_endpoint else None)
+    did_doc = DIDDocPeerDID.from_json(resolve_peer_did(did))
+    assert [s.kid for s in secrets] == did_doc.auth_kids + did_doc.agreement_kids
@@ -0,0 +1,188 @@
+import pytest
+from click.testing import CliRunner
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+
+from didcomm_demo.didcomm_cli import set_secrets_resolver, cli
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.replay import ReplayDetector, ReplayedMessageError, filter_size, _block_fp_rate, _DIGEST_SIZE
+
+
+class Clock:
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture()
+def clock():
+    return Clock()
+
+
+@pytest.fixture()
+def secrets_resolver(tmp_path):
+    return SecretsResolverDemo(tmp_path / "secrets.json")
+
+
+@pytest.fixture()
+def did(secrets_resolver):
+    return DIDCommDemo(secrets_resolver).create_peer_did()
+
+
+def test_check_and_add():
+    detector = ReplayDetector(capacity=1000)
+    assert not detector.check_and_add("1", "did:example:alice")
+    assert detector.check_and_add("1", "did:example:alice")
+    # IDs are unique per sender
+    assert not detector.check_and_add("1", "did:example:bob")
+    assert not detector.check_and_add("1")
+    assert detector.check_and_add("1", None)
+    assert not detector.check("2")
+    assert not detector.check_and_add("2")
+
+    stats = detector.stats()
+    assert (stats.checked, stats.replays, stats.tracked) == (6, 2, 4)
+
+
+def test_window(clock):
+    detector = ReplayDetector(window=60, capacity=1000, clock=clock)
+    detector.check_and_add("1")
+    clock.now += 59
+    assert detector.check("1")
+    clock.now += 30
+    detector.check_and_add("2")
+    # remembered for at least the window
+    clock.now += 30
+    assert detector.check("1")
+    assert detector.check("2")
+    # and at most two windows
+    clock.now += 2
+    assert not detector.check("1")
+    assert detector.check("2")
+    clock.now += 120
+    assert not detector.check("2")
+    assert detector.stats().rotations == 3
+
+
+def test_false_positive_rate():
+    detector = ReplayDetector(capacity=10000, fp_rate=0.01)
+    detector.add_many((str(i), "did:example:alice") for i in range(10000))
+    false_positives = sum(detector.check(str(i), "did:example:bob") for i in range(10000))
+    assert false_positives < 100
+
+
+@pytest.mark.parametrize("fp_rate", [1e-2, 1e-6, 1e-9])
+def test_filter_size(fp_rate):
+    blocks, hashes = filter_size(100000, fp_rate)
+    assert _block_fp_rate(blocks * 256 / 100000, hashes) <= fp_rate
+    assert _block_fp_rate(blocks * 256 / 100000 * 0.9, hashes) > fp_rate
+
+
+@pytest.mark.parametrize("kwargs", [dict(window=0), dict(capacity=0), dict(fp_rate=0), dict(fp_rate=1)])
+def test_invalid_params(kwargs):
+    with pytest.raises(ValueError):
+        ReplayDetector(**kwargs)
+
+
+def test_persistence(tmp_path, clock):
+    path = str(tmp_path / "replay")
+    detector = ReplayDetector(window=60, capacity=1000, path=path, clock=clock)
+    detector.check_and_add("1")
+    detector.close()
+
+    # restored from the journal
+    detector = ReplayDetector(window=60, capacity=1000, path=path, clock=clock)
+    assert detector.check_and_add("1")
+    detector.check_and_add("2")
+    clock.now += 61
+    # rotation saves the snapshot
+    detector.check_and_add("3")
+    detector.close()
+
+    detector = ReplayDetector(window=60, capacity=1000, path=path, clock=clock)
+    assert detector.check("1")
+    assert detector.check("2")
+    assert detector.check("3")
+    detector.close()
+
+    clock.now += 60
+    detector = ReplayDetector(window=60, capacity=1000, path=path, clock=clock)
+    assert not detector.check("1")
+    assert detector.check("3")
+    detector.close()
+
+
+def test_persistence_journal_written_at_once(tmp_path):
+    path = str(tmp_path / "replay")
+    detector = ReplayDetector(capacity=1000, path=path, fsync=True)
+    detector.check_and_add("1")
+    detector.add_many([("2", None), ("3", "did:example:alice")])
+    # nothing is left in a buffer to be lost if the process dies
+    assert (tmp_path / "replay.journal").stat().st_size == 3 * _DIGEST_SIZE
+    detector.close()
+
+
+def test_persistence_locked(tmp_path):
+    path = str(tmp_path / "replay")
+    detector = ReplayDetector(capacity=1000, path=path)
+    with pytest.raises(ValueError, match="used by another process"):
+        ReplayDetector(capacity=1000, path=path)
+    detector.close()
+    ReplayDetector(capacity=1000, path=path).close()
+
+
+def test_persistence_params_mismatch(tmp_path):
+    path = str(tmp_path / "replay")
+    ReplayDetector(capacity=1000, path=path).close()
+    with pytest.raises(ValueError, match="was saved with"):
+        ReplayDetector(capacity=2000, path=path)
+    # the state file isn't left locked
+    ReplayDetector(capacity=1000, path=path).close()
+
+
+def test_unpack_replay(secrets_resolver, did):
+    demo = DIDCommDemo(secrets_resolver, replay_detector=ReplayDetector(capacity=1000))
+    packed_msg = demo.pack("hello", to=did, frm=did).packed_msg
+    assert demo.unpack(packed_msg)[0] == "hello"
+    with pytest.raises(ReplayedMessageError):
+        demo.unpack(packed_msg)
+    # a new message with the same content isn't a replay
+    assert demo.unpack(demo.pack("hello", to=did, frm=did).packed_msg)[0] == "hello"
+
+
+def test_session_unpack_replay(secrets_resolver, did):
+    demo = DIDCommDemo(secrets_resolver, replay_detector=ReplayDetector(capacity=1000))
+    session = demo.session(frm=did, to=did)
+    packed_msg = session.pack("hello").packed_msg
+    session.unpack(packed_msg)
+    with pytest.raises(ReplayedMessageError):
+        session.unpack(packed_msg)
+    with pytest.raises(ReplayedMessageError):
+        demo.unpack(packed_msg)
+
+
+def test_unpack_many_replay(secrets_resolver, did):
+    demo = DIDCommDemo(secrets_resolver, replay_detector=ReplayDetector(capacity=1000))
+    packed_msgs = [demo.pack(f"msg {i}", to=did).packed_msg for i in range(2)]
+    results = sorted(demo.unpack_many(packed_msgs + packed_msgs[:1], workers=1), key=lambda r: r.index)
+    assert [r.ok for r in results[:2]] == [True, True]
+    assert isinstance(results[2].error, ReplayedMessageError)
+
+
+def test_cli_replay_state(tmp_path, secrets_resolver, did):
+    set_secrets_resolver(secrets_resolver)
+    try:
+        runner = CliRunner()
+        packed_msg = DIDCommDemo(secrets_resolver).pack("hello", to=did, frm=did).packed_msg
+        state = str(tmp_path / "replay")
+        res = runner.invoke(cli, ["--replay-state", state, "unpack", packed_msg])
+        assert "authcrypted 'hello'" in res.output
+        res = runner.invoke(cli, ["--replay-state", state, "unpack", packed_msg])
+        assert "is a replay" in res.output
+        res = runner.invoke(cli, ["--replay-state", state, "--replay-window", "60", "unpack", packed_msg])
+        assert res.exit_code != 0
+        assert "was saved with" in res.output
+    finally:
+        set_secrets_resolver(None)
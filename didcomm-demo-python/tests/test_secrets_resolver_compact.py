@@ -0,0 +1,116 @@
+import pickle
+
+import pytest
+from didcomm.common.types import VerificationMaterial, VerificationMaterialFormat, VerificationMethodType
+from didcomm.secrets.secrets_resolver import Secret
+from didcomm.secrets.secrets_util import generate_ed25519_keys_as_jwk_dict, generate_x25519_keys_as_jwk_dict, \
+    jwk_to_secret
+
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.secrets_resolver_compact import SecretsResolverCompact
+from tests.common import get_secret_resolver_kids
+
+
+def new_secret(kid, generate=generate_x25519_keys_as_jwk_dict):
+    private_key = generate()[0]
+    private_key["kid"] = kid
+    return jwk_to_secret(private_key)
+
+
+def p256_secret(kid):
+    return jwk_to_secret({
+        "kty": "EC",
+        "crv": "P-256",
+        "x": "2syLh57B-dGpa0F8p1JrO6JU7UUSF6j7qL-vfk1eOoY",
+        "y": "BgsGtI7UPsObMRjdElxLOrgAO9JggNMjOcfzEPox18w",
+        "d": "7TCIdt1rhThFtWcEiLnk_COEjh1ZfQhM4bW2wz-dp4A",
+        "kid": kid,
+    })
+
+
+@pytest.fixture()
+def secrets_resolver():
+    return SecretsResolverCompact()
+
+
+@pytest.mark.asyncio
+async def test_add_get_key(secrets_resolver):
+    x25519 = new_secret("did:example:alice#key-1")
+    ed25519 = new_secret("did:example:alice#key-2", generate_ed25519_keys_as_jwk_dict)
+    await secrets_resolver.add_key(x25519)
+    await secrets_resolver.add_key(ed25519)
+
+    assert await secrets_resolver.get_key("did:example:alice#key-1") == x25519
+    assert await secrets_resolver.get_key("did:example:alice#key-2") == ed25519
+    assert await secrets_resolver.get_key("did:example:alice#key-3") is None
+    assert await secrets_resolver.get_key("did:example:bob#key-1") is None
+    assert await secrets_resolver.get_kids() == ["did:example:alice#key-1", "did:example:alice#key-2"]
+
+
+@pytest.mark.asyncio
+async def test_add_keys_get_keys(secrets_resolver):
+    kids = [f"did:example:{i // 2}#key-{i % 2}" for i in range(2000)]
+    await secrets_resolver.add_keys([new_secret(kid) for kid in kids])
+
+    assert secrets_resolver.keys_count == 2000
+    assert await secrets_resolver.get_kids() == kids
+    requested = ["did:example:bob#key-1", "did:example:1#key-2"] + kids[::-1]
+    assert await secrets_resolver.get_keys(requested) == kids[::-1]
+    assert await secrets_resolver.get_keys([]) == []
+    # DIDs are kept once for all their keys
+    assert secrets_resolver.memory_bytes < 2000 * 150
+
+
+@pytest.mark.asyncio
+async def test_replace_key(secrets_resolver):
+    await secrets_resolver.add_key(new_secret("did:example:alice#key-1"))
+    secret = new_secret("did:example:alice#key-1", generate_ed25519_keys_as_jwk_dict)
+    await secrets_resolver.add_key(secret)
+    assert await secrets_resolver.get_key(secret.kid) == secret
+    assert secrets_resolver.keys_count == 1
+
+
+@pytest.mark.asyncio
+async def test_other_keys(secrets_resolver):
+    # keys other than X25519 and Ed25519 JWKs are kept as they are
+    p256 = p256_secret("did:example:alice#key-p256")
+    base58 = Secret(
+        kid="did:example:alice#key-base58",
+        type=VerificationMethodType.ED25519_VERIFICATION_KEY_2018,
+        verification_material=VerificationMaterial(format=VerificationMaterialFormat.BASE58, value="abc"),
+    )
+    no_fragment = new_secret("did:example:bob")
+    await secrets_resolver.add_keys([p256, base58, no_fragment])
+
+    assert await secrets_resolver.get_key(p256.kid) == p256
+    assert await secrets_resolver.get_key(base58.kid) == base58
+    assert await secrets_resolver.get_key(no_fragment.kid) == no_fragment
+    assert sorted(await secrets_resolver.get_kids()) == sorted([p256.kid, base58.kid, no_fragment.kid])
+
+    # a key of another type replaces a raw key with the same ID
+    await secrets_resolver.add_key(p256_secret(no_fragment.kid))
+    assert (await secrets_resolver.get_key(no_fragment.kid)).verification_material == \
+           p256_secret(no_fragment.kid).verification_material
+    assert secrets_resolver.keys_count == 3
+
+
+@pytest.mark.asyncio
+async def test_pickle(secrets_resolver):
+    secret = new_secret("did:example:alice#key-1")
+    await secrets_resolver.add_key(secret)
+    assert await pickle.loads(pickle.dumps(secrets_resolver)).get_key(secret.kid) == secret
+
+
+def test_demo_pack_unpack(secrets_resolver):
+    demo = DIDCommDemo(secrets_resolver)
+    did_frm = demo.create_peer_did(auth_keys_count=2, agreement_keys_count=2)
+    did_to = demo.create_peer_did()
+    assert len(get_secret_resolver_kids(secrets_resolver)) == 6
+
+    packed = demo.pack(msg="hello", frm=did_frm, to=did_to, sign_frm=did_frm)
+    msg, frm, to, _ = demo.unpack(packed.packed_msg)
+    assert (msg, frm, to) == ("hello", did_frm, did_to)
+
+    # unpacked by worker processes having a copy of the resolver
+    results = list(demo.unpack_many([packed.packed_msg], workers=1))
+    assert results[0].result[:3] == ("hello", did_frm, did_to)
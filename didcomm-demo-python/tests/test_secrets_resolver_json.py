@@ -0,0 +1,35 @@
+import pytest
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+from didcomm.secrets.secrets_util import generate_x25519_keys_as_jwk_dict, jwk_to_secret
+
+from didcomm_demo.secrets_resolver_json import SecretsResolverJson
+
+
+def new_secret(kid):
+    private_key = generate_x25519_keys_as_jwk_dict()[0]
+    private_key["kid"] = kid
+    return jwk_to_secret(private_key)
+
+
+@pytest.mark.asyncio
+async def test_add_keys_get_keys(tmp_path):
+    resolver = SecretsResolverJson(tmp_path / "secrets.json")
+    secrets = [new_secret(f"did:example:alice#key-{i}") for i in range(3)]
+    await resolver.add_keys(secrets[:2])
+    await resolver.add_key(secrets[2])
+
+    assert await resolver.get_key(secrets[0].kid) == secrets[0]
+    assert await resolver.get_key("did:example:bob#key-1") is None
+    assert await resolver.get_keys(["did:example:bob#key-1", secrets[2].kid]) == [secrets[2].kid]
+    assert await SecretsResolverJson(tmp_path / "secrets.json").get_kids() == [s.kid for s in secrets]
+
+
+@pytest.mark.asyncio
+async def test_same_file_format_as_library_resolver(tmp_path):
+    secret = new_secret("did:example:alice#key-1")
+    await SecretsResolverJson(tmp_path / "secrets.json").add_keys([secret])
+    assert await SecretsResolverDemo(tmp_path / "secrets.json").get_key(secret.kid) == secret
+
+    other = new_secret("did:example:alice#key-2")
+    await SecretsResolverDemo(tmp_path / "secrets.json").add_key(other)
+    assert await SecretsResolverJson(tmp_path / "secrets.json").get_key(other.kid) == other
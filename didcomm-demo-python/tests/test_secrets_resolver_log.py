@@ -0,0 +1,151 @@
+import multiprocessing
+import pickle
+
+import pytest
+from didcomm.secrets.secrets_util import generate_x25519_keys_as_jwk_dict, jwk_to_secret
+
+from didcomm_demo import secrets_resolver_log
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.secrets_resolver_log import SecretsResolverLog
+from tests.common import get_secret_resolver_kids
+
+PROCESSES = 8
+KEYS_PER_PROCESS = 50
+
+
+def new_secret(kid):
+    private_key = generate_x25519_keys_as_jwk_dict()[0]
+    private_key["kid"] = kid
+    return jwk_to_secret(private_key)
+
+
+@pytest.fixture()
+def secrets_resolver(tmp_path):
+    return SecretsResolverLog(tmp_path / "secrets.log")
+
+
+@pytest.mark.asyncio
+async def test_add_get_key(secrets_resolver):
+    secret = new_secret("did:example:alice#key-1")
+    await secrets_resolver.add_key(secret)
+
+    assert await secrets_resolver.get_key("did:example:alice#key-1") == secret
+    assert await secrets_resolver.get_key("did:example:alice#key-2") is None
+    assert await secrets_resolver.get_kids() == ["did:example:alice#key-1"]
+
+
+@pytest.mark.asyncio
+async def test_persisted(tmp_path):
+    secret = new_secret("did:example:alice#key-1")
+    await SecretsResolverLog(tmp_path / "secrets.log").add_key(secret)
+    assert await SecretsResolverLog(tmp_path / "secrets.log").get_key(secret.kid) == secret
+
+
+@pytest.mark.asyncio
+async def test_pickle(secrets_resolver):
+    secret = new_secret("did:example:alice#key-1")
+    await secrets_resolver.add_key(secret)
+    assert await pickle.loads(pickle.dumps(secrets_resolver)).get_key(secret.kid) == secret
+
+
+@pytest.mark.asyncio
+async def test_reads_tail_added_by_other(tmp_path):
+    reader = SecretsResolverLog(tmp_path / "secrets.log")
+    writer = SecretsResolverLog(tmp_path / "secrets.log")
+    secrets = [new_secret(f"did:example:alice#key-{i}") for i in range(3)]
+    await writer.add_key(secrets[0])
+    assert await reader.get_key(secrets[0].kid) == secrets[0]
+    await writer.add_keys(secrets[1:])
+    assert await reader.get_keys([s.kid for s in secrets]) == [s.kid for s in secrets]
+
+
+@pytest.mark.asyncio
+async def test_broken_last_line(tmp_path):
+    path = tmp_path / "secrets.log"
+    first, second = new_secret("did:example:alice#key-1"), new_secret("did:example:alice#key-2")
+    await SecretsResolverLog(path).add_key(first)
+    # left by a process that died while writing
+    with open(path, "ab") as f:
+        f.write(b'{"crv": "X25519", "x": ')
+
+    resolver = SecretsResolverLog(path)
+    assert await resolver.get_kids() == [first.kid]
+    await resolver.add_key(second)
+    assert await SecretsResolverLog(path).get_kids() == [first.kid, second.kid]
+
+
+@pytest.mark.asyncio
+async def test_compaction(tmp_path, monkeypatch):
+    monkeypatch.setattr(secrets_resolver_log, "MIN_COMPACT_LINES", 10)
+    path = tmp_path / "secrets.log"
+    resolver = SecretsResolverLog(path)
+    other = SecretsResolverLog(path)
+    for _ in range(4):
+        await resolver.add_keys([new_secret(f"did:example:alice#key-{i}") for i in range(3)])
+    # waits for the compaction started in the background
+    resolver.close()
+    assert path.read_text().splitlines()[0] == '{"generation": 1}'
+    last = new_secret("did:example:alice#key-0")
+    await resolver.add_key(last)
+    resolver.compact()
+
+    assert path.read_text().splitlines()[0] == '{"generation": 2}'
+    assert len(path.read_text().splitlines()) == 4
+    assert await SecretsResolverLog(path).get_key(last.kid) == last
+    # the replaced log is read again by a process that has read the old one
+    await resolver.add_key(new_secret("did:example:bob#key-1"))
+    assert len(await other.get_kids()) == 4
+    assert await other.get_key(last.kid) == last
+
+
+@pytest.mark.asyncio
+async def test_rewritten_log_of_same_size(tmp_path):
+    path = tmp_path / "secrets.log"
+    writer = SecretsResolverLog(path)
+    await writer.add_key(new_secret("did:example:alice#key-1"))
+    reader = SecretsResolverLog(path)
+    size = path.stat().st_size
+
+    # a replaced key of the same size, compacted into a log of the same size as the one read
+    replaced = new_secret("did:example:alice#key-1")
+    await writer.add_key(replaced)
+    writer.compact()
+    assert path.stat().st_size == size
+    assert await reader.get_kids() == [replaced.kid]
+    assert await reader.get_key(replaced.kid) == replaced
+
+
+def _add_keys(path, process):
+    resolver = SecretsResolverLog(path)
+    # every key is added twice, so that the log gets compacted
+    for i in list(range(KEYS_PER_PROCESS)) * 2:
+        DIDCommDemo._run(resolver.add_key(new_secret(f"did:example:process-{process}#key-{i}")))
+    resolver.close()
+
+
+def test_concurrent_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(secrets_resolver_log, "MIN_COMPACT_LINES", 30)
+    path = str(tmp_path / "secrets.log")
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_add_keys, args=(path, p)) for p in range(PROCESSES)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+    assert [p.exitcode for p in processes] == [0] * PROCESSES
+
+    kids = get_secret_resolver_kids(SecretsResolverLog(path))
+    assert len(open(path).read().splitlines()) < 2 * len(kids)
+    assert sorted(kids) == sorted(f"did:example:process-{p}#key-{i}"
+                                  for p in range(PROCESSES) for i in range(KEYS_PER_PROCESS))
+
+
+def test_demo_pack_unpack(secrets_resolver):
+    demo = DIDCommDemo(secrets_resolver)
+    did_frm = demo.create_peer_did(auth_keys_count=2, agreement_keys_count=2)
+    did_to = demo.create_peer_did()
+    assert len(get_secret_resolver_kids(secrets_resolver)) == 6
+
+    packed = demo.pack(msg="hello", frm=did_frm, to=did_to, sign_frm=did_frm)
+    msg, frm, to, _ = demo.unpack(packed.packed_msg)
+    assert (msg, frm, to) == ("hello", did_frm, did_to)
@@ -0,0 +1,65 @@
+import pickle
+
+import pytest
+from didcomm.secrets.secrets_util import generate_x25519_keys_as_jwk_dict, jwk_to_secret
+
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.secrets_resolver_sqlite import SecretsResolverSqlite
+from tests.common import get_secret_resolver_kids
+
+
+def new_secret(kid):
+    private_key = generate_x25519_keys_as_jwk_dict()[0]
+    private_key["kid"] = kid
+    return jwk_to_secret(private_key)
+
+
+@pytest.fixture()
+def secrets_resolver(tmp_path):
+    return SecretsResolverSqlite(tmp_path / "secrets.db")
+
+
+@pytest.mark.asyncio
+async def test_add_get_key(secrets_resolver):
+    secret = new_secret("did:example:alice#key-1")
+    await secrets_resolver.add_key(secret)
+
+    assert await secrets_resolver.get_key("did:example:alice#key-1") == secret
+    assert await secrets_resolver.get_key("did:example:alice#key-2") is None
+    assert await secrets_resolver.get_kids() == ["did:example:alice#key-1"]
+
+
+@pytest.mark.asyncio
+async def test_add_keys_get_keys(secrets_resolver):
+    kids = [f"did:example:alice#key-{i}" for i in range(2000)]
+    await secrets_resolver.add_keys([new_secret(kid) for kid in kids])
+
+    assert len(await secrets_resolver.get_kids()) == 2000
+    requested = ["did:example:bob#key-1"] + kids[::-1]
+    assert await secrets_resolver.get_keys(requested) == kids[::-1]
+    assert await secrets_resolver.get_keys([]) == []
+
+
+@pytest.mark.asyncio
+async def test_persisted(tmp_path):
+    secret = new_secret("did:example:alice#key-1")
+    await SecretsResolverSqlite(tmp_path / "secrets.db").add_key(secret)
+    assert await SecretsResolverSqlite(tmp_path / "secrets.db").get_key(secret.kid) == secret
+
+
+@pytest.mark.asyncio
+async def test_pickle(secrets_resolver):
+    secret = new_secret("did:example:alice#key-1")
+    await secrets_resolver.add_key(secret)
+    assert await pickle.loads(pickle.dumps(secrets_resolver)).get_key(secret.kid) == secret
+
+
+def test_demo_pack_unpack(secrets_resolver):
+    demo = DIDCommDemo(secrets_resolver)
+    did_frm = demo.create_peer_did(auth_keys_count=2, agreement_keys_count=2)
+    did_to = demo.create_peer_did()
+    assert len(get_secret_resolver_kids(secrets_resolver)) == 6
+
+    packed = demo.pack(msg="hello", frm=did_frm, to=did_to, sign_frm=did_frm)
+    msg, frm, to, _ = demo.unpack(packed.packed_msg)
+    assert (msg, frm, to) == ("hello", did_frm, did_to)
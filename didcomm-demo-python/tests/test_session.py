@@ -0,0 +1,96 @@
+import dataclasses
+
+import pytest
+from didcomm.errors import DIDCommValueError
+from didcomm.pack_encrypted import PackEncryptedConfig
+from didcomm.secrets.secrets_resolver_demo import SecretsResolverDemo
+
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.envelope import parse_envelope
+from didcomm_demo.instrumentation import Instrumentation
+
+
+@pytest.mark.parametrize("protect_sender_id", [True, False])
+def test_authcrypt(demo, did_frm, did_to, protect_sender_id):
+    session = demo.session(did_frm, did_to, config=PackEncryptedConfig(protect_sender_id=protect_sender_id))
+    for i in range(3):
+        res = session.pack(f"hello {i}")
+        assert res.from_kid.startswith(did_frm)
+        assert res.sign_from_kid is None
+
+        msg, frm, to, unpack_res = session.unpack(res.packed_msg)
+        assert (msg, frm, to) == (f"hello {i}", did_frm, did_to)
+        assert unpack_res.metadata.authenticated
+        assert unpack_res.metadata.anonymous_sender == protect_sender_id
+
+        assert demo.unpack(res.packed_msg)[:3] == (f"hello {i}", did_frm, did_to)
+
+
+def test_anoncrypt_signed(demo, did_frm, did_to):
+    session = demo.session(None, did_to, sign_frm=did_frm)
+    res = session.pack("hello")
+    assert res.from_kid is None
+    assert res.sign_from_kid.startswith(did_frm)
+
+    msg, frm, to, unpack_res = session.unpack(res.packed_msg)
+    assert (msg, frm, to) == ("hello", None, did_to)
+    assert unpack_res.metadata.non_repudiation
+    assert unpack_res.metadata.sign_from == res.sign_from_kid
+
+
+@pytest.mark.parametrize("protect_sender_id", [True, False])
+@pytest.mark.parametrize("sign", [True, False])
+def test_parity_with_pack(demo, did_frm, did_to, protect_sender_id, sign):
+    sign_frm = did_frm if sign else None
+    config = PackEncryptedConfig(protect_sender_id=protect_sender_id)
+    res = demo.session(did_frm, did_to, sign_frm=sign_frm, config=config).pack("hello")
+    expected = demo.pack("hello", to=did_to, frm=did_frm, sign_frm=sign_frm, config=config)
+
+    assert (res.to_kids, res.from_kid, res.sign_from_kid) == \
+           (expected.to_kids, expected.from_kid, expected.sign_from_kid)
+    assert dataclasses.replace(parse_envelope(res.packed_msg), size=0) == \
+           dataclasses.replace(parse_envelope(expected.packed_msg), size=0)
+    unpacked, expected_unpacked = demo.unpack(res.packed_msg), demo.unpack(expected.packed_msg)
+    assert unpacked[:3] == expected_unpacked[:3]
+    assert dataclasses.replace(unpacked[3].metadata, signed_message=None) == \
+           dataclasses.replace(expected_unpacked[3].metadata, signed_message=None)
+
+
+def test_invalid_to(demo, did_frm, did_to):
+    session = demo.session(did_frm, did_to)
+    # keys are resolved and pinned, but messages are still validated
+    session.pack("hello")
+    session.to = "not-a-did"
+    with pytest.raises(DIDCommValueError):
+        session.pack("hello")
+
+
+def test_stats_and_invalidate(demo, did_frm, did_to):
+    session = demo.session(did_frm, did_to)
+    session.unpack(session.pack("hello").packed_msg)
+    session.pack("hello")
+
+    stats = session.stats()
+    assert (stats.packed, stats.unpacked, stats.resolutions) == (2, 1, 1)
+    assert stats.pack_seconds > 0
+    assert stats.unpack_seconds > 0
+
+    session.invalidate()
+    session.pack("hello")
+    assert session.stats().resolutions == 2
+
+
+def test_rejects_other_senders(demo, did_frm, did_to):
+    session = demo.session(did_frm, did_to)
+    did_other = demo.create_peer_did()
+    packed_msg = demo.pack(msg="hello", to=did_to, frm=did_other).packed_msg
+    with pytest.raises(DIDCommValueError):
+        session.unpack(packed_msg)
+
+
+def test_instrumentation(tmp_path):
+    timings = []
+    demo = DIDCommDemo(SecretsResolverDemo(tmp_path / "secrets.json"), instrumentation=Instrumentation([timings.append]))
+    session = demo.session(demo.create_peer_did(), demo.create_peer_did())
+    session.unpack(session.pack("hello").packed_msg)
+    assert [t.operation for t in timings] == ["pack", "unpack"]
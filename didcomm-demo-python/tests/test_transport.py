@@ -0,0 +1,113 @@
+import threading
+
+import pytest
+
+from didcomm_demo.didcomm_demo import DIDCommDemo
+from didcomm_demo.secrets_resolver_compact import SecretsResolverCompact
+from didcomm_demo.transport import HTTPTransport, DeliveryError, DIDCOMM_ENCRYPTED_CONTENT_TYPE
+from tests.common import StandInServer
+
+
+@pytest.fixture()
+def transport():
+    with HTTPTransport(backoff=0.0, timeout=5) as transport:
+        yield transport
+
+
+def test_post_keep_alive(transport):
+    with StandInServer() as server:
+        for i in range(5):
+            res = transport.post(server.url + "?n=1", f"message {i}")
+            assert (res.status, res.attempts) == (200, 1)
+
+    assert server.requests[0] == ("/didcomm?n=1", DIDCOMM_ENCRYPTED_CONTENT_TYPE, b"message 0")
+    assert len(server.connections) == 1
+    stats, = transport.stats().values()
+    assert (stats.requests, stats.connections, stats.retries, stats.failures) == (5, 1, 0, 0)
+    assert 0 < stats.latency_p50 <= stats.latency_p95
+
+
+def test_retry(transport):
+    with StandInServer(statuses=[503, 429]) as server:
+        res = transport.post(server.url, "message")
+    assert (res.status, res.attempts) == (200, 3)
+    assert len(server.requests) == 3
+    assert next(iter(transport.stats().values())).retries == 2
+
+
+def test_no_retry_on_client_error(transport):
+    with StandInServer(statuses=[400]) as server:
+        with pytest.raises(DeliveryError) as e:
+            transport.post(server.url, "message")
+    assert e.value.status == 400
+    assert len(server.requests) == 1
+
+
+def test_retries_exhausted(transport):
+    with StandInServer(statuses=[503] * 10) as server:
+        with pytest.raises(DeliveryError) as e:
+            transport.post(server.url, "message")
+    assert e.value.status == 503
+    assert len(server.requests) == transport.retries + 1
+    assert next(iter(transport.stats().values())).failures == 1
+
+
+def test_unreachable(transport):
+    with StandInServer() as server:
+        url = server.url
+    with pytest.raises(DeliveryError, match="unreachable"):
+        transport.post(url, "message")
+    with pytest.raises(DeliveryError, match="Unsupported"):
+        transport.post("ws://127.0.0.1/didcomm", "message")
+
+
+def test_connection_closed_by_endpoint(transport):
+    with StandInServer(drop_idle=True) as server:
+        for _ in range(3):
+            assert transport.post(server.url, "message").attempts == 1
+    assert len(server.requests) == 3
+    assert next(iter(transport.stats().values())).retries == 0
+
+
+def test_bounded_connections():
+    with HTTPTransport(max_connections_per_endpoint=2) as transport, StandInServer(delay=0.05) as server:
+        threads = [threading.Thread(target=transport.post, args=(server.url, "message")) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert len(server.requests) == 8
+    assert server.max_in_flight == 2
+    assert len(server.connections) == 2
+
+
+def test_demo_send():
+    with DIDCommDemo(SecretsResolverCompact()) as demo, StandInServer() as server:
+        did_frm = demo.create_peer_did()
+        did_to = [demo.create_peer_did(service_endpoint=server.url) for _ in range(2)]
+        res = demo.send("hello", to=did_to, frm=did_frm)
+        transport = demo._own_transport
+    # the transport created by the demo is closed with it
+    with pytest.raises(RuntimeError):
+        transport.post(server.url, "message")
+
+    # both receivers have the same endpoint
+    assert [delivery.endpoint for delivery in res.deliveries] == [server.url]
+    (_, content_type, body), = server.requests
+    assert content_type == DIDCOMM_ENCRYPTED_CONTENT_TYPE
+    assert body.decode() == res.pack_result.packed_msg
+    msg, frm, _, _ = demo.unpack(body.decode())
+    assert (msg, frm) == ("hello", did_frm)
+
+
+def test_demo_send_transport_not_owned():
+    with HTTPTransport() as transport, StandInServer() as server:
+        with DIDCommDemo(SecretsResolverCompact(), transport=transport) as demo:
+            demo.send("hello", to=demo.create_peer_did(service_endpoint=server.url))
+        assert transport.post(server.url, "message").status == 200
+
+
+def test_demo_send_no_endpoint():
+    with DIDCommDemo(SecretsResolverCompact()) as demo:
+        with pytest.raises(DeliveryError, match="no HTTP"):
+            demo.send("hello", to=demo.create_peer_did())
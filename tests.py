@@ -1,10 +1,14 @@
 import json
+import os
 import subprocess
 import sys
 from enum import Enum
 from pathlib import Path
 
 PYTHON_CLI = "didcomm-cli"
+# address of a running `didcomm-cli serve` (a Unix socket path or host:port) to be used instead of the CLI
+PYTHON_CLI_DAEMON = os.environ.get("DIDCOMM_CLI_DAEMON")
+_python_cli_daemon_client = None
 
 JAVA_CLI_NAME = "didcomm-demo-cli.bat" if sys.platform.startswith("win") else "didcomm-demo-cli"
 JAVA_CLI = Path("./didcomm-demo-jvm") / "didcomm-demo-cli" / "build" / "install" / "didcomm-demo-cli" / "bin" / JAVA_CLI_NAME
@@ -18,9 +22,19 @@ class Command(Enum):
 
 
 def call_didcomm_python(cmd: Command, *args):
+    if PYTHON_CLI_DAEMON:
+        return call_didcomm_python_daemon(cmd, *args)
     return subprocess.check_output([PYTHON_CLI, cmd.value] + list(args)).strip().decode()
 
 
+def call_didcomm_python_daemon(cmd: Command, *args):
+    global _python_cli_daemon_client
+    if _python_cli_daemon_client is None:
+        from didcomm_demo.daemon import DaemonClient
+        _python_cli_daemon_client = DaemonClient(PYTHON_CLI_DAEMON)
+    return _python_cli_daemon_client.call(cmd.value, *args).strip()
+
+
 def call_didcomm_java(cmd: Command, *args):
     return subprocess.check_output([JAVA_CLI, cmd.value] + list(args)).strip().decode()
 